@@ -18,9 +18,10 @@ class IsTeacher(permissions.BasePermission):  # Добавляем класс Is
 class IsOwner(permissions.BasePermission):
     """Владелец объекта или администратор"""
     def has_object_permission(self, request, view, obj):
-        if hasattr(obj, 'owner'):
-            return obj.owner == request.user
-        return False
+        # Сравниваем id без загрузки владельца; у разделов и материалов
+        # owner — денормализованная копия владельца курса
+        owner_id = getattr(obj, 'owner_id', None)
+        return owner_id is not None and owner_id == request.user.pk
 
 
 class IsTeacherOrAdmin(permissions.BasePermission):
@@ -95,10 +95,10 @@ class UserViewSetPermissionsTests(APITestCase):
         self.assertEqual(response.status_code, 200)
 
         response = self.client.get('/authentication/register/')
-        self.assertEqual(len(response.data), 1)  # Видит только себя
+        self.assertEqual(len(response.data["results"]), 1)  # Видит только себя
 
     def test_admin_access(self):
         self.client.force_authenticate(user=self.admin)
         # Админ видит всех
         response = self.client.get('/authentication/register/')
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data["results"]), 2)
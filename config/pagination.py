@@ -0,0 +1,62 @@
+import json
+
+from django.db import connections
+from rest_framework.pagination import CursorPagination
+
+
+def estimate_count(queryset):
+    """
+    Возвращает приблизительное количество строк в выборке.
+
+    На PostgreSQL берется оценка планировщика из EXPLAIN, которая не требует
+    сканирования таблицы. На остальных СУБД выполняется обычный COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация по первичному ключу.
+
+    Каждая страница выбирается условием по индексированному id вместо OFFSET,
+    поэтому стоимость запроса не зависит от глубины страницы.
+    Общее количество записей возвращается только по запросу:
+    - ?count=exact: точное значение через COUNT(*)
+    - ?count=estimate: дешевая оценка планировщика (см. estimate_count)
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = "-id"
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == "exact":
+            self.count = queryset.count()
+        elif mode == "estimate":
+            self.count = estimate_count(queryset)
+        else:
+            self.count = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data["count"] = self.count
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema["properties"]["count"] = {"type": "integer", "example": 123}
+        return schema
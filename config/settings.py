@@ -78,6 +78,16 @@ DATABASES = {
     }
 }
 
+# Кеш общий для всех процессов (веб-воркеров и management-команд):
+# сбросы кеша после import_questions, recount, run_clone_jobs и т.п.
+# сразу видны веб-процессу
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL", "redis://localhost:6379/1"),
+    }
+}
+
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.postgresql',
@@ -110,6 +120,7 @@ REST_FRAMEWORK = {
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    "DEFAULT_PAGINATION_CLASS": "config.pagination.KeysetPagination",
 }
 
 # JWT настройки
@@ -154,6 +165,45 @@ CSRF_TRUSTED_ORIGINS = os.getenv("CSRF_TRUSTED_ORIGINS", "").split(",")
 
 TEST_PASS_THRESHOLD = 70
 
+# Время жизни кеша сериализованных деревьев курсов (в секундах)
+COURSE_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Время жизни кеша прогресса пользователя по курсу (в секундах). Прогресс
+# сбрасывается при каждой отправке теста курса, а изменения структуры курса
+# учитываются по истечении этого времени
+COURSE_PROGRESS_CACHE_TIMEOUT = 60 * 10
+
+# Курсы, содержащие больше материалов, копируются фоновым заданием
+# (команда run_clone_jobs), меньшие — сразу в запросе
+COURSE_CLONE_SYNC_LIMIT = 500
+
+# Задание копирования, которое выполняется дольше этого времени (в секундах),
+# считается брошенным (воркер остановлен) и снова забирается run_clone_jobs
+COURSE_CLONE_JOB_TIMEOUT = 60 * 60
+
+# Время жизни кеша ключей ответов тестов (в секундах)
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Время жизни кеша сериализованных тестов с вопросами (в секундах)
+TEST_PAYLOAD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Время жизни токена попытки теста с выданными вопросами (в секундах)
+TEST_ATTEMPT_TOKEN_MAX_AGE = 60 * 60 * 24
+
+# Сколько id попыток ниже последней учтенной перепроверяет обновление анализа
+# вопросов: попытки параллельных транзакций могут сохраниться с меньшим id
+# уже после того, как более поздняя попытка была учтена
+TEST_ITEM_ANALYSIS_RESCAN_WINDOW = 10000
+
+# Режим write-behind: попытки тестов пишутся в локальный буфер и сохраняются
+# в БД пакетами командой flush_test_attempts
+TEST_ATTEMPTS_WRITE_BEHIND = True if os.getenv("TEST_ATTEMPTS_WRITE_BEHIND") else False
+TEST_ATTEMPTS_BUFFER_PATH = os.getenv(
+    "TEST_ATTEMPTS_BUFFER_PATH", str(BASE_DIR / "var" / "test_attempts.ndjson")
+)
+# Время хранения в кеше еще не сохраненных попыток пользователя (в секундах)
+TEST_ATTEMPTS_PENDING_TIMEOUT = 60 * 60 * 24
+
 LANGUAGE_CODE = "ru-ru"
 
 TIME_ZONE = "Europe/Moscow"
@@ -174,3 +224,4 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 if "test" in sys.argv:
     DATABASES["default"] = {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}
+    CACHES["default"] = {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
@@ -1,14 +1,27 @@
 from django.contrib import admin
 
-from .models import Course, Material, Section
+from .models import Course, CourseCloneJob, Material, SearchEntry, Section
+from .search import search_entries
 
 
 @admin.register(Course)
 class CourseAdmin(admin.ModelAdmin):
     list_display = ("title", "owner")
-    search_fields = ("title", "owner__email")
+    search_fields = ("=owner__email",)
     list_filter = ("owner",)
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет курсы по полнотекстовому индексу, владельца — по точному email."""
+        results, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        if search_term:
+            entries = search_entries(
+                SearchEntry.objects.filter(kind=SearchEntry.COURSE), search_term
+            )
+            results |= queryset.filter(pk__in=entries.values("object_id"))
+        return results, may_have_duplicates
+
 
 @admin.register(Section)
 class SectionAdmin(admin.ModelAdmin):
@@ -20,3 +33,18 @@ class SectionAdmin(admin.ModelAdmin):
 class MaterialAdmin(admin.ModelAdmin):
     list_display = ("title", "section")
     list_filter = ("section",)
+
+
+@admin.register(CourseCloneJob)
+class CourseCloneJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "source",
+        "owner",
+        "status",
+        "course",
+        "created_at",
+        "started_at",
+        "finished_at",
+    )
+    list_filter = ("status",)
+    readonly_fields = ("course", "error", "created_at", "started_at", "finished_at")
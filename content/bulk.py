@@ -0,0 +1,249 @@
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+
+from .cache import invalidate_course_tree
+from .counters import recount
+from .models import Course, Material, Section
+from .ordering import POSITION_STEP, last_positions
+from .search import index_materials, material_entry, save_entries
+from .suggest import invalidate_suggestions
+
+# Пакетные операции записывают строки через bulk_create/bulk_update, минуя
+# save() и сигналы моделей. Поэтому владелец, счетчики, поисковый индекс
+# и кеши обновляются здесь явно — по одному разу на пакет.
+
+
+def scoped(queryset, user):
+    """Ограничивает queryset объектами курсов преподавателя."""
+    if user.role == "teacher":
+        return queryset.filter(owner=user)
+    return queryset
+
+
+def item_error(index, field, message):
+    return {"index": index, "errors": {field: [message]}}
+
+
+def append_positions(objs, queryset, parent_field):
+    """Ставит объекты objs в конец их родителей в порядке следования."""
+    if not objs:
+        return
+    parent_ids = {getattr(obj, parent_field) for obj in objs}
+    last = last_positions(queryset, parent_field, parent_ids)
+    for obj in objs:
+        parent_id = getattr(obj, parent_field)
+        last[parent_id] = last.get(parent_id, 0) + POSITION_STEP
+        obj.position = last[parent_id]
+
+
+def create_sections(user, items):
+    """
+    Создает разделы из items — списка (index, data) с полями title и course.
+
+    Доступ ко всем курсам пакета проверяется одним запросом. Возвращает
+    словарь index -> результат ({"index", "id"} или {"index", "errors"}).
+    """
+    courses = dict(
+        scoped(Course.objects, user)
+        .filter(id__in={data["course"] for _, data in items})
+        .values_list("id", "owner_id")
+    )
+    results = {}
+    sections = []
+    for index, data in items:
+        if data["course"] not in courses:
+            results[index] = item_error(index, "course", "Курс не найден.")
+            continue
+        section = Section(
+            title=data["title"],
+            course_id=data["course"],
+            owner_id=courses[data["course"]],
+        )
+        sections.append((index, section))
+    if sections:
+        course_ids = {section.course_id for _, section in sections}
+        with transaction.atomic():
+            objs = [section for _, section in sections]
+            append_positions(objs, Section.objects, "course_id")
+            Section.objects.bulk_create(objs)
+            recount(course_ids)
+        invalidate_course_tree(*course_ids)
+    for index, section in sections:
+        results[index] = {"index": index, "id": section.pk}
+    return results
+
+
+def update_sections(user, items):
+    """
+    Частично обновляет разделы из items — списка (index, data) с полем id
+    и необязательными title и course.
+
+    При переносе разделов в другой курс обновляются владелец и поисковый
+    индекс их материалов и счетчики прежних и новых курсов.
+    """
+    sections = scoped(Section.objects, user).in_bulk(
+        {data["id"] for _, data in items}
+    )
+    courses = dict(
+        scoped(Course.objects, user)
+        .filter(id__in={data["course"] for _, data in items if "course" in data})
+        .values_list("id", "owner_id")
+    )
+    results = {}
+    updated = {}
+    course_ids = set()
+    moved_ids = set()
+    for index, data in items:
+        section = sections.get(data["id"])
+        if section is None:
+            results[index] = item_error(index, "id", "Раздел не найден.")
+            continue
+        if section.pk in updated:
+            results[index] = item_error(index, "id", "Раздел указан в пакете повторно.")
+            continue
+        if "course" in data and data["course"] not in courses:
+            results[index] = item_error(index, "course", "Курс не найден.")
+            continue
+        course_ids.add(section.course_id)
+        if "title" in data:
+            section.title = data["title"]
+        if "course" in data and data["course"] != section.course_id:
+            section.course_id = data["course"]
+            section.owner_id = courses[data["course"]]
+            course_ids.add(section.course_id)
+            moved_ids.add(section.pk)
+        updated[section.pk] = index
+    if updated:
+        objs = [sections[pk] for pk in updated]
+        with transaction.atomic():
+            append_positions(
+                [sections[pk] for pk in moved_ids], Section.objects, "course_id"
+            )
+            Section.objects.bulk_update(objs, ["title", "course", "owner", "position"])
+            if moved_ids:
+                moved = Material.objects.filter(section_id__in=moved_ids)
+                moved.update(
+                    owner_id=Subquery(
+                        Section.objects.filter(pk=OuterRef("section_id")).values(
+                            "owner_id"
+                        )
+                    )
+                )
+                index_materials(moved)
+                recount(course_ids)
+        invalidate_course_tree(*course_ids)
+        if moved_ids:
+            invalidate_suggestions()
+    for pk, index in updated.items():
+        results[index] = {"index": index, "id": pk}
+    return results
+
+
+def create_materials(user, items):
+    """
+    Создает материалы из items — списка (index, data) с полями title,
+    content и section.
+
+    Доступ ко всем разделам пакета проверяется одним запросом. Материалы
+    сразу добавляются в поисковый индекс.
+    """
+    sections = {
+        pk: (owner_id, course_id)
+        for pk, owner_id, course_id in scoped(Section.objects, user)
+        .filter(id__in={data["section"] for _, data in items})
+        .values_list("id", "owner_id", "course_id")
+    }
+    results = {}
+    materials = []
+    for index, data in items:
+        if data["section"] not in sections:
+            results[index] = item_error(index, "section", "Раздел не найден.")
+            continue
+        material = Material(
+            title=data["title"],
+            content=data["content"],
+            section_id=data["section"],
+            owner_id=sections[data["section"]][0],
+        )
+        materials.append((index, material))
+    if materials:
+        course_ids = {sections[material.section_id][1] for _, material in materials}
+        with transaction.atomic():
+            objs = [material for _, material in materials]
+            append_positions(objs, Material.objects, "section_id")
+            Material.objects.bulk_create(objs)
+            recount(course_ids)
+            save_entries(
+                [
+                    material_entry(material, sections[material.section_id][1])
+                    for _, material in materials
+                ]
+            )
+        invalidate_course_tree(*course_ids)
+        invalidate_suggestions()
+    for index, material in materials:
+        results[index] = {"index": index, "id": material.pk}
+    return results
+
+
+def update_materials(user, items):
+    """
+    Частично обновляет материалы из items — списка (index, data) с полем id
+    и необязательными title, content и section.
+
+    Записи поискового индекса обновляются для всех измененных материалов,
+    счетчики — только при переносе материалов между разделами.
+    """
+    materials = (
+        scoped(Material.objects, user)
+        .annotate(course_id=F("section__course_id"))
+        .in_bulk({data["id"] for _, data in items})
+    )
+    sections = {
+        pk: (owner_id, course_id)
+        for pk, owner_id, course_id in scoped(Section.objects, user)
+        .filter(id__in={data["section"] for _, data in items if "section" in data})
+        .values_list("id", "owner_id", "course_id")
+    }
+    results = {}
+    updated = {}
+    course_ids = set()
+    moved = []
+    for index, data in items:
+        material = materials.get(data["id"])
+        if material is None:
+            results[index] = item_error(index, "id", "Материал не найден.")
+            continue
+        if material.pk in updated:
+            results[index] = item_error(
+                index, "id", "Материал указан в пакете повторно."
+            )
+            continue
+        if "section" in data and data["section"] not in sections:
+            results[index] = item_error(index, "section", "Раздел не найден.")
+            continue
+        course_ids.add(material.course_id)
+        for field in ("title", "content"):
+            if field in data:
+                setattr(material, field, data[field])
+        if "section" in data and data["section"] != material.section_id:
+            material.section_id = data["section"]
+            material.owner_id, material.course_id = sections[data["section"]]
+            course_ids.add(material.course_id)
+            moved.append(material)
+        updated[material.pk] = index
+    if updated:
+        objs = [materials[pk] for pk in updated]
+        with transaction.atomic():
+            append_positions(moved, Material.objects, "section_id")
+            Material.objects.bulk_update(
+                objs, ["title", "content", "section", "owner", "position"]
+            )
+            save_entries([material_entry(material, material.course_id) for material in objs])
+            if moved:
+                recount(course_ids)
+        invalidate_course_tree(*course_ids)
+        invalidate_suggestions()
+    for pk, index in updated.items():
+        results[index] = {"index": index, "id": pk}
+    return results
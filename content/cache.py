@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Course, Material, Section
+from .serializers import CourseSerializer
+
+COURSE_TREE_KEY = "content:course_tree:{}"
+
+
+def course_tree_key(course_id):
+    """Ключ кеша сериализованного дерева курса."""
+    return COURSE_TREE_KEY.format(course_id)
+
+
+def get_course_trees(course_ids):
+    """
+    Возвращает сериализованные деревья курсов в порядке course_ids.
+
+    Готовые деревья берутся из кеша одним обращением, недостающие строятся
+    одним набором запросов (курсы, разделы, материалы) и сохраняются в кеш.
+    """
+    keys = {course_id: course_tree_key(course_id) for course_id in course_ids}
+    cached = cache.get_many(keys.values())
+    trees = {
+        course_id: cached[key] for course_id, key in keys.items() if key in cached
+    }
+    missing = [course_id for course_id in course_ids if course_id not in trees]
+    if missing:
+        courses = Course.objects.filter(id__in=missing).prefetch_related(
+            "sections__materials"
+        )
+        fresh = {course.id: dict(CourseSerializer(course).data) for course in courses}
+        cache.set_many(
+            {keys[course_id]: tree for course_id, tree in fresh.items()},
+            settings.COURSE_TREE_CACHE_TIMEOUT,
+        )
+        trees.update(fresh)
+    return [trees[course_id] for course_id in course_ids if course_id in trees]
+
+
+def invalidate_course_tree(*course_ids):
+    """Удаляет из кеша деревья указанных курсов."""
+    cache.delete_many(
+        [course_tree_key(course_id) for course_id in course_ids if course_id]
+    )
+
+
+def invalidate_course_tree_on_commit(*course_ids):
+    """
+    Удаляет из кеша деревья курсов после фиксации текущей транзакции.
+
+    Сброс до фиксации оставляет окно, в котором параллельный запрос строит
+    дерево из еще не измененных данных и кеширует его на
+    COURSE_TREE_CACHE_TIMEOUT. Вне транзакции сброс выполняется сразу.
+    """
+    transaction.on_commit(lambda: invalidate_course_tree(*course_ids))
+
+
+def section_course_id(section_id):
+    """Возвращает id курса, к которому сейчас относится раздел в БД."""
+    return (
+        Section.objects.filter(pk=section_id)
+        .values_list("course_id", flat=True)
+        .first()
+    )
+
+
+def material_course_id(material_id):
+    """Возвращает id курса, к которому сейчас относится материал в БД."""
+    return (
+        Material.objects.filter(pk=material_id)
+        .values_list("section__course_id", flat=True)
+        .first()
+    )
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .counters import recount
+from .models import Course, CourseCloneJob, Material
+from .search import index_materials
+from .suggest import invalidate_suggestions
+from .transfer import COURSE_LOOKUPS, SCHEMA
+
+
+def clone_course(source_id, owner_id, title=None, chunk_size=1000):
+    """
+    Копирует курс со всеми разделами, материалами, тестами, вопросами
+    и ответами в новый курс владельца owner_id.
+
+    Каждый уровень дерева читается пачками по chunk_size строк и вставляется
+    одним bulk_create на пачку, поэтому число запросов зависит от размера
+    курса, деленного на chunk_size, а не от количества объектов. Все
+    выполняется в одной транзакции. Возвращает созданный курс.
+    """
+    source = Course.objects.only("title", "description").get(pk=source_id)
+    with transaction.atomic():
+        course = Course.objects.create(
+            title=title or source.title,
+            description=source.description,
+            owner_id=owner_id,
+        )
+        ids = {"course": {source.pk: course.pk}}
+        for kind, model, parent_field, parent_kind, fields in SCHEMA[1:]:
+            queryset = model.objects.filter(**{COURSE_LOOKUPS[kind]: source.pk})
+            extra = {"owner_id": owner_id} if kind in ("section", "material") else {}
+            ids[kind] = copy_rows(
+                queryset, fields, parent_field, ids[parent_kind], extra, chunk_size
+            )
+        recount([course.pk])
+        index_materials(Material.objects.filter(section__course=course), chunk_size)
+    invalidate_suggestions()
+    return course
+
+
+def copy_rows(queryset, fields, parent_field, parent_ids, extra, chunk_size):
+    """
+    Вставляет копии строк queryset с родителем из parent_ids.
+    Возвращает соответствие {старый id: новый id}.
+    """
+    model = queryset.model
+    parent_column = f"{parent_field}_id"
+    ids = {}
+    last_id = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last_id)
+            .order_by("id")
+            .values("id", parent_column, *fields)[:chunk_size]
+        )
+        if not rows:
+            return ids
+        objs = [
+            model(
+                **{field: row[field] for field in fields},
+                **{parent_column: parent_ids[row[parent_column]]},
+                **extra,
+            )
+            for row in rows
+        ]
+        model.objects.bulk_create(objs)
+        ids.update((row["id"], obj.pk) for row, obj in zip(rows, objs))
+        last_id = rows[-1]["id"]
+
+
+def claim_clone_job():
+    """
+    Забирает одно ожидающее задание, не блокируя другие воркеры.
+
+    Задание, выполняемое дольше COURSE_CLONE_JOB_TIMEOUT, считается брошенным
+    остановленным воркером и забирается повторно: копирование выполняется
+    в одной транзакции, поэтому от прерванной попытки копии не остается.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.COURSE_CLONE_JOB_TIMEOUT)
+    with transaction.atomic():
+        job = (
+            CourseCloneJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=CourseCloneJob.PENDING)
+                | Q(status=CourseCloneJob.RUNNING, started_at__lt=stale)
+            )
+            .order_by("id")
+            .first()
+        )
+        if job is not None:
+            job.status = CourseCloneJob.RUNNING
+            job.started_at = now
+            job.save(update_fields=["status", "started_at"])
+    return job
+
+
+def run_clone_job(job, chunk_size=1000):
+    """Выполняет задание и сохраняет его результат или ошибку."""
+    try:
+        if job.source_id is None:
+            raise Course.DoesNotExist("Исходный курс удален")
+        job.course = clone_course(job.source_id, job.owner_id, job.title, chunk_size)
+        job.status = CourseCloneJob.DONE
+    except Exception as error:
+        job.status = CourseCloneJob.FAILED
+        job.error = str(error)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["course", "status", "error", "finished_at"])
+    return job
@@ -0,0 +1,72 @@
+from django.db.models import Count, Max, Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Course, Material, Section
+
+
+def count_of(queryset, group_by):
+    """Подзапрос COUNT(*) по queryset, сгруппированному по полю group_by."""
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(group_by)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        Value(0),
+    )
+
+
+def section_counters():
+    """Выражения для пересчета счетчиков раздела."""
+    materials = Material.objects.filter(section=OuterRef("pk"))
+    return {
+        "materials_count": count_of(materials, "section"),
+        "tests_count": count_of(materials.filter(test__isnull=False), "section"),
+    }
+
+
+def course_counters():
+    """Выражения для пересчета счетчиков курса."""
+    materials = Material.objects.filter(section__course=OuterRef("pk"))
+    return {
+        "sections_count": count_of(
+            Section.objects.filter(course=OuterRef("pk")), "course"
+        ),
+        "materials_count": count_of(materials, "section__course"),
+        "tests_count": count_of(materials.filter(test__isnull=False), "section__course"),
+    }
+
+
+def recount(course_ids=None, chunk_size=5000):
+    """
+    Пересчитывает счетчики разделов и курсов по фактическим данным.
+
+    Обновление выполняется пакетными UPDATE с подзапросами по диапазонам id,
+    без загрузки строк в память. Возвращает количество обработанных
+    разделов и курсов.
+    """
+    sections = Section.objects.all()
+    courses = Course.objects.all()
+    if course_ids is not None:
+        sections = sections.filter(course_id__in=course_ids)
+        courses = courses.filter(id__in=course_ids)
+    return (
+        _update_in_chunks(sections, section_counters(), chunk_size),
+        _update_in_chunks(courses, course_counters(), chunk_size),
+    )
+
+
+def _update_in_chunks(queryset, values, chunk_size):
+    """Выполняет queryset.update(**values) диапазонами id по chunk_size строк."""
+    # Диапазон ограничивается границами выборки, чтобы пересчет нескольких
+    # курсов не проходил по всей таблице
+    bounds = queryset.aggregate(first_id=Min("id"), last_id=Max("id"))
+    if bounds["first_id"] is None:
+        return 0
+    updated = 0
+    for start in range(bounds["first_id"] - 1, bounds["last_id"], chunk_size):
+        updated += queryset.filter(id__gt=start, id__lte=start + chunk_size).update(
+            **values
+        )
+    return updated
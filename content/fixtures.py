@@ -0,0 +1,73 @@
+from collections import defaultdict
+
+from django.db.models import OuterRef, Subquery
+
+from .cache import invalidate_course_tree
+from .counters import recount
+from .models import Course, Material, Section
+from .ordering import renumber_children
+
+# loaddata сохраняет объекты в режиме raw, минуя save() моделей, поэтому
+# денормализованные поля загруженных курсов (позиции, владельцы, счетчики)
+# восстанавливаются отдельно, после загрузки фикстуры
+# (см. команду content loaddata).
+
+
+class LoadedObjects:
+    """Собирает id объектов, сохраненных в режиме raw во время loaddata."""
+
+    def __init__(self):
+        self.ids = defaultdict(set)
+
+    def collect(self, sender, instance, raw=False, **kwargs):
+        """Обработчик post_save: запоминает объекты, загруженные из фикстуры."""
+        if raw:
+            self.ids[sender._meta.label].add(instance.pk)
+
+    def course_ids(self):
+        """Возвращает id курсов, которых касаются загруженные объекты."""
+        course_ids = set(self.ids["content.Course"])
+        course_ids.update(
+            Section.objects.filter(pk__in=self.ids["content.Section"]).values_list(
+                "course_id", flat=True
+            )
+        )
+        course_ids.update(
+            Material.objects.filter(pk__in=self.ids["content.Material"]).values_list(
+                "section__course_id", flat=True
+            )
+        )
+        course_ids.update(
+            Material.objects.filter(test__in=self.ids["testing.Test"]).values_list(
+                "section__course_id", flat=True
+            )
+        )
+        return course_ids
+
+
+def restore_courses(course_ids):
+    """Восстанавливает денормализованные данные курсов после загрузки в обход save()."""
+    if not course_ids:
+        return
+    sections = Section.objects.filter(course_id__in=course_ids)
+    # Разделы обновляются первыми: материалы берут владельца из раздела
+    sections.update(
+        owner_id=Subquery(
+            Course.objects.filter(pk=OuterRef("course_id")).values("owner_id")[:1]
+        )
+    )
+    Material.objects.filter(section__course_id__in=course_ids).update(
+        owner_id=Subquery(
+            Section.objects.filter(pk=OuterRef("section_id")).values("owner_id")[:1]
+        )
+    )
+    renumber_children(Section, "course_id", course_ids)
+    renumber_children(
+        Material,
+        "section_id",
+        sections.values("pk"),
+    )
+    recount(course_ids)
+    invalidate_course_tree(*Course.objects.filter(pk__in=course_ids).values_list(
+        "pk", flat=True
+    ))
@@ -0,0 +1,45 @@
+from django.core.management import BaseCommand
+from django.db.models import Max, OuterRef, Subquery
+
+from content.models import Course, Material, Section
+
+
+class Command(BaseCommand):
+    """Команда для заполнения владельца курса в разделах и материалах"""
+
+    help = (
+        "Копирует владельца курса (Course.owner) в разделы и материалы. "
+        "Используется для заполнения существующих данных и исправления расхождений"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Количество строк, обновляемых одним запросом",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        # Разделы обновляются первыми: материалы берут владельца из раздела
+        sections = self.backfill(
+            Section, Course.objects.filter(pk=OuterRef("course_id")), chunk_size
+        )
+        self.stdout.write(f"Обработано разделов: {sections}")
+        materials = self.backfill(
+            Material, Section.objects.filter(pk=OuterRef("section_id")), chunk_size
+        )
+        self.stdout.write(f"Обработано материалов: {materials}")
+        self.stdout.write(self.style.SUCCESS("Владельцы заполнены"))
+
+    def backfill(self, model, parent, chunk_size):
+        """Обновляет owner_id модели диапазонами id по chunk_size строк."""
+        owner = Subquery(parent.values("owner_id")[:1])
+        last_id = model.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+        processed = 0
+        for start in range(0, last_id, chunk_size):
+            processed += model.objects.filter(
+                id__gt=start, id__lte=start + chunk_size
+            ).update(owner_id=owner)
+        return processed
@@ -0,0 +1,51 @@
+from django.core.management import BaseCommand
+
+from content.transfer import export_courses
+
+
+class Command(BaseCommand):
+    """Команда для потоковой выгрузки курсов в NDJSON"""
+
+    help = (
+        "Выгружает курсы с разделами, материалами, тестами, вопросами и ответами "
+        "в формате NDJSON (по одной записи на строку)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="course_ids",
+            help="ID курса для выгрузки (можно указать несколько раз)",
+        )
+        parser.add_argument(
+            "--output",
+            default="-",
+            help="Файл для записи; по умолчанию стандартный вывод",
+        )
+        parser.add_argument(
+            "--block-size",
+            type=int,
+            default=100,
+            help="Количество курсов в одном блоке выгрузки",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Размер порции при потоковом чтении записей",
+        )
+
+    def handle(self, *args, **options):
+        if options["output"] == "-":
+            written = export_courses(
+                self.stdout, options["course_ids"], options["block_size"], options["chunk_size"]
+            )
+            self.stderr.write(f"Выгружено записей: {written}")
+            return
+        with open(options["output"], "w", encoding="utf-8") as stream:
+            written = export_courses(
+                stream, options["course_ids"], options["block_size"], options["chunk_size"]
+            )
+        self.stdout.write(self.style.SUCCESS(f"Выгружено записей: {written}"))
@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management import BaseCommand, CommandError
+
+from authentication.models import User
+from content.transfer import CourseImporter, TransferError
+
+
+class Command(BaseCommand):
+    """Команда для потоковой загрузки курсов из NDJSON"""
+
+    help = (
+        "Загружает курсы, выгруженные командой export_courses. Записи "
+        "сохраняются порциями через bulk_create с новыми первичными ключами. "
+        "Каждая порция сохраняется отдельно: при ошибке в файле уже "
+        "загруженные порции остаются в базе."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл NDJSON; '-' — стандартный ввод")
+        parser.add_argument(
+            "--owner",
+            help="Email владельца всех загружаемых курсов; по умолчанию — из файла",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Количество записей, сохраняемых одним bulk_create",
+        )
+
+    def handle(self, *args, **options):
+        owner = None
+        if options["owner"]:
+            owner = User.objects.filter(email=options["owner"]).first()
+            if owner is None:
+                raise CommandError(f"Пользователь {options['owner']} не найден")
+        importer = CourseImporter(owner, options["chunk_size"])
+        try:
+            if options["path"] == "-":
+                created = importer.run(sys.stdin)
+            else:
+                with open(options["path"], encoding="utf-8") as stream:
+                    created = importer.run(stream)
+        except TransferError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(f"Загружено записей: {created}"))
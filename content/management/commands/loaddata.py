@@ -0,0 +1,22 @@
+from django.core.management.commands import loaddata
+from django.db.models.signals import post_save
+
+from content.fixtures import LoadedObjects, restore_courses
+
+
+class Command(loaddata.Command):
+    """Команда loaddata, восстанавливающая денормализованные данные курсов"""
+
+    help = (
+        f"{loaddata.Command.help} После загрузки восстанавливает позиции, "
+        "владельцев и счетчики загруженных курсов, которые save() не заполнил."
+    )
+
+    def handle(self, *fixture_labels, **options):
+        loaded = LoadedObjects()
+        post_save.connect(loaded.collect, weak=False, dispatch_uid="content.loaddata")
+        try:
+            super().handle(*fixture_labels, **options)
+        finally:
+            post_save.disconnect(dispatch_uid="content.loaddata")
+        restore_courses(loaded.course_ids())
@@ -0,0 +1,21 @@
+from django.core.management import BaseCommand
+
+from content.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """Команда для перестроения поискового индекса курсов и материалов"""
+
+    help = "Перестраивает полнотекстовый индекс курсов и учебных материалов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Количество объектов, индексируемых одним запросом",
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_search_index(options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано объектов: {total}"))
@@ -0,0 +1,32 @@
+from django.core.management import BaseCommand
+
+from content.counters import recount
+
+
+class Command(BaseCommand):
+    """Команда для пересчета счетчиков курсов и разделов"""
+
+    help = "Пересчитывает денормализованные счетчики разделов, материалов и тестов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="course_ids",
+            help="ID курса для пересчета (можно указать несколько раз)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Количество строк, обновляемых одним запросом",
+        )
+
+    def handle(self, *args, **options):
+        sections, courses = recount(options["course_ids"], options["chunk_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Счетчики пересчитаны: разделов {sections}, курсов {courses}"
+            )
+        )
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management import BaseCommand
+
+from content.clone import claim_clone_job, run_clone_job
+from content.models import CourseCloneJob
+
+
+class Command(BaseCommand):
+    """Команда для выполнения фоновых заданий копирования курсов"""
+
+    help = "Выполняет ожидающие задания копирования курсов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Количество строк, копируемых одним bulk_create",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Интервал в секундах для работы в режиме воркера (0 — один проход)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            while (job := claim_clone_job()) is not None:
+                job = run_clone_job(job, options["chunk_size"])
+                if job.status == CourseCloneJob.DONE:
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"Курс {job.source_id} скопирован в курс {job.course_id}"
+                        )
+                    )
+                else:
+                    self.stderr.write(f"Задание {job.pk} завершилось ошибкой: {job.error}")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_owners(apps, schema_editor):
+    """Копирует владельца курса в существующие разделы и материалы."""
+    Course = apps.get_model("content", "Course")
+    Section = apps.get_model("content", "Section")
+    Material = apps.get_model("content", "Material")
+    Section.objects.update(
+        owner_id=Subquery(
+            Course.objects.filter(pk=OuterRef("course_id")).values("owner_id")
+        )
+    )
+    Material.objects.update(
+        owner_id=Subquery(
+            Section.objects.filter(pk=OuterRef("section_id")).values("owner_id")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="material",
+            name="owner",
+            field=models.ForeignKey(
+                editable=False,
+                help_text="Владелец курса материала (заполняется автоматически)",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="owned_materials",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Владелец курса",
+            ),
+        ),
+        migrations.AddField(
+            model_name="section",
+            name="owner",
+            field=models.ForeignKey(
+                editable=False,
+                help_text="Владелец курса раздела (заполняется автоматически)",
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="owned_sections",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Владелец курса",
+            ),
+        ),
+        migrations.RunPython(backfill_owners, migrations.RunPython.noop),
+    ]
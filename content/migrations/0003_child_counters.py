@@ -0,0 +1,90 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:57
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_of(queryset, group_by):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(group_by)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        Value(0),
+    )
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счетчики существующих разделов и курсов."""
+    Course = apps.get_model("content", "Course")
+    Section = apps.get_model("content", "Section")
+    Material = apps.get_model("content", "Material")
+    Test = apps.get_model("testing", "Test")
+    Section.objects.update(
+        materials_count=count_of(
+            Material.objects.filter(section=OuterRef("pk")), "section"
+        ),
+        tests_count=count_of(
+            Test.objects.filter(material__section=OuterRef("pk")), "material__section"
+        ),
+    )
+    Course.objects.update(
+        sections_count=count_of(Section.objects.filter(course=OuterRef("pk")), "course"),
+        materials_count=count_of(
+            Material.objects.filter(section__course=OuterRef("pk")), "section__course"
+        ),
+        tests_count=count_of(
+            Test.objects.filter(material__section__course=OuterRef("pk")),
+            "material__section__course",
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0002_denormalize_owner"),
+        ("testing", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="materials_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="Количество материалов"
+            ),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="sections_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="Количество разделов"
+            ),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="tests_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="Количество тестов"
+            ),
+        ),
+        migrations.AddField(
+            model_name="section",
+            name="materials_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="Количество материалов"
+            ),
+        ),
+        migrations.AddField(
+            model_name="section",
+            name="tests_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="Количество тестов"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,182 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+# Поисковый вектор: совпадения в заголовке весят больше, чем в тексте.
+# Словарь должен совпадать с content.search.SEARCH_CONFIG.
+POSTGRESQL_FORWARD = [
+    """
+    ALTER TABLE content_searchentry ADD COLUMN document tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX content_search_document_idx "
+    "ON content_searchentry USING gin (document)",
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS content_search_document_idx",
+    "ALTER TABLE content_searchentry DROP COLUMN IF EXISTS document",
+]
+# На SQLite индекс — внешняя FTS5-таблица, синхронизируемая триггерами.
+# Перестроение таблицы content_searchentry при ALTER на SQLite удаляет
+# триггеры, поэтому такие миграции должны создавать их заново.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE content_searchentry_fts USING fts5(
+        title, body, content='content_searchentry', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER content_searchentry_ai AFTER INSERT ON content_searchentry
+    BEGIN
+        INSERT INTO content_searchentry_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER content_searchentry_ad AFTER DELETE ON content_searchentry
+    BEGIN
+        INSERT INTO content_searchentry_fts(content_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER content_searchentry_au AFTER UPDATE ON content_searchentry
+    BEGIN
+        INSERT INTO content_searchentry_fts(content_searchentry_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO content_searchentry_fts(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS content_searchentry_au",
+    "DROP TRIGGER IF EXISTS content_searchentry_ad",
+    "DROP TRIGGER IF EXISTS content_searchentry_ai",
+    "DROP TABLE IF EXISTS content_searchentry_fts",
+]
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        for sql in statements.get(vendor, ()):
+            schema_editor.execute(sql)
+
+    return run
+
+
+def fill_search_index(apps, schema_editor):
+    """Индексирует существующие курсы и материалы."""
+    Course = apps.get_model("content", "Course")
+    Material = apps.get_model("content", "Material")
+    SearchEntry = apps.get_model("content", "SearchEntry")
+    SearchEntry.objects.bulk_create(
+        (
+            SearchEntry(
+                kind="course",
+                object_id=course.id,
+                course_id=course.id,
+                owner_id=course.owner_id,
+                title=course.title,
+                body=course.description,
+            )
+            for course in Course.objects.iterator()
+        ),
+        batch_size=1000,
+    )
+    materials = Material.objects.annotate(course_id=F("section__course_id"))
+    SearchEntry.objects.bulk_create(
+        (
+            SearchEntry(
+                kind="material",
+                object_id=material.id,
+                course_id=material.course_id,
+                owner_id=material.owner_id,
+                title=material.title,
+                body=material.content,
+            )
+            for material in materials.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0003_child_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("course", "Курс"), ("material", "Материал")],
+                        max_length=16,
+                        verbose_name="Тип объекта",
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField(verbose_name="ID объекта")),
+                ("title", models.CharField(max_length=255, verbose_name="Заголовок")),
+                ("body", models.TextField(blank=True, verbose_name="Текст")),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_entries",
+                        to="content.course",
+                        verbose_name="Курс",
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Владелец курса",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись поискового индекса",
+                "verbose_name_plural": "Поисковый индекс",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "object_id"),
+                        name="content_search_kind_object_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(
+            run_vendor_sql(
+                {"postgresql": POSTGRESQL_FORWARD, "sqlite": SQLITE_FORWARD}
+            ),
+            run_vendor_sql(
+                {"postgresql": POSTGRESQL_BACKWARD, "sqlite": SQLITE_BACKWARD}
+            ),
+        ),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Индексы для подсказок по заголовкам (content.suggest). Выражение
+# UPPER(title) совпадает с тем, что Django строит для icontains/istartswith.
+# На остальных СУБД подсказки ищутся по индексу в памяти процесса.
+FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX content_search_title_trgm_idx "
+    "ON content_searchentry USING gin (UPPER(title) gin_trgm_ops)",
+    "CREATE INDEX content_search_title_prefix_idx "
+    "ON content_searchentry (UPPER(title) text_pattern_ops)",
+]
+BACKWARD = [
+    "DROP INDEX IF EXISTS content_search_title_prefix_idx",
+    "DROP INDEX IF EXISTS content_search_title_trgm_idx",
+]
+
+
+def run_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == "postgresql":
+            for sql in statements:
+                schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0004_searchentry"),
+    ]
+
+    operations = [
+        migrations.RunPython(run_postgresql(FORWARD), run_postgresql(BACKWARD)),
+    ]
@@ -0,0 +1,77 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+POSITION_STEP = 1024
+
+
+def fill_positions(apps, schema_editor):
+    """Нумерует существующие разделы и материалы по id внутри родителя."""
+    for model_name, parent in (("Section", "course_id"), ("Material", "section_id")):
+        model = apps.get_model("content", model_name)
+        preceding = (
+            model.objects.filter(**{parent: OuterRef(parent)}, id__lte=OuterRef("id"))
+            .order_by()
+            .values(parent)
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        model.objects.update(position=Subquery(preceding) * POSITION_STEP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0006_courseclonejob"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="material",
+            options={
+                "ordering": ["position", "id"],
+                "verbose_name": "Учебный материал",
+                "verbose_name_plural": "Учебные материалы",
+            },
+        ),
+        migrations.AlterModelOptions(
+            name="section",
+            options={
+                "ordering": ["position", "id"],
+                "verbose_name": "Раздел курса",
+                "verbose_name_plural": "Разделы курса",
+            },
+        ),
+        migrations.AddField(
+            model_name="material",
+            name="position",
+            field=models.IntegerField(
+                blank=True,
+                default=0,
+                help_text="Порядок материала в разделе (по умолчанию — в конец раздела)",
+                verbose_name="Позиция",
+            ),
+        ),
+        migrations.AddField(
+            model_name="section",
+            name="position",
+            field=models.IntegerField(
+                blank=True,
+                default=0,
+                help_text="Порядок раздела в курсе (по умолчанию — в конец курса)",
+                verbose_name="Позиция",
+            ),
+        ),
+        migrations.RunPython(fill_positions, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="material",
+            index=models.Index(
+                fields=["section", "position", "id"], name="content_material_order_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="section",
+            index=models.Index(
+                fields=["course", "position", "id"], name="content_section_order_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("content", "0007_positions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="courseclonejob",
+            name="started_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Время, когда воркер взял задание в работу",
+                null=True,
+                verbose_name="Запущено",
+            ),
+        ),
+    ]
@@ -0,0 +1,170 @@
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from authentication.permissions import IsAdmin, IsOwner, IsTeacherOrAdmin
+
+from .cache import invalidate_course_tree
+from .ordering import move_after, reorder
+from .serializers import BulkItemsSerializer, MoveSerializer, ReorderSerializer
+
+
+class SummaryListMixin:
+    """
+    Миксин для ViewSet с облегченным представлением списка.
+
+    По умолчанию действие list возвращает краткую сводку (summary_serializer_class),
+    не загружая тяжелые вложенные данные. Полное представление возвращается
+    для retrieve и для list с параметром ?expand=true.
+    """
+
+    summary_serializer_class = None
+
+    def is_summary(self):
+        """Возвращает True, если запрос должен обслуживаться краткой сводкой."""
+        request = getattr(self, "request", None)
+        if self.action != "list" or request is None:
+            return False
+        expand = request.query_params.get("expand", "")
+        return expand.lower() not in ("1", "true", "yes")
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return self.summary_serializer_class
+        return super().get_serializer_class()
+
+
+class BulkWriteMixin:
+    """
+    Миксин для ViewSet с пакетной записью: POST <prefix>/bulk/ создает объекты,
+    PATCH <prefix>/bulk/ частично обновляет их (каждый элемент содержит id).
+
+    Элементы проверяются bulk_item_serializer_class, корректные передаются
+    в perform_bulk_create/perform_bulk_update одним списком (index, data).
+    Ответ содержит результат для каждого элемента в исходном порядке:
+    index и id либо index и errors.
+    """
+
+    bulk_item_serializer_class = None
+
+    def perform_bulk_create(self, items):
+        raise NotImplementedError
+
+    def perform_bulk_update(self, items):
+        raise NotImplementedError
+
+    @swagger_auto_schema(
+        methods=["post", "patch"],
+        request_body=BulkItemsSerializer,
+        responses={
+            200: "Результаты по каждому элементу пакета (id или errors)",
+            400: "Неверный формат данных",
+        },
+        operation_summary="Пакетное создание (POST) или изменение (PATCH)",
+    )
+    @action(
+        detail=False,
+        methods=["post", "patch"],
+        url_path="bulk",
+        permission_classes=[IsTeacherOrAdmin],
+    )
+    def bulk(self, request):
+        serializer = BulkItemsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data["items"]
+        partial = request.method == "PATCH"
+
+        results = {}
+        valid = []
+        for index, item in enumerate(items):
+            item_serializer = self.bulk_item_serializer_class(data=item, partial=partial)
+            if not item_serializer.is_valid():
+                results[index] = {"index": index, "errors": item_serializer.errors}
+            elif partial and "id" not in item_serializer.validated_data:
+                results[index] = {
+                    "index": index,
+                    "errors": {"id": ["Обязательное поле."]},
+                }
+            else:
+                valid.append((index, item_serializer.validated_data))
+
+        if valid:
+            write = self.perform_bulk_update if partial else self.perform_bulk_create
+            results.update(write(valid))
+        return Response({"results": [results[index] for index in range(len(items))]})
+
+
+class PositionMixin:
+    """
+    Миксин для ViewSet упорядоченных дочерних объектов (разделов, материалов).
+
+    - move: POST <prefix>/<id>/move/ с {"after": id | null} ставит объект после
+      соседнего элемента, обычно изменяя одну строку (см. content.ordering)
+    - reorder: POST <prefix>/reorder/ с {"parent": id, "order": [id, ...]}
+      задает порядок сразу для многих элементов родителя
+    """
+
+    position_parent_field = None
+    position_parent_model = None
+
+    def get_position_course_id(self, obj):
+        """ID курса объекта для сброса кеша дерева."""
+        raise NotImplementedError
+
+    def get_siblings(self, parent_id):
+        model = self.serializer_class.Meta.model
+        return model.objects.filter(**{f"{self.position_parent_field}_id": parent_id})
+
+    @swagger_auto_schema(
+        request_body=MoveSerializer,
+        responses={200: "Новая позиция объекта: id, position"},
+        operation_summary="Переместить среди соседних элементов",
+    )
+    @action(
+        detail=True,
+        methods=["post"],
+        permission_classes=[IsAdmin | (IsTeacherOrAdmin & IsOwner)],
+    )
+    def move(self, request, pk=None):
+        obj = self.get_object()
+        serializer = MoveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        siblings = self.get_siblings(getattr(obj, f"{self.position_parent_field}_id"))
+        after = None
+        if serializer.validated_data["after"] is not None:
+            after = (
+                siblings.exclude(pk=obj.pk)
+                .filter(pk=serializer.validated_data["after"])
+                .only("id", "position")
+                .first()
+            )
+            if after is None:
+                raise ValidationError({"after": ["Элемент не найден среди соседних."]})
+        move_after(obj, siblings, after)
+        invalidate_course_tree(self.get_position_course_id(obj))
+        return Response({"id": obj.pk, "position": obj.position})
+
+    @swagger_auto_schema(
+        request_body=ReorderSerializer,
+        responses={200: "Позиции элементов родителя: {id: position}"},
+        operation_summary="Задать порядок элементов",
+    )
+    @action(detail=False, methods=["post"], permission_classes=[IsTeacherOrAdmin])
+    def reorder(self, request):
+        serializer = ReorderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        parent_id = serializer.validated_data["parent"]
+        order = serializer.validated_data["order"]
+        parents = self.position_parent_model.objects.filter(pk=parent_id)
+        if request.user.role == "teacher":
+            parents = parents.filter(owner=request.user)
+        parent = parents.first()
+        if parent is None:
+            raise ValidationError({"parent": ["Объект не найден."]})
+        siblings = self.get_siblings(parent_id)
+        if siblings.filter(pk__in=order).count() != len(order):
+            raise ValidationError({"order": ["Все элементы должны принадлежать родителю."]})
+        positions = reorder(siblings.model, siblings, order)
+        invalidate_course_tree(getattr(parent, "course_id", parent.pk))
+        return Response({"positions": positions})
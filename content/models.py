@@ -1,10 +1,37 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+
+from .ordering import next_position
 
 User = settings.AUTH_USER_MODEL
 
 
-class Course(models.Model):
+class CounterFieldsModel(models.Model):
+    """
+    Абстрактная модель с денормализованными счетчиками.
+
+    Счетчики меняются только F-выражениями при создании и удалении дочерних
+    объектов, поэтому обычное сохранение существующего объекта их не
+    записывает и не затирает параллельные изменения устаревшими значениями.
+    """
+
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class Course(CounterFieldsModel):
     """
     Модель курса, представляющая учебный курс в системе.
     Каждый курс принадлежит преподавателю (owner) и может содержать несколько разделов.
@@ -27,6 +54,18 @@ class Course(models.Model):
         verbose_name="Владелец курса",
         help_text="Преподаватель, создавший курс",
     )
+    # Денормализованные счетчики дочерних объектов (см. команду recount)
+    sections_count = models.IntegerField(
+        default=0, editable=False, verbose_name="Количество разделов"
+    )
+    materials_count = models.IntegerField(
+        default=0, editable=False, verbose_name="Количество материалов"
+    )
+    tests_count = models.IntegerField(
+        default=0, editable=False, verbose_name="Количество тестов"
+    )
+
+    counter_fields = ("sections_count", "materials_count", "tests_count")
 
     def __str__(self):
         return self.title
@@ -35,8 +74,24 @@ class Course(models.Model):
         verbose_name = "Курс"
         verbose_name_plural = "Курсы"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_owner_id = instance.__dict__.get("owner_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохраняет курс и переносит смену владельца на его разделы и материалы."""
+        super().save(*args, **kwargs)
+        loaded_owner_id = getattr(self, "_loaded_owner_id", self.owner_id)
+        if loaded_owner_id != self.owner_id:
+            self.sections.update(owner_id=self.owner_id)
+            Material.objects.filter(section__course=self).update(owner_id=self.owner_id)
+            self.search_entries.update(owner_id=self.owner_id)
+        self._loaded_owner_id = self.owner_id
 
-class Section(models.Model):
+
+class Section(CounterFieldsModel):
     """
     Модель раздела курса. Каждый раздел принадлежит определенному курсу
     и может содержать несколько учебных материалов.
@@ -54,6 +109,31 @@ class Section(models.Model):
         verbose_name="Курс",
         help_text="Курс, к которому относится этот раздел",
     )
+    # Копия Course.owner: позволяет фильтровать и проверять права без JOIN
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        editable=False,
+        related_name="owned_sections",
+        verbose_name="Владелец курса",
+        help_text="Владелец курса раздела (заполняется автоматически)",
+    )
+    position = models.IntegerField(
+        default=0,
+        blank=True,
+        verbose_name="Позиция",
+        help_text="Порядок раздела в курсе (по умолчанию — в конец курса)",
+    )
+    # Денормализованные счетчики дочерних объектов (см. команду recount)
+    materials_count = models.IntegerField(
+        default=0, editable=False, verbose_name="Количество материалов"
+    )
+    tests_count = models.IntegerField(
+        default=0, editable=False, verbose_name="Количество тестов"
+    )
+
+    counter_fields = ("materials_count", "tests_count")
 
     def __str__(self):
         return f"{self.course.title} — {self.title}"
@@ -61,6 +141,76 @@ class Section(models.Model):
     class Meta:
         verbose_name = "Раздел курса"
         verbose_name_plural = "Разделы курса"
+        ordering = ["position", "id"]
+        indexes = [
+            models.Index(
+                fields=["course", "position", "id"], name="content_section_order_idx"
+            )
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_owner_id = instance.__dict__.get("owner_id")
+        instance._loaded_course_id = instance.__dict__.get("course_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет раздел, копируя владельца курса и обновляя счетчики курсов.
+        При переносе раздела в курс другого владельца обновляет его материалы.
+        """
+        self.owner_id = self.course.owner_id
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "course" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "owner", "position"}
+        adding = self._state.adding
+        loaded_course_id = getattr(self, "_loaded_course_id", self.course_id)
+        loaded_owner_id = getattr(self, "_loaded_owner_id", self.owner_id)
+        with transaction.atomic():
+            if (adding and not self.position) or loaded_course_id != self.course_id:
+                # Новый или перенесенный раздел ставится в конец курса
+                self.position = next_position(
+                    Section.objects.filter(course_id=self.course_id)
+                )
+            super().save(*args, **kwargs)
+            if adding:
+                Course.objects.filter(pk=self.course_id).update(
+                    sections_count=F("sections_count") + 1
+                )
+            elif loaded_course_id != self.course_id:
+                # Раздел переносится вместе со своими материалами и тестами
+                counts = Section.objects.values("materials_count", "tests_count").get(
+                    pk=self.pk
+                )
+                for course_id, sign in ((loaded_course_id, -1), (self.course_id, 1)):
+                    Course.objects.filter(pk=course_id).update(
+                        sections_count=F("sections_count") + sign,
+                        materials_count=F("materials_count")
+                        + sign * counts["materials_count"],
+                        tests_count=F("tests_count") + sign * counts["tests_count"],
+                    )
+                SearchEntry.objects.filter(
+                    kind=SearchEntry.MATERIAL, object_id__in=self.materials.values("pk")
+                ).update(course_id=self.course_id, owner_id=self.owner_id)
+            if loaded_owner_id != self.owner_id:
+                self.materials.update(owner_id=self.owner_id)
+        self._loaded_owner_id = self.owner_id
+        self._loaded_course_id = self.course_id
+
+
+def change_counters(section_id, materials=0, tests=0):
+    """
+    Атомарно изменяет счетчики материалов и тестов раздела и его курса.
+
+    Используются F-выражения, поэтому параллельные изменения не теряются.
+    """
+    changes = {
+        "materials_count": F("materials_count") + materials,
+        "tests_count": F("tests_count") + tests,
+    }
+    Section.objects.filter(pk=section_id).update(**changes)
+    Course.objects.filter(sections=section_id).update(**changes)
 
 
 # https://www.youtube.com/@sobolevn/videos
@@ -86,10 +236,184 @@ class Material(models.Model):
         verbose_name="Раздел",
         help_text="Раздел, к которому относится этот материал",
     )
+    # Копия Course.owner: позволяет фильтровать и проверять права без JOIN
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        editable=False,
+        related_name="owned_materials",
+        verbose_name="Владелец курса",
+        help_text="Владелец курса материала (заполняется автоматически)",
+    )
+    position = models.IntegerField(
+        default=0,
+        blank=True,
+        verbose_name="Позиция",
+        help_text="Порядок материала в разделе (по умолчанию — в конец раздела)",
+    )
 
     def __str__(self):
         return f"{self.section.title} — {self.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_section_id = instance.__dict__.get("section_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохраняет материал, копируя владельца курса и обновляя счетчики."""
+        self.owner_id = self.section.owner_id
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "section" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "owner", "position"}
+        adding = self._state.adding
+        loaded_section_id = getattr(self, "_loaded_section_id", self.section_id)
+        with transaction.atomic():
+            if (adding and not self.position) or loaded_section_id != self.section_id:
+                # Новый или перенесенный материал ставится в конец раздела
+                self.position = next_position(
+                    Material.objects.filter(section_id=self.section_id)
+                )
+            super().save(*args, **kwargs)
+            if adding:
+                change_counters(self.section_id, materials=1)
+            elif loaded_section_id != self.section_id:
+                # Материал переносится вместе с привязанным тестом
+                tests = int(
+                    Material.objects.filter(pk=self.pk, test__isnull=False).exists()
+                )
+                change_counters(loaded_section_id, materials=-1, tests=-tests)
+                change_counters(self.section_id, materials=1, tests=tests)
+        self._loaded_section_id = self.section_id
+
     class Meta:
         verbose_name = "Учебный материал"
         verbose_name_plural = "Учебные материалы"
+        ordering = ["position", "id"]
+        indexes = [
+            models.Index(
+                fields=["section", "position", "id"], name="content_material_order_idx"
+            )
+        ]
+
+
+class SearchEntry(models.Model):
+    """
+    Запись полнотекстового индекса по курсу или учебному материалу.
+
+    Копирует заголовок и текст объекта вместе с курсом и владельцем, чтобы
+    поиск с учетом прав выполнялся по одной таблице. Поисковый вектор
+    поддерживается СУБД: генерируемая колонка document с GIN-индексом на
+    PostgreSQL и FTS5-таблица с триггерами на SQLite (см. content.search).
+    """
+
+    COURSE = "course"
+    MATERIAL = "material"
+    KIND_CHOICES = [
+        (COURSE, "Курс"),
+        (MATERIAL, "Материал"),
+    ]
+
+    kind = models.CharField(
+        max_length=16, choices=KIND_CHOICES, verbose_name="Тип объекта"
+    )
+    object_id = models.PositiveIntegerField(verbose_name="ID объекта")
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.CASCADE,
+        related_name="search_entries",
+        verbose_name="Курс",
+    )
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name="+",
+        verbose_name="Владелец курса",
+    )
+    title = models.CharField(max_length=255, verbose_name="Заголовок")
+    body = models.TextField(blank=True, verbose_name="Текст")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id}: {self.title}"
+
+    class Meta:
+        verbose_name = "Запись поискового индекса"
+        verbose_name_plural = "Поисковый индекс"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "object_id"], name="content_search_kind_object_uniq"
+            )
+        ]
+
+
+class CourseCloneJob(models.Model):
+    """
+    Фоновое задание на копирование курса.
+
+    Создается для больших курсов вместо синхронного копирования и
+    выполняется командой run_clone_jobs (см. content.clone).
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Ожидает"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Завершено"),
+        (FAILED, "Ошибка"),
+    ]
+
+    source = models.ForeignKey(
+        Course,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="clone_jobs",
+        verbose_name="Исходный курс",
+    )
+    owner = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="course_clone_jobs",
+        verbose_name="Владелец копии",
+    )
+    title = models.CharField(
+        max_length=255, blank=True, verbose_name="Название копии"
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        verbose_name="Статус",
+    )
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name="Созданная копия",
+    )
+    error = models.TextField(blank=True, verbose_name="Ошибка")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Запущено",
+        help_text="Время, когда воркер взял задание в работу",
+    )
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершено")
+
+    def __str__(self):
+        return f"Копирование курса #{self.source_id} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Задание на копирование курса"
+        verbose_name_plural = "Задания на копирование курсов"
+        indexes = [
+            models.Index(fields=["status", "id"], name="content_clonejob_status_idx")
+        ]
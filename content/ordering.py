@@ -0,0 +1,105 @@
+from django.db.models import Max
+
+# Позиции соседних элементов идут с шагом POSITION_STEP. Перемещение элемента
+# занимает середину зазора между новыми соседями и меняет одну строку;
+# соседи перенумеровываются, только когда зазор исчерпан.
+POSITION_STEP = 1024
+
+
+def next_position(siblings):
+    """Позиция после последнего элемента siblings."""
+    last = siblings.aggregate(last=Max("position"))["last"]
+    return POSITION_STEP if last is None else last + POSITION_STEP
+
+
+def last_positions(queryset, parent_field, parent_ids):
+    """Возвращает {id родителя: последняя позиция} одним запросом."""
+    return dict(
+        queryset.filter(**{f"{parent_field}__in": parent_ids})
+        .order_by()
+        .values_list(parent_field)
+        .annotate(last=Max("position"))
+    )
+
+
+def move_after(obj, siblings, after=None):
+    """
+    Ставит obj сразу после элемента after среди siblings (None — в начало).
+
+    Обычно обновляется только строка obj. Если между новыми соседями нет
+    свободной позиции, все элементы siblings перенумеровываются.
+    """
+    siblings = siblings.exclude(pk=obj.pk).order_by("position", "id")
+    if after is None:
+        previous = None
+        following = siblings.values_list("position", flat=True).first()
+    else:
+        previous = after.position
+        following = (
+            siblings.filter(position__gt=previous)
+            .values_list("position", flat=True)
+            .first()
+        )
+    if previous is None and following is None:
+        position = POSITION_STEP
+    elif previous is None:
+        position = following - POSITION_STEP
+    elif following is None:
+        position = previous + POSITION_STEP
+    elif following - previous > 1:
+        position = (previous + following) // 2
+    else:
+        ordered = list(siblings.values_list("pk", flat=True))
+        ordered.insert(ordered.index(after.pk) + 1, obj.pk)
+        obj.position = renumber(type(obj), ordered)[obj.pk]
+        return obj.position
+    type(obj).objects.filter(pk=obj.pk).update(position=position)
+    obj.position = position
+    return position
+
+
+def renumber(model, ids):
+    """
+    Присваивает объектам ids позиции с шагом POSITION_STEP в заданном порядке
+    одним bulk_update. Возвращает {id: позиция}.
+    """
+    positions = {pk: (index + 1) * POSITION_STEP for index, pk in enumerate(ids)}
+    model.objects.bulk_update(
+        [model(pk=pk, position=position) for pk, position in positions.items()],
+        ["position"],
+        batch_size=1000,
+    )
+    return positions
+
+
+def reorder(model, siblings, ids):
+    """
+    Ставит элементы ids первыми в указанном порядке, остальные элементы
+    siblings сохраняют взаимный порядок и идут следом.
+    """
+    rest = (
+        siblings.exclude(pk__in=ids)
+        .order_by("position", "id")
+        .values_list("pk", flat=True)
+    )
+    return renumber(model, [*ids, *rest])
+
+
+def renumber_children(model, parent_field, parent_ids):
+    """
+    Перенумеровывает элементы родителей parent_ids с шагом POSITION_STEP,
+    сохраняя текущий порядок (position, id). Используется после загрузки
+    строк в обход save(), например из фикстур. Возвращает число элементов.
+    """
+    rows = (
+        model.objects.filter(**{f"{parent_field}__in": parent_ids})
+        .order_by(parent_field, "position", "id")
+        .values_list("pk", parent_field)
+    )
+    objs = []
+    counts = {}
+    for pk, parent_id in rows:
+        counts[parent_id] = counts.get(parent_id, 0) + 1
+        objs.append(model(pk=pk, position=counts[parent_id] * POSITION_STEP))
+    model.objects.bulk_update(objs, ["position"], batch_size=1000)
+    return len(objs)
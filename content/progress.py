@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, FilteredRelation, Q
+
+from .models import Section
+
+COURSE_PROGRESS_KEY = "content:course_progress:{}:{}"
+
+
+def course_progress_key(user_id, course_id):
+    """Ключ кеша прогресса пользователя по курсу."""
+    return COURSE_PROGRESS_KEY.format(user_id, course_id)
+
+
+def compute_course_progress(user_id, course_id):
+    """
+    Вычисляет прогресс пользователя по разделам курса одним сгруппированным запросом.
+
+    Тест считается пройденным, если в сводке пользователя (UserTestSummary)
+    есть дата первого успешного прохождения. Материал считается изученным,
+    если пройден привязанный к нему тест.
+    """
+    sections = (
+        Section.objects.filter(course_id=course_id)
+        .annotate(
+            user_summary=FilteredRelation(
+                "materials__test__summaries",
+                condition=Q(materials__test__summaries__user_id=user_id),
+            )
+        )
+        .values("id", "title")
+        .annotate(
+            materials_total=Count("materials", distinct=True),
+            tests_total=Count("materials__test", distinct=True),
+            tests_passed=Count(
+                "user_summary",
+                filter=Q(user_summary__first_passed_at__isnull=False),
+                distinct=True,
+            ),
+        )
+        .order_by("position", "id")
+    )
+    sections = [
+        dict(section, materials_completed=section["tests_passed"])
+        for section in sections
+    ]
+    totals = {
+        field: sum(section[field] for section in sections)
+        for field in (
+            "materials_total",
+            "materials_completed",
+            "tests_total",
+            "tests_passed",
+        )
+    }
+    return {"course": course_id, **totals, "sections": sections}
+
+
+def get_course_progress(user_id, course_id):
+    """Возвращает прогресс пользователя по курсу, используя кеш."""
+    key = course_progress_key(user_id, course_id)
+    progress = cache.get(key)
+    if progress is None:
+        progress = compute_course_progress(user_id, course_id)
+        cache.set(key, progress, settings.COURSE_PROGRESS_CACHE_TIMEOUT)
+    return progress
+
+
+def invalidate_course_progress(pairs):
+    """Сбрасывает кеш прогресса для пар (user_id, course_id)."""
+    cache.delete_many(
+        [
+            course_progress_key(user_id, course_id)
+            for user_id, course_id in pairs
+            if course_id
+        ]
+    )
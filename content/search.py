@@ -0,0 +1,244 @@
+import re
+
+from django.contrib.postgres.search import (SearchHeadline, SearchQuery,
+                                            SearchRank, SearchVectorField)
+from django.db import connections
+from django.db.models import F, FloatField
+from django.db.models.expressions import Col, Expression, RawSQL
+from django.utils.html import escape
+
+from .models import Course, Material, SearchEntry
+from .suggest import invalidate_suggestions
+
+# Конфигурация словаря PostgreSQL; должна совпадать с выражением
+# генерируемой колонки document в миграции 0004_searchentry
+SEARCH_CONFIG = "russian"
+# FTS5-таблица SQLite, синхронизируемая триггерами с content_searchentry
+FTS_TABLE = "content_searchentry_fts"
+SNIPPET_START = "<b>"
+SNIPPET_STOP = "</b>"
+# Служебные метки совпадений во фрагменте: текст экранируется после
+# построения фрагмента, затем метки заменяются на SNIPPET_START/SNIPPET_STOP
+MARK_START = "\x02"
+MARK_STOP = "\x03"
+SNIPPET_WORDS = 16
+
+WORD_RE = re.compile(r"\w+")
+
+
+def course_entry(course):
+    """Запись индекса для курса."""
+    return SearchEntry(
+        kind=SearchEntry.COURSE,
+        object_id=course.pk,
+        course_id=course.pk,
+        owner_id=course.owner_id,
+        title=course.title,
+        body=course.description,
+    )
+
+
+def material_entry(material, course_id):
+    """Запись индекса для учебного материала курса course_id."""
+    return SearchEntry(
+        kind=SearchEntry.MATERIAL,
+        object_id=material.pk,
+        course_id=course_id,
+        owner_id=material.owner_id,
+        title=material.title,
+        body=material.content,
+    )
+
+
+def save_entries(entries):
+    """Вставляет или обновляет записи индекса одним запросом (upsert)."""
+    SearchEntry.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=["kind", "object_id"],
+        update_fields=["course", "owner", "title", "body"],
+    )
+
+
+def index_course(course):
+    """Обновляет запись индекса курса."""
+    save_entries([course_entry(course)])
+
+
+def index_material(material):
+    """Обновляет запись индекса материала."""
+    save_entries([material_entry(material, material.section.course_id)])
+
+
+def unindex_material(material_id):
+    """Удаляет запись индекса материала."""
+    unindex_materials([material_id])
+
+
+def unindex_materials(material_ids):
+    """Удаляет записи индекса материалов одним запросом."""
+    SearchEntry.objects.filter(
+        kind=SearchEntry.MATERIAL, object_id__in=material_ids
+    ).delete()
+
+
+def index_materials(queryset, chunk_size=1000):
+    """
+    Обновляет записи индекса материалов из queryset пачками по chunk_size.
+    Используется после пакетных изменений, минующих сигналы. Возвращает
+    количество проиндексированных материалов.
+    """
+    materials = queryset.annotate(course_id=F("section__course_id")).only(
+        "id", "title", "content", "owner_id"
+    )
+    total = 0
+    for chunk in _chunks(materials, chunk_size):
+        save_entries([material_entry(material, material.course_id) for material in chunk])
+        total += len(chunk)
+    return total
+
+
+def rebuild_search_index(chunk_size=1000):
+    """
+    Перестраивает поисковый индекс по всем курсам и материалам.
+
+    Объекты читаются пачками по диапазонам id, записи сохраняются upsert-ом,
+    записи удаленных объектов удаляются. Возвращает количество
+    проиндексированных объектов.
+    """
+    total = 0
+    courses = Course.objects.only("id", "title", "description", "owner_id")
+    for chunk in _chunks(courses, chunk_size):
+        save_entries([course_entry(course) for course in chunk])
+        total += len(chunk)
+    total += index_materials(Material.objects.all(), chunk_size)
+    SearchEntry.objects.filter(kind=SearchEntry.COURSE).exclude(
+        object_id__in=Course.objects.values("pk")
+    ).delete()
+    SearchEntry.objects.filter(kind=SearchEntry.MATERIAL).exclude(
+        object_id__in=Material.objects.values("pk")
+    ).delete()
+    invalidate_suggestions()
+    return total
+
+
+def _chunks(queryset, chunk_size):
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_id).order_by("pk")[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1].pk
+
+
+class Document(Expression):
+    """
+    Колонка document записи индекса (есть только в PostgreSQL, полем модели
+    не описана). Ссылается на псевдоним таблицы в запросе, поэтому работает
+    и во вложенных подзапросах.
+    """
+
+    output_field = SearchVectorField()
+
+    def resolve_expression(self, query=None, *args, **kwargs):
+        target = SearchVectorField()
+        target.set_attributes_from_name("document")
+        return Col(query.get_initial_alias(), target)
+
+
+def search_entries(queryset, text):
+    """
+    Отбирает записи индекса, подходящие под запрос text, по убыванию релевантности.
+
+    Каждая запись аннотируется полем rank (больше — релевантнее, совпадения
+    в заголовке весят больше, чем в тексте). Текст записей не загружается,
+    фрагменты для страницы результатов добавляет attach_snippets.
+    """
+    words = WORD_RE.findall(text)
+    if not words:
+        return queryset.none()
+    if connections[queryset.db].vendor == "postgresql":
+        query = _postgresql_query(text)
+        queryset = (
+            queryset.alias(document=Document())
+            .filter(document=query)
+            .annotate(rank=SearchRank(F("document"), query))
+        )
+    else:
+        match = _fts_query(words)
+        table = SearchEntry._meta.db_table
+        queryset = queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+        ).annotate(
+            # bm25 возвращает меньшие значения для лучших совпадений
+            rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.rowid = {table}.id",
+                (match,),
+                output_field=FloatField(),
+            )
+        )
+    return queryset.defer("body").order_by("-rank", "id")
+
+
+def attach_snippets(entries, text):
+    """
+    Добавляет записям атрибут snippet — фрагмент текста с подсветкой совпадений.
+
+    Фрагменты строятся в БД одним запросом только для переданных записей
+    (обычно одной страницы результатов), полный текст в приложение не передается.
+    """
+    entries = list(entries)
+    ids = [entry.id for entry in entries]
+    snippets = {}
+    words = WORD_RE.findall(text)
+    if ids and words:
+        connection = connections[SearchEntry.objects.db]
+        if connection.vendor == "postgresql":
+            headline = SearchHeadline(
+                "body",
+                _postgresql_query(text),
+                config=SEARCH_CONFIG,
+                start_sel=MARK_START,
+                stop_sel=MARK_STOP,
+                max_words=SNIPPET_WORDS * 2,
+                min_words=SNIPPET_WORDS,
+            )
+            snippets = dict(
+                SearchEntry.objects.filter(id__in=ids)
+                .annotate(snippet=headline)
+                .values_list("id", "snippet")
+            )
+        else:
+            placeholders = ", ".join(["%s"] * len(ids))
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT rowid, snippet({FTS_TABLE}, 1, %s, %s, '…', %s) "
+                    f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                    f"AND rowid IN ({placeholders})",
+                    [MARK_START, MARK_STOP, SNIPPET_WORDS, _fts_query(words), *ids],
+                )
+                snippets = dict(cursor.fetchall())
+    for entry in entries:
+        entry.snippet = _highlight(snippets.get(entry.id, ""))
+    return entries
+
+
+def _highlight(snippet):
+    # Текст записи выводится как HTML: экранируется все, кроме меток совпадений
+    return (
+        escape(snippet)
+        .replace(MARK_START, SNIPPET_START)
+        .replace(MARK_STOP, SNIPPET_STOP)
+    )
+
+
+def _postgresql_query(text):
+    return SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+
+
+def _fts_query(words):
+    # Каждое слово берется в кавычки, чтобы пользовательский ввод
+    # не интерпретировался как синтаксис запросов FTS5
+    return " ".join(f'"{word}"' for word in words)
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import Course, Material, Section
+from .models import Course, CourseCloneJob, Material, SearchEntry, Section
 
 
 class MaterialSerializer(serializers.ModelSerializer):
@@ -12,6 +12,8 @@ class MaterialSerializer(serializers.ModelSerializer):
     class Meta:
         model = Material
         fields = "__all__"
+        # Порядок меняется действиями move и reorder
+        read_only_fields = ["position"]
 
 
 class SectionSerializer(serializers.ModelSerializer):
@@ -25,6 +27,7 @@ class SectionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Section
         fields = "__all__"
+        read_only_fields = ["position"]
 
 
 class CourseSerializer(serializers.ModelSerializer):
@@ -40,3 +43,156 @@ class CourseSerializer(serializers.ModelSerializer):
         model = Course
         fields = "__all__"
         read_only_fields = ["owner"]
+
+
+class SectionSummarySerializer(serializers.ModelSerializer):
+    """
+    Краткий сериализатор раздела для списков.
+    Возвращает идентификаторы, название и денормализованные счетчики.
+    """
+
+    class Meta:
+        model = Section
+        fields = ["id", "title", "course", "position", "materials_count", "tests_count"]
+
+
+class CourseSummarySerializer(serializers.ModelSerializer):
+    """
+    Краткий сериализатор курса для каталога.
+    Не включает вложенные разделы, количество потомков берется из счетчиков курса.
+    """
+
+    class Meta:
+        model = Course
+        fields = [
+            "id",
+            "title",
+            "owner",
+            "sections_count",
+            "materials_count",
+            "tests_count",
+        ]
+
+
+class SearchResultSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор результата полнотекстового поиска.
+    Вместо полного текста возвращает фрагмент с подсветкой совпадений.
+    """
+
+    snippet = serializers.CharField(read_only=True)
+    rank = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = SearchEntry
+        fields = ["kind", "object_id", "course", "title", "snippet", "rank"]
+
+
+class BulkItemsSerializer(serializers.Serializer):
+    """
+    Сериализатор пакетной записи разделов или материалов.
+    Каждый элемент проверяется отдельно, чтобы ошибки одного элемента
+    не отклоняли весь пакет.
+    """
+
+    items = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=1000,
+        help_text="Список объектов; для PATCH каждый элемент содержит id",
+    )
+
+
+class SectionBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Элемент пакетной записи разделов.
+    Курс передается идентификатором: доступ к курсам проверяется
+    для всего пакета одним запросом.
+    """
+
+    id = serializers.IntegerField(required=False)
+    course = serializers.IntegerField()
+
+    class Meta:
+        model = Section
+        fields = ["id", "title", "course"]
+
+
+class MaterialBulkItemSerializer(serializers.ModelSerializer):
+    """
+    Элемент пакетной записи материалов.
+    Раздел передается идентификатором: доступ к разделам проверяется
+    для всего пакета одним запросом.
+    """
+
+    id = serializers.IntegerField(required=False)
+    section = serializers.IntegerField()
+
+    class Meta:
+        model = Material
+        fields = ["id", "title", "content", "section"]
+
+
+class CourseCloneSerializer(serializers.Serializer):
+    """
+    Параметры копирования курса.
+    """
+
+    title = serializers.CharField(
+        max_length=255,
+        required=False,
+        help_text="Название копии; по умолчанию — название исходного курса",
+    )
+    background = serializers.BooleanField(
+        default=False, help_text="Выполнить копирование фоновым заданием"
+    )
+
+
+class CourseCloneJobSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор фонового задания копирования курса.
+    """
+
+    class Meta:
+        model = CourseCloneJob
+        fields = [
+            "id",
+            "source",
+            "title",
+            "status",
+            "course",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+
+
+class MoveSerializer(serializers.Serializer):
+    """
+    Параметры перемещения раздела или материала среди соседних.
+    """
+
+    after = serializers.IntegerField(
+        allow_null=True,
+        help_text="ID элемента, после которого нужно поставить объект; null — в начало",
+    )
+
+
+class ReorderSerializer(serializers.Serializer):
+    """
+    Новый порядок дочерних элементов курса или раздела.
+    """
+
+    parent = serializers.IntegerField(help_text="ID курса (для разделов) или раздела")
+    order = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=1000,
+        help_text="ID элементов в новом порядке; неуказанные идут следом",
+    )
+
+    def validate_order(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError("Элементы не должны повторяться.")
+        return value
@@ -0,0 +1,150 @@
+from threading import local
+
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .cache import (invalidate_course_tree_on_commit, material_course_id,
+                    section_course_id)
+from .counters import recount
+from .models import Course, Material, Section, change_counters
+from .search import (index_course, index_material, unindex_material,
+                     unindex_materials)
+from .suggest import invalidate_suggestions
+
+# Курсы, разделы, материалы и тесты, удаляемые текущим каскадом в потоке
+_deleting = local()
+
+
+@receiver(pre_delete, sender=Course)
+@receiver(pre_delete, sender=Section)
+@receiver(pre_delete, sender=Material)
+@receiver(pre_delete, sender="testing.Test")
+def mark_deleting(sender, instance, origin=None, **kwargs):
+    """
+    Запоминает объекты, удаляемые вместе с origin.
+
+    Django рассылает pre_delete для всего каскада до удаления первой строки,
+    поэтому в post_delete потомка видно, что его родитель тоже удаляется.
+    Отметки хранятся до следующего удаления с другим origin.
+    """
+    if origin is None or getattr(_deleting, "origin", None) is not origin:
+        _deleting.origin = origin
+        _deleting.objects = {}
+    _deleting.objects[(sender, instance.pk)] = instance
+
+
+def deleting(model, pk):
+    """Возвращает объект, если он удаляется текущим каскадом, иначе None."""
+    return getattr(_deleting, "objects", {}).get((model, pk))
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_course(sender, instance, **kwargs):
+    """Сбрасывает кеш дерева при изменении или удалении курса."""
+    invalidate_course_tree_on_commit(instance.pk)
+
+
+@receiver(pre_save, sender=Section)
+def invalidate_section_previous_course(sender, instance, **kwargs):
+    """При переносе раздела в другой курс сбрасывает кеш прежнего курса."""
+    if instance.pk:
+        invalidate_course_tree_on_commit(section_course_id(instance.pk))
+
+
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def invalidate_section(sender, instance, **kwargs):
+    """Сбрасывает кеш дерева курса при изменении или удалении раздела."""
+    invalidate_course_tree_on_commit(instance.course_id)
+
+
+@receiver(pre_save, sender=Material)
+def invalidate_material_previous_course(sender, instance, **kwargs):
+    """При переносе материала в другой раздел сбрасывает кеш прежнего курса."""
+    if instance.pk:
+        invalidate_course_tree_on_commit(material_course_id(instance.pk))
+
+
+@receiver(post_save, sender=Material)
+@receiver(post_delete, sender=Material)
+def invalidate_material(sender, instance, signal, **kwargs):
+    """Сбрасывает кеш дерева курса при изменении или удалении материала."""
+    if signal is post_delete and deleting(Section, instance.section_id):
+        # Кеш курса сбросит удаление раздела
+        return
+    invalidate_course_tree_on_commit(section_course_id(instance.section_id))
+
+
+@receiver(post_delete, sender=Section)
+def decrement_section_counters(sender, instance, **kwargs):
+    """
+    Обновляет счетчики курса при удалении раздела.
+    Материалы и тесты раздела свои счетчики не меняют, поэтому курс
+    пересчитывается один раз. Если удаляется и курс, ничего не делает.
+    """
+    if not deleting(Course, instance.course_id):
+        recount([instance.course_id])
+
+
+@receiver(post_delete, sender=Material)
+def decrement_material_counters(sender, instance, **kwargs):
+    """
+    Уменьшает счетчики материалов раздела и курса при удалении материала,
+    если раздел не удаляется вместе с ним.
+    """
+    if not deleting(Section, instance.section_id):
+        change_counters(instance.section_id, materials=-1)
+
+
+@receiver(post_save, sender=Course)
+def index_saved_course(sender, instance, **kwargs):
+    """Обновляет запись поискового индекса курса."""
+    index_course(instance)
+
+
+@receiver(post_save, sender=Material)
+def index_saved_material(sender, instance, **kwargs):
+    """Обновляет запись поискового индекса материала."""
+    index_material(instance)
+
+
+@receiver(post_delete, sender=Material)
+def unindex_deleted_material(sender, instance, **kwargs):
+    """
+    Удаляет материал из поискового индекса.
+    Материалы удаляемого раздела убирает из индекса сам раздел.
+    """
+    if not deleting(Section, instance.section_id):
+        unindex_material(instance.pk)
+
+
+@receiver(post_delete, sender=Section)
+def unindex_deleted_section_materials(sender, instance, **kwargs):
+    """
+    Удаляет из поискового индекса материалы раздела одним запросом.
+    Записи курса удаляются каскадно вместе с курсом.
+    """
+    if deleting(Course, instance.course_id):
+        return
+    material_ids = [
+        pk
+        for (model, pk), material in _deleting.objects.items()
+        if model is Material and material.section_id == instance.pk
+    ]
+    if material_ids:
+        unindex_materials(material_ids)
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Section)
+@receiver(post_save, sender=Material)
+@receiver(post_delete, sender=Material)
+def invalidate_title_suggestions(sender, **kwargs):
+    """
+    Помечает устаревшим индекс подсказок заголовков.
+    Раздел учитывается из-за переноса материалов в курс другого владельца.
+    """
+    invalidate_suggestions()
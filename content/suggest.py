@@ -0,0 +1,143 @@
+import threading
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Length
+
+from .models import SearchEntry
+
+# Жесткий предел количества подсказок в одном ответе
+SUGGEST_LIMIT = 10
+# Запросы короче длины триграммы ищут по началу заголовка
+TRIGRAM = 3
+SUGGEST_VERSION_KEY = "content:suggest_version"
+
+SUGGESTION_FIELDS = ("kind", "object_id", "course_id", "title")
+
+
+def normalize(text):
+    """Приводит строку к виду для сравнения: нижний регистр, одиночные пробелы."""
+    return " ".join(text.casefold().split())
+
+
+def trigrams(text):
+    """Множество триграмм нормализованной строки."""
+    return {text[i : i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)}
+
+
+class TitleIndex:
+    """
+    Индекс заголовков курсов и материалов в памяти процесса.
+
+    Используется вместо триграммных индексов PostgreSQL на остальных СУБД.
+    Запросы от трех символов ищут подстроку: кандидаты отбираются
+    пересечением списков триграмм и проверяются сравнением строк.
+    Более короткие запросы ищут по началу заголовка через словарь префиксов.
+    """
+
+    def __init__(self, rows):
+        self.rows = []
+        self.titles = []
+        self.trigrams = defaultdict(set)
+        self.prefixes = defaultdict(set)
+        for position, (owner_id, *suggestion) in enumerate(rows):
+            title = normalize(suggestion[-1])
+            self.rows.append((owner_id, dict(zip(SUGGESTION_FIELDS, suggestion))))
+            self.titles.append(title)
+            for gram in trigrams(title):
+                self.trigrams[gram].add(position)
+            for size in range(1, TRIGRAM):
+                if len(title) >= size:
+                    self.prefixes[title[:size]].add(position)
+
+    def search(self, text, owner_id=None, limit=SUGGEST_LIMIT):
+        """Подсказки по запросу text: сначала совпадения с начала, затем короче."""
+        text = normalize(text)
+        if len(text) < TRIGRAM:
+            candidates = self.prefixes.get(text, ())
+        else:
+            postings = sorted(
+                (self.trigrams.get(gram, set()) for gram in trigrams(text)), key=len
+            )
+            candidates = set.intersection(*postings)
+        matches = [
+            position
+            for position in candidates
+            if text in self.titles[position]
+            and (owner_id is None or self.rows[position][0] == owner_id)
+        ]
+        matches.sort(
+            key=lambda position: (
+                not self.titles[position].startswith(text),
+                len(self.titles[position]),
+                self.rows[position][1]["object_id"],
+            )
+        )
+        return [self.rows[position][1] for position in matches[:limit]]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_title_index():
+    """
+    Возвращает индекс заголовков процесса, перестраивая его после изменений.
+
+    Версия индекса хранится в общем кеше (CACHES), поэтому изменение,
+    сделанное в одном процессе, в том числе management-командой, приводит
+    к перестроению индекса во всех остальных при следующем обращении.
+    """
+    global _index, _index_version
+    version = cache.get(SUGGEST_VERSION_KEY)
+    if version is None:
+        cache.add(SUGGEST_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(SUGGEST_VERSION_KEY)
+    if _index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                rows = SearchEntry.objects.values_list("owner_id", *SUGGESTION_FIELDS)
+                _index = TitleIndex(rows.iterator())
+                _index_version = version
+    return _index
+
+
+def invalidate_suggestions():
+    """Помечает индекс заголовков устаревшим во всех процессах (через общий кеш)."""
+    cache.delete(SUGGEST_VERSION_KEY)
+
+
+def suggest(text, owner_id=None, limit=SUGGEST_LIMIT):
+    """
+    Подсказки заголовков курсов и материалов для ввода text.
+
+    Возвращает не более limit словарей с полями kind, object_id, course_id
+    и title. Если указан owner_id, учитываются только курсы этого владельца.
+    На PostgreSQL используются индексы по UPPER(title): триграммный GIN для
+    поиска подстроки и text_pattern_ops для поиска по началу заголовка.
+    """
+    limit = max(1, min(limit, SUGGEST_LIMIT))
+    if not normalize(text):
+        return []
+    if connections[SearchEntry.objects.db].vendor != "postgresql":
+        return get_title_index().search(text, owner_id, limit)
+    text = " ".join(text.split())
+    queryset = SearchEntry.objects.all()
+    if owner_id is not None:
+        queryset = queryset.filter(owner_id=owner_id)
+    if len(text) < TRIGRAM:
+        queryset = queryset.filter(title__istartswith=text)
+    else:
+        queryset = queryset.filter(title__icontains=text)
+    queryset = queryset.annotate(
+        is_prefix=Case(
+            When(title__istartswith=text, then=Value(0)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+    ).order_by("is_prefix", Length("title"), "object_id")
+    return list(queryset.values(*SUGGESTION_FIELDS)[:limit])
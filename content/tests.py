@@ -1,9 +1,31 @@
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.backends.postgresql.base import \
+    DatabaseWrapper as PostgreSQLDatabaseWrapper
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from authentication.models import User
-from content.models import Course, Material, Section
+from content.cache import course_tree_key
+from content.clone import claim_clone_job
+from content.models import (Course, CourseCloneJob, Material, SearchEntry,
+                            Section)
+from content.ordering import POSITION_STEP
+from content.search import search_entries
+
+from testing.models import Answer, Question, Test
 
 from .serializers import (CourseSerializer, MaterialSerializer,
                           SectionSerializer)
@@ -177,7 +199,7 @@ class SectionViewSetTests(APITestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        titles = [item["title"] for item in response.data]
+        titles = [item["title"] for item in response.data["results"]]
         self.assertIn("Test Section", titles)
         self.assertNotIn("Other Section", titles)
 
@@ -236,6 +258,1130 @@ class MaterialViewSetTests(APITestCase):
         response = self.client.get(url)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        titles = [item["title"] for item in response.data]
+        titles = [item["title"] for item in response.data["results"]]
         self.assertIn("Test Material", titles)
         self.assertNotIn("Other Material", titles)
+
+
+class CourseTreeQueryCountTests(APITestCase):
+    """
+    Тесты количества SQL-запросов при выдаче вложенного дерева курсов.
+    Количество запросов не должно зависеть от размера каталога.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: преподаватель и студент."""
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.student = User.objects.create_user(
+            email="student@example.com", password="studentpass", role="student"
+        )
+
+    def _create_courses(self, count):
+        """Создает курсы с двумя разделами и двумя материалами в каждом."""
+        for i in range(count):
+            course = Course.objects.create(title=f"Course {i}", owner=self.teacher)
+            for j in range(2):
+                section = Section.objects.create(title=f"Section {j}", course=course)
+                for k in range(2):
+                    Material.objects.create(
+                        title=f"Material {k}", content="Content", section=section
+                    )
+
+    def _count_queries(self, user, url):
+        """Выполняет GET-запрос с холодным кешем и возвращает количество запросов."""
+        self.client.force_authenticate(user=user)
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_course_list_query_count_is_constant(self):
+        """Количество запросов списка курсов не растет вместе с каталогом."""
+        url = reverse("content:courses-list") + "?expand=true"
+        self._create_courses(2)
+        small = self._count_queries(self.student, url)
+        self._create_courses(5)
+        large = self._count_queries(self.student, url)
+        self.assertEqual(small, large)
+        self.assertEqual(self._count_queries(self.teacher, url), large)
+
+    def test_section_list_query_count_is_constant(self):
+        """Количество запросов списка разделов не растет вместе с каталогом."""
+        url = reverse("content:sections-list") + "?expand=true"
+        self._create_courses(2)
+        small = self._count_queries(self.student, url)
+        self._create_courses(5)
+        self.assertEqual(self._count_queries(self.student, url), small)
+
+
+class SummaryListTests(APITestCase):
+    """
+    Тесты краткого представления списков курсов и разделов.
+    Проверяет, что содержимое материалов не попадает в ответ и не загружается.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: курс с разделом и двумя материалами."""
+        self.student = User.objects.create_user(
+            email="student@example.com", password="studentpass", role="student"
+        )
+        teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.course = Course.objects.create(title="Test Course", owner=teacher)
+        self.section = Section.objects.create(title="Test Section", course=self.course)
+        for i in range(2):
+            Material.objects.create(
+                title=f"Material {i}", content="Secret Content", section=self.section
+            )
+        self.client.force_authenticate(user=self.student)
+
+    def test_course_list_returns_summary(self):
+        """Список курсов содержит счетчики и не содержит вложенных разделов."""
+        url = reverse("content:courses-list")
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item = response.data["results"][0]
+        self.assertEqual(item["sections_count"], 1)
+        self.assertEqual(item["materials_count"], 2)
+        self.assertNotIn("sections", item)
+        for query in context.captured_queries:
+            self.assertNotIn('"content"', query["sql"])
+
+    def test_section_list_returns_summary(self):
+        """Список разделов содержит количество материалов без их содержимого."""
+        response = self.client.get(reverse("content:sections-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["materials_count"], 2)
+        self.assertNotIn("materials", response.data["results"][0])
+
+    def test_expand_returns_full_tree(self):
+        """Параметр expand возвращает полное дерево с содержимым материалов."""
+        response = self.client.get(reverse("content:courses-list") + "?expand=true")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        materials = response.data["results"][0]["sections"][0]["materials"]
+        self.assertEqual(materials[0]["content"], "Secret Content")
+
+
+class KeysetPaginationTests(APITestCase):
+    """
+    Тесты курсорной пагинации списков.
+    Проверяет обход всех страниц и режимы подсчета общего количества.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: 25 курсов одного преподавателя."""
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        Course.objects.bulk_create(
+            Course(title=f"Course {i}", owner=self.teacher) for i in range(25)
+        )
+        self.client.force_authenticate(user=self.teacher)
+
+    def test_cursor_pages_cover_all_courses(self):
+        """Обход по ссылкам next возвращает все курсы без повторов."""
+        url = reverse("content:courses-list") + "?page_size=10"
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            seen.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_count_modes(self):
+        """Параметр count возвращает точное или оценочное количество."""
+        url = reverse("content:courses-list")
+        response = self.client.get(url + "?count=exact")
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 20)
+        response = self.client.get(url + "?count=estimate")
+        self.assertIn("count", response.data)
+
+
+class CourseTreeCacheTests(APITestCase):
+    """
+    Тесты кеша сериализованных деревьев курсов.
+    Проверяет обслуживание чтений из кеша и точную инвалидацию.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: курс с разделом и материалом."""
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.other_teacher = User.objects.create_user(
+            email="other_teacher@example.com", password="testpass", role="teacher"
+        )
+        self.course = Course.objects.create(title="Test Course", owner=self.teacher)
+        self.section = Section.objects.create(title="Test Section", course=self.course)
+        self.material = Material.objects.create(
+            title="Test Material", content="Test Content", section=self.section
+        )
+        self.url = reverse("content:courses-detail", args=[self.course.id])
+        self.client.force_authenticate(user=self.teacher)
+
+    def test_hot_retrieve_uses_single_query(self):
+        """Повторное чтение курса выполняется одним запросом."""
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["title"], "Test Course")
+        self.assertEqual(
+            response.data["sections"][0]["materials"][0]["title"], "Test Material"
+        )
+
+    def test_material_change_invalidates_tree(self):
+        """Изменение материала сбрасывает кеш дерева его курса."""
+        self.client.get(self.url)
+        self.material.title = "Updated Material"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.material.save()
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response.data["sections"][0]["materials"][0]["title"], "Updated Material"
+        )
+
+    def test_tree_is_invalidated_after_commit(self):
+        """
+        Кеш сбрасывается после фиксации транзакции: дерево, закешированное
+        параллельным запросом до фиксации, не переживает изменение.
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.material.title = "Updated Material"
+            self.material.save()
+            cache.set(course_tree_key(self.course.id), {"stale": True})
+        self.assertEqual(cache.get(course_tree_key(self.course.id)), {"stale": True})
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(course_tree_key(self.course.id)))
+
+    def test_section_move_invalidates_both_courses(self):
+        """Перенос раздела сбрасывает кеш прежнего и нового курса."""
+        other_course = Course.objects.create(title="Other", owner=self.teacher)
+        other_url = reverse("content:courses-detail", args=[other_course.id])
+        self.client.get(self.url)
+        self.client.get(other_url)
+        self.section.course = other_course
+        with self.captureOnCommitCallbacks(execute=True):
+            self.section.save()
+        self.assertEqual(self.client.get(self.url).data["sections"], [])
+        self.assertEqual(len(self.client.get(other_url).data["sections"]), 1)
+
+    def test_cached_list_respects_role_filter(self):
+        """Список из кеша по-прежнему фильтруется по владельцу курса."""
+        self.client.get(self.url)
+        self.client.force_authenticate(user=self.other_teacher)
+        response = self.client.get(reverse("content:courses-list") + "?expand=true")
+        self.assertEqual(response.data["results"], [])
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CourseProgressTests(APITestCase):
+    """
+    Тесты прогресса пользователя по курсу.
+    Проверяет подсчет по разделам, кеширование и сброс кеша после отправки теста.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: курс из двух разделов с тестами."""
+        cache.clear()
+        teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.student = User.objects.create_user(
+            email="student@example.com", password="studentpass", role="student"
+        )
+        self.other_student = User.objects.create_user(
+            email="other@example.com", password="studentpass", role="student"
+        )
+        self.course = Course.objects.create(title="Test Course", owner=teacher)
+        first = Section.objects.create(title="First", course=self.course)
+        second = Section.objects.create(title="Second", course=self.course)
+        self.answers = []
+        for section, count in ((first, 2), (second, 1)):
+            for i in range(count):
+                material = Material.objects.create(
+                    title=f"Material {i}", content="Content", section=section
+                )
+                test = Test.objects.create(title=f"Test {i}", material=material)
+                question = Question.objects.create(test=test, text="Question")
+                answer = Answer.objects.create(
+                    question=question, text="Answer", is_correct=True
+                )
+                self.answers.append((test, question, answer))
+        Material.objects.create(title="Reading", content="Content", section=second)
+        self.url = reverse("content:courses-progress", args=[self.course.id])
+
+    def _pass(self, user, index):
+        """Отправляет правильный ответ на тест с указанным номером."""
+        test, question, answer = self.answers[index]
+        self.client.force_authenticate(user=user)
+        url = reverse("testing:submit-test", args=[test.id])
+        data = {"answers": [{"question_id": question.id, "selected_answer_id": answer.id}]}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, data, format="json")
+
+    def test_progress_counts_per_section(self):
+        """Прогресс учитывает только тесты, пройденные текущим пользователем."""
+        self._pass(self.other_student, 2)
+        self._pass(self.student, 0)
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["materials_total"], 4)
+        self.assertEqual(response.data["tests_total"], 3)
+        self.assertEqual(response.data["tests_passed"], 1)
+        first, second = response.data["sections"]
+        self.assertEqual((first["tests_passed"], first["tests_total"]), (1, 2))
+        self.assertEqual((second["materials_completed"], second["materials_total"]), (0, 2))
+
+    def test_progress_is_cached_and_invalidated_on_submit(self):
+        """Прогресс берется из кеша и сбрасывается после отправки теста курса."""
+        self.client.force_authenticate(user=self.student)
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["tests_passed"], 0)
+        self._pass(self.student, 2)
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["tests_passed"], 1)
+
+
+class DenormalizedOwnerTests(APITestCase):
+    """
+    Тесты денормализованного владельца курса в разделах и материалах.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: два преподавателя и курс с материалом."""
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.other_teacher = User.objects.create_user(
+            email="other_teacher@example.com", password="testpass", role="teacher"
+        )
+        self.course = Course.objects.create(title="Test Course", owner=self.teacher)
+        self.other_course = Course.objects.create(
+            title="Other Course", owner=self.other_teacher
+        )
+        self.section = Section.objects.create(title="Test Section", course=self.course)
+        self.material = Material.objects.create(
+            title="Test Material", content="Test Content", section=self.section
+        )
+
+    def test_owner_is_copied_on_create(self):
+        """Раздел и материал получают владельца курса при создании."""
+        self.assertEqual(self.section.owner_id, self.teacher.id)
+        self.assertEqual(self.material.owner_id, self.teacher.id)
+
+    def test_section_move_updates_materials(self):
+        """Перенос раздела в чужой курс переносит владельца на материалы."""
+        section = Section.objects.get(pk=self.section.pk)
+        section.course = self.other_course
+        section.save()
+        self.material.refresh_from_db()
+        self.assertEqual(self.material.owner_id, self.other_teacher.id)
+
+    def test_course_owner_change_updates_children(self):
+        """Смена владельца курса обновляет разделы и материалы."""
+        course = Course.objects.get(pk=self.course.pk)
+        course.owner = self.other_teacher
+        course.save()
+        self.section.refresh_from_db()
+        self.material.refresh_from_db()
+        self.assertEqual(self.section.owner_id, self.other_teacher.id)
+        self.assertEqual(self.material.owner_id, self.other_teacher.id)
+
+    def test_teacher_filter_and_permissions_without_joins(self):
+        """Фильтр преподавателя и проверка прав не соединяют таблицы."""
+        self.client.force_authenticate(user=self.teacher)
+        url = reverse("content:materials-detail", args=[self.material.id])
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(url, {"title": "Updated"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("JOIN", context.captured_queries[0]["sql"])
+
+        self.client.force_authenticate(user=self.other_teacher)
+        response = self.client.patch(url, {"title": "Hacked"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_backfill_command_repairs_owner(self):
+        """Команда backfill_owners восстанавливает владельца после расхождения."""
+        Section.objects.update(owner=None)
+        Material.objects.update(owner=None)
+        call_command("backfill_owners", stdout=StringIO())
+        self.section.refresh_from_db()
+        self.material.refresh_from_db()
+        self.assertEqual(self.section.owner_id, self.teacher.id)
+        self.assertEqual(self.material.owner_id, self.teacher.id)
+
+
+class ChildCountersTests(APITestCase):
+    """
+    Тесты денормализованных счетчиков разделов, материалов и тестов.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: два курса, раздел и материал с тестом."""
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.course = Course.objects.create(title="Test Course", owner=self.teacher)
+        self.other_course = Course.objects.create(
+            title="Other Course", owner=self.teacher
+        )
+        self.section = Section.objects.create(title="Test Section", course=self.course)
+        self.material = Material.objects.create(
+            title="Test Material", content="Test Content", section=self.section
+        )
+        self.test = Test.objects.create(title="Test", material=self.material)
+
+    def assertCounters(self, obj, **expected):
+        obj.refresh_from_db()
+        for field, value in expected.items():
+            self.assertEqual(getattr(obj, field), value, field)
+
+    def test_counters_follow_create_and_delete(self):
+        """Создание и удаление потомков меняет счетчики раздела и курса."""
+        self.assertCounters(
+            self.course, sections_count=1, materials_count=1, tests_count=1
+        )
+        self.assertCounters(self.section, materials_count=1, tests_count=1)
+
+        self.test.delete()
+        self.assertCounters(self.section, materials_count=1, tests_count=0)
+        self.material.delete()
+        self.assertCounters(
+            self.course, sections_count=1, materials_count=0, tests_count=0
+        )
+        self.section.delete()
+        self.assertCounters(self.course, sections_count=0)
+
+    def test_cascade_delete_skips_parent_counters(self):
+        """
+        Каскадное удаление не обновляет счетчики удаляемых родителей:
+        число запросов не зависит от количества материалов.
+        """
+        for index in range(20):
+            material = Material.objects.create(
+                title=f"Material {index}", content="Content", section=self.section
+            )
+            Test.objects.create(title=f"Test {index}", material=material)
+        other_section = Section.objects.create(title="Other", course=self.course)
+        Material.objects.create(title="Kept", content="Content", section=other_section)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.section.delete()
+        self.assertLess(len(queries), 20)
+        self.assertCounters(
+            self.course, sections_count=1, materials_count=1, tests_count=0
+        )
+        self.assertEqual(
+            SearchEntry.objects.filter(kind=SearchEntry.MATERIAL).count(), 1
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            self.course.delete()
+        self.assertLess(len(queries), 12)
+        self.assertFalse(Material.objects.exists())
+
+    def test_section_move_moves_counters(self):
+        """Перенос раздела переносит его счетчики между курсами."""
+        section = Section.objects.get(pk=self.section.pk)
+        section.course = self.other_course
+        section.save()
+        self.assertCounters(
+            self.course, sections_count=0, materials_count=0, tests_count=0
+        )
+        self.assertCounters(
+            self.other_course, sections_count=1, materials_count=1, tests_count=1
+        )
+
+    def test_course_update_does_not_overwrite_counters(self):
+        """Сохранение курса не затирает счетчики устаревшими значениями."""
+        course = Course.objects.get(pk=self.course.pk)
+        Section.objects.create(title="New Section", course=self.course)
+        course.title = "Renamed"
+        course.save()
+        self.assertCounters(self.course, title="Renamed", sections_count=2)
+
+    def test_summary_list_reads_counters(self):
+        """Краткий список курсов берет количество потомков из счетчиков."""
+        self.client.force_authenticate(user=self.teacher)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("content:courses-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item = next(i for i in response.data["results"] if i["id"] == self.course.id)
+        self.assertEqual(item["tests_count"], 1)
+        self.assertFalse(any("JOIN" in q["sql"] for q in context.captured_queries))
+
+    def test_recount_repairs_drift(self):
+        """Команда recount восстанавливает счетчики после расхождения."""
+        Course.objects.update(sections_count=10, materials_count=10, tests_count=10)
+        Section.objects.update(materials_count=0, tests_count=5)
+        call_command("recount", stdout=StringIO())
+        self.assertCounters(
+            self.course, sections_count=1, materials_count=1, tests_count=1
+        )
+        self.assertCounters(
+            self.other_course, sections_count=0, materials_count=0, tests_count=0
+        )
+        self.assertCounters(self.section, materials_count=1, tests_count=1)
+
+
+class SearchTests(APITestCase):
+    """
+    Тесты полнотекстового поиска по курсам и материалам.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: курсы двух преподавателей и студент."""
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.other_teacher = User.objects.create_user(
+            email="other_teacher@example.com", password="testpass", role="teacher"
+        )
+        self.student = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        self.course = Course.objects.create(
+            title="Декораторы в Python",
+            description="Курс о функциях высшего порядка",
+            owner=self.teacher,
+        )
+        self.section = Section.objects.create(title="Основы", course=self.course)
+        self.material = Material.objects.create(
+            title="Замыкания",
+            content="Длинное вступление. " * 50 + "Здесь декораторы используют замыкание.",
+            section=self.section,
+        )
+        self.other_course = Course.objects.create(
+            title="Алгоритмы", description="Сортировки и декораторы", owner=self.other_teacher
+        )
+        self.url = reverse("content:search")
+
+    def search(self, user, query):
+        self.client.force_authenticate(user=user)
+        return self.client.get(self.url, {"q": query})
+
+    def test_results_are_ranked_and_highlighted(self):
+        """Совпадение в заголовке выше совпадения в тексте, фрагмент подсвечен."""
+        response = self.search(self.student, "декораторы")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(results[0]["kind"], "course")
+        self.assertEqual(results[0]["object_id"], self.course.id)
+        material = next(item for item in results if item["kind"] == "material")
+        self.assertIn("<b>декораторы</b>", material["snippet"])
+        self.assertLess(len(material["snippet"]), len(self.material.content))
+
+    def test_teacher_finds_only_own_courses(self):
+        """Преподаватель находит только объекты своих курсов."""
+        response = self.search(self.other_teacher, "декораторы")
+        self.assertEqual(
+            [item["course"] for item in response.data["results"]],
+            [self.other_course.id],
+        )
+
+    def test_index_follows_changes(self):
+        """Изменение и удаление материала сразу отражаются в поиске."""
+        self.material.content = "Генераторы и итераторы"
+        self.material.save()
+        self.assertEqual(self.search(self.student, "итераторы").data["count"], 1)
+        self.material.delete()
+        self.assertEqual(self.search(self.student, "итераторы").data["count"], 0)
+
+    def test_query_syntax_is_escaped(self):
+        """Спецсимволы запроса не ломают поиск, пустой запрос отклоняется."""
+        response = self.search(self.student, 'Python" (*')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 1)
+        response = self.search(self.student, "  ")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild_command_restores_index(self):
+        """Команда rebuild_search_index восстанавливает очищенный индекс."""
+        SearchEntry.objects.all().delete()
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.search(self.student, "замыкание").data["count"], 1)
+
+    def test_snippet_escapes_stored_html(self):
+        """Текст записи во фрагменте экранируется, подсвечиваются только совпадения."""
+        self.material.content = "<script>alert(1)</script> декораторы"
+        self.material.save()
+        response = self.search(self.student, "декораторы")
+        material = next(
+            item for item in response.data["results"] if item["kind"] == "material"
+        )
+        self.assertEqual(
+            material["snippet"],
+            "&lt;script&gt;alert(1)&lt;/script&gt; <b>декораторы</b>",
+        )
+
+    def test_postgresql_query_compiles(self):
+        """Запрос поиска компилируется для PostgreSQL, в том числе как подзапрос."""
+        postgresql = PostgreSQLDatabaseWrapper(
+            {**connection.settings_dict, "ENGINE": "django.db.backends.postgresql"}
+        )
+        with mock.patch("content.search.connections", {"default": postgresql}):
+            entries = search_entries(SearchEntry.objects.all(), "декораторы")
+        sql, params = entries.query.get_compiler(connection=postgresql).as_sql()
+        self.assertIn('"content_searchentry"."document" @@', sql)
+        self.assertIn("ts_rank", sql)
+        self.assertEqual(list(params).count("декораторы"), 2)
+
+        courses = Course.objects.filter(pk__in=entries.values("object_id"))
+        sql, params = courses.query.get_compiler(connection=postgresql).as_sql()
+        self.assertIn('U0."document" @@', sql)
+        self.assertNotIn('"content_searchentry".', sql)
+
+
+class SuggestTests(APITestCase):
+    """
+    Тесты подсказок заголовков курсов и материалов.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: курсы двух преподавателей и студент."""
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.other_teacher = User.objects.create_user(
+            email="other_teacher@example.com", password="testpass", role="teacher"
+        )
+        self.student = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        self.course = Course.objects.create(title="Python для начинающих", owner=self.teacher)
+        section = Section.objects.create(title="Основы", course=self.course)
+        self.material = Material.objects.create(
+            title="Основы Python", content="Текст", section=section
+        )
+        self.other_course = Course.objects.create(title="Python", owner=self.other_teacher)
+        self.url = reverse("content:suggest")
+
+    def suggest(self, user, **params):
+        self.client.force_authenticate(user=user)
+        return self.client.get(self.url, params)
+
+    def titles(self, response):
+        return [item["title"] for item in response.data["results"]]
+
+    def test_prefix_matches_come_first(self):
+        """Заголовки, начинающиеся с запроса, идут первыми, затем более короткие."""
+        response = self.suggest(self.student, q="pyth")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.titles(response), ["Python", "Python для начинающих", "Основы Python"]
+        )
+
+    def test_short_query_matches_title_start(self):
+        """Запрос короче трех символов ищет по началу заголовка."""
+        response = self.suggest(self.student, q="ос")
+        self.assertEqual(self.titles(response), ["Основы Python"])
+
+    def test_teacher_gets_only_own_courses(self):
+        """Преподаватель получает подсказки только по своим курсам."""
+        response = self.suggest(self.other_teacher, q="python")
+        self.assertEqual(self.titles(response), ["Python"])
+
+    def test_limit_is_capped(self):
+        """Количество подсказок ограничено сверху."""
+        for number in range(15):
+            Course.objects.create(title=f"Python {number}", owner=self.teacher)
+        response = self.suggest(self.student, q="python", limit=100)
+        self.assertEqual(len(response.data["results"]), 10)
+        response = self.suggest(self.student, q="python", limit=2)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_index_is_rebuilt_on_change(self):
+        """Изменение заголовка сразу отражается в подсказках без лишних запросов."""
+        self.suggest(self.student, q="python")
+        with self.assertNumQueries(0):
+            self.client.get(self.url, {"q": "python"})
+        self.material.title = "Генераторы"
+        self.material.save()
+        response = self.suggest(self.student, q="генер")
+        self.assertEqual(response.data["results"][0]["object_id"], self.material.id)
+
+
+class BulkWriteTests(APITestCase):
+    """
+    Тесты пакетного создания и изменения разделов и материалов.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: курсы двух преподавателей и студент."""
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.other_teacher = User.objects.create_user(
+            email="other_teacher@example.com", password="testpass", role="teacher"
+        )
+        self.student = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        self.course = Course.objects.create(title="Test Course", owner=self.teacher)
+        self.other_course = Course.objects.create(
+            title="Other Course", owner=self.other_teacher
+        )
+        self.section = Section.objects.create(title="Section", course=self.course)
+        self.sections_url = reverse("content:sections-bulk")
+        self.materials_url = reverse("content:materials-bulk")
+        self.client.force_authenticate(user=self.teacher)
+
+    def test_bulk_create_sections_reports_item_errors(self):
+        """Разделы создаются пакетом, чужой курс и неверные данные — ошибки элементов."""
+        items = [
+            {"title": "Первый", "course": self.course.id},
+            {"title": "Чужой", "course": self.other_course.id},
+            {"course": self.course.id},
+            {"title": "Второй", "course": self.course.id},
+        ]
+        response = self.client.post(self.sections_url, {"items": items}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertIn("id", results[0])
+        self.assertIn("course", results[1]["errors"])
+        self.assertIn("title", results[2]["errors"])
+        section = Section.objects.get(pk=results[3]["id"])
+        self.assertEqual(section.owner_id, self.teacher.id)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.sections_count, 3)
+        self.assertFalse(Section.objects.filter(course=self.other_course).exists())
+
+    def test_bulk_create_materials_in_constant_queries(self):
+        """Импорт 500 материалов — один запрос с постоянным числом обращений к БД."""
+        items = [
+            {"title": f"Материал {number}", "content": "Текст", "section": self.section.id}
+            for number in range(500)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                self.materials_url, {"items": items}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLess(len(context.captured_queries), 20)
+        self.assertEqual(Material.objects.filter(owner=self.teacher).count(), 500)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.materials_count, 500)
+        self.assertEqual(
+            SearchEntry.objects.filter(kind=SearchEntry.MATERIAL).count(), 500
+        )
+
+    def test_bulk_update_materials_moves_and_reindexes(self):
+        """Пакетное изменение переносит материалы и обновляет счетчики и индекс."""
+        material = Material.objects.create(
+            title="Старое", content="Текст", section=self.section
+        )
+        target = Section.objects.create(title="Target", course=self.course)
+        items = [
+            {"id": material.id, "title": "Новое", "section": target.id},
+            {"title": "Без id"},
+            {"id": material.id, "title": "Повтор"},
+        ]
+        response = self.client.patch(self.materials_url, {"items": items}, format="json")
+        results = response.data["results"]
+        self.assertEqual(results[0], {"index": 0, "id": material.id})
+        self.assertIn("id", results[1]["errors"])
+        self.assertIn("id", results[2]["errors"])
+        material.refresh_from_db()
+        self.assertEqual((material.title, material.section_id), ("Новое", target.id))
+        self.section.refresh_from_db()
+        target.refresh_from_db()
+        self.assertEqual((self.section.materials_count, target.materials_count), (0, 1))
+        entry = SearchEntry.objects.get(kind=SearchEntry.MATERIAL, object_id=material.id)
+        self.assertEqual(entry.title, "Новое")
+
+    def test_bulk_update_section_move_updates_material_owner(self):
+        """Перенос раздела в курс другого владельца (админом) переносит материалы."""
+        admin = User.objects.create_user(
+            email="admin@example.com", password="testpass", role="admin"
+        )
+        material = Material.objects.create(
+            title="Material", content="Текст", section=self.section
+        )
+        self.client.force_authenticate(user=admin)
+        items = [{"id": self.section.id, "course": self.other_course.id}]
+        self.client.patch(self.sections_url, {"items": items}, format="json")
+        material.refresh_from_db()
+        self.assertEqual(material.owner_id, self.other_teacher.id)
+        self.other_course.refresh_from_db()
+        self.assertEqual(self.other_course.materials_count, 1)
+
+    def test_teacher_cannot_update_foreign_sections(self):
+        """Преподаватель не может изменить чужие разделы, студент — вызвать API."""
+        self.client.force_authenticate(user=self.other_teacher)
+        items = [{"id": self.section.id, "title": "Hacked"}]
+        response = self.client.patch(self.sections_url, {"items": items}, format="json")
+        self.assertIn("id", response.data["results"][0]["errors"])
+        self.client.force_authenticate(user=self.student)
+        response = self.client.patch(self.sections_url, {"items": items}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class CourseTransferTests(APITestCase):
+    """
+    Тесты потоковой выгрузки и загрузки курсов в формате NDJSON.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: курс с полным деревом и второй преподаватель."""
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.other_teacher = User.objects.create_user(
+            email="other_teacher@example.com", password="testpass", role="teacher"
+        )
+        self.course = Course.objects.create(
+            title="Курс", description="Описание", owner=self.teacher
+        )
+        for number in range(2):
+            section = Section.objects.create(title=f"Раздел {number}", course=self.course)
+            material = Material.objects.create(
+                title=f"Материал {number}", content="Текст", section=section
+            )
+            test = Test.objects.create(
+                title=f"Тест {number}",
+                material=material,
+                questions_per_attempt=number or None,
+            )
+            question = Question.objects.create(test=test, text="Вопрос?")
+            Answer.objects.create(question=question, text="Да", is_correct=True)
+            Answer.objects.create(question=question, text="Нет", is_correct=False)
+
+    def export(self, *args):
+        output = StringIO()
+        call_command("export_courses", *args, stdout=output, stderr=StringIO())
+        return output.getvalue()
+
+    def test_export_writes_parents_before_children(self):
+        """Выгрузка содержит все записи, родители идут раньше потомков."""
+        lines = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual(len(lines), 1 + 2 * 6)
+        self.assertEqual(lines[0]["owner"], "teacher@example.com")
+        kinds = [line["type"] for line in lines]
+        self.assertEqual(
+            kinds,
+            sorted(
+                kinds,
+                key=["course", "section", "material", "test", "question", "answer"].index,
+            ),
+        )
+
+    def test_round_trip_remaps_keys_and_fills_derived_data(self):
+        """Загрузка создает копию с новыми id, владельцем, счетчиками и индексом."""
+        path = os.path.join(tempfile.mkdtemp(), "courses.ndjson")
+        call_command("export_courses", "--output", path, stdout=StringIO())
+        call_command(
+            "import_courses",
+            path,
+            "--owner",
+            "other_teacher@example.com",
+            "--chunk-size",
+            "2",
+            stdout=StringIO(),
+        )
+        copy = Course.objects.get(owner=self.other_teacher)
+        self.assertEqual(
+            (copy.sections_count, copy.materials_count, copy.tests_count), (2, 2, 2)
+        )
+        self.assertEqual(
+            sorted(
+                Test.objects.filter(material__section__course=copy).values_list(
+                    "title", "questions_per_attempt"
+                )
+            ),
+            [("Тест 0", None), ("Тест 1", 1)],
+        )
+        self.assertEqual(
+            Material.objects.filter(owner=self.other_teacher).count(), 2
+        )
+        self.assertEqual(
+            Answer.objects.filter(
+                question__test__material__section__course=copy, is_correct=True
+            ).count(),
+            2,
+        )
+        self.assertEqual(SearchEntry.objects.filter(course=copy).count(), 3)
+
+    def test_import_reports_broken_line(self):
+        """Ссылка на отсутствующего родителя прерывает загрузку с номером строки."""
+        path = os.path.join(tempfile.mkdtemp(), "broken.ndjson")
+        with open(path, "w", encoding="utf-8") as stream:
+            stream.write('{"type": "section", "id": 1, "course": 99, "title": "X"}\n')
+        with self.assertRaisesMessage(CommandError, "Строка 1"):
+            call_command("import_courses", path, stdout=StringIO())
+
+
+class CourseCloneTests(APITestCase):
+    """
+    Тесты копирования курса со всем содержимым.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: курс с тестами, второй преподаватель, студент."""
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.other_teacher = User.objects.create_user(
+            email="other_teacher@example.com", password="testpass", role="teacher"
+        )
+        self.student = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        self.course = Course.objects.create(
+            title="Курс", description="Описание", owner=self.teacher
+        )
+        for number in range(3):
+            section = Section.objects.create(title=f"Раздел {number}", course=self.course)
+            for index in range(3):
+                material = Material.objects.create(
+                    title=f"Материал {number}.{index}", content="Текст", section=section
+                )
+                test = Test.objects.create(
+                    title="Тест", material=material, questions_per_attempt=index or None
+                )
+                question = Question.objects.create(test=test, text="Вопрос?")
+                Answer.objects.create(question=question, text="Да", is_correct=True)
+                Answer.objects.create(question=question, text="Нет")
+        self.url = reverse("content:courses-clone", args=[self.course.id])
+
+    def test_clone_copies_tree_in_bulk(self):
+        """Копия содержит все дерево и создается небольшим числом запросов."""
+        self.client.force_authenticate(user=self.teacher)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, {"title": "Копия"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertLess(len(context.captured_queries), 30)
+        self.assertEqual(
+            (
+                response.data["sections_count"],
+                response.data["materials_count"],
+                response.data["tests_count"],
+            ),
+            (3, 9, 9),
+        )
+        copy = Course.objects.get(pk=response.data["id"])
+        self.assertEqual(copy.title, "Копия")
+        self.assertEqual(
+            (copy.sections_count, copy.materials_count, copy.tests_count), (3, 9, 9)
+        )
+        self.assertEqual(
+            Answer.objects.filter(
+                question__test__material__section__course=copy, is_correct=True
+            ).count(),
+            9,
+        )
+        self.assertEqual(
+            Material.objects.filter(section__course=copy, owner=self.teacher).count(), 9
+        )
+        self.assertEqual(SearchEntry.objects.filter(course=copy).count(), 10)
+        self.assertEqual(
+            sorted(
+                Test.objects.filter(material__section__course=copy).values_list(
+                    "questions_per_attempt", flat=True
+                ),
+                key=lambda value: value or 0,
+            ),
+            [None] * 3 + [1] * 3 + [2] * 3,
+        )
+
+    def test_background_clone_runs_as_job(self):
+        """Копирование фоновым заданием выполняется командой run_clone_jobs."""
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.post(self.url, {"background": True}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_url = reverse("content:clone-jobs-detail", args=[response.data["id"]])
+        self.assertEqual(self.client.get(job_url).data["status"], "pending")
+
+        call_command("run_clone_jobs", stdout=StringIO())
+        job = self.client.get(job_url).data
+        self.assertEqual(job["status"], "done")
+        copy = Course.objects.get(pk=job["course"])
+        self.assertEqual((copy.owner_id, copy.title), (self.teacher.id, "Курс"))
+        self.assertEqual(copy.tests_count, 9)
+
+    def test_stale_running_job_is_reclaimed(self):
+        """Задание, брошенное остановленным воркером, выполняется повторно."""
+        job = CourseCloneJob.objects.create(source=self.course, owner=self.teacher)
+        self.assertEqual(claim_clone_job().pk, job.pk)
+        self.assertIsNone(claim_clone_job())
+
+        CourseCloneJob.objects.filter(pk=job.pk).update(
+            started_at=timezone.now()
+            - timedelta(seconds=settings.COURSE_CLONE_JOB_TIMEOUT + 1)
+        )
+        call_command("run_clone_jobs", stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, CourseCloneJob.DONE)
+        self.assertEqual(Course.objects.filter(title="Курс").count(), 2)
+
+    def test_clone_requires_access_to_course(self):
+        """Чужой курс скопировать нельзя, студенту копирование недоступно."""
+        self.client.force_authenticate(user=self.other_teacher)
+        response = self.client.post(self.url, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.client.force_authenticate(user=self.student)
+        response = self.client.post(self.url, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class OrderingTests(APITestCase):
+    """
+    Тесты порядка разделов и материалов.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: курс с тремя разделами."""
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.other_teacher = User.objects.create_user(
+            email="other_teacher@example.com", password="testpass", role="teacher"
+        )
+        self.course = Course.objects.create(title="Курс", owner=self.teacher)
+        self.sections = [
+            Section.objects.create(title=f"Раздел {number}", course=self.course)
+            for number in range(3)
+        ]
+        self.client.force_authenticate(user=self.teacher)
+
+    def tree_titles(self):
+        url = reverse("content:courses-detail", args=[self.course.id])
+        return [section["title"] for section in self.client.get(url).data["sections"]]
+
+    def move(self, section, after):
+        url = reverse("content:sections-move", args=[section.id])
+        return self.client.post(
+            url, {"after": after.id if after else None}, format="json"
+        )
+
+    def test_new_children_are_appended(self):
+        """Новые разделы и материалы встают в конец родителя."""
+        positions = [section.position for section in self.sections]
+        self.assertEqual(positions, sorted(positions))
+        self.assertEqual(self.tree_titles(), ["Раздел 0", "Раздел 1", "Раздел 2"])
+
+    def test_move_updates_single_row(self):
+        """Перемещение раздела меняет одну строку и сбрасывает кеш дерева."""
+        self.tree_titles()
+        with CaptureQueriesContext(connection) as context:
+            response = self.move(self.sections[2], None)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updates = [q for q in context.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.tree_titles(), ["Раздел 2", "Раздел 0", "Раздел 1"])
+        self.move(self.sections[0], self.sections[1])
+        self.assertEqual(self.tree_titles(), ["Раздел 2", "Раздел 1", "Раздел 0"])
+
+    def test_exhausted_gap_renumbers_siblings(self):
+        """Когда зазор между соседями исчерпан, соседи перенумеровываются."""
+        Section.objects.filter(pk=self.sections[1].pk).update(
+            position=self.sections[0].position + 1
+        )
+        self.move(self.sections[2], self.sections[0])
+        self.assertEqual(self.tree_titles(), ["Раздел 0", "Раздел 2", "Раздел 1"])
+
+    def test_reorder_sets_positions_for_many(self):
+        """reorder задает порядок указанных элементов, остальные идут следом."""
+        url = reverse("content:sections-reorder")
+        order = [self.sections[1].id, self.sections[2].id]
+        response = self.client.post(
+            url, {"parent": self.course.id, "order": order}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.tree_titles(), ["Раздел 1", "Раздел 2", "Раздел 0"])
+
+        self.client.force_authenticate(user=self.other_teacher)
+        response = self.client.post(
+            url, {"parent": self.course.id, "order": order}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_moved_material_goes_to_end_of_section(self):
+        """Материал, перенесенный в другой раздел, встает в его конец."""
+        first = Material.objects.create(
+            title="A", content="Текст", section=self.sections[0]
+        )
+        Material.objects.create(title="B", content="Текст", section=self.sections[1])
+        material = Material.objects.get(pk=first.pk)
+        material.section = self.sections[1]
+        material.save()
+        self.assertEqual(
+            list(self.sections[1].materials.values_list("title", flat=True)),
+            ["B", "A"],
+        )
+
+
+class FixtureLoadingTests(APITestCase):
+    """
+    Тесты загрузки начальных данных командой loaddata.
+    """
+
+    def setUp(self):
+        """Настройка тестовых данных: владелец курсов из фикстуры."""
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            id=1, email="teacher@example.com", password="testpass", role="teacher"
+        )
+
+    def test_loaddata_initial_data(self):
+        """Фикстура загружается, позиции разделов и материалов перенумерованы."""
+        call_command(
+            "loaddata", str(settings.BASE_DIR / "initial_data.json"), verbosity=0
+        )
+        self.assertEqual(Course.objects.count(), 2)
+        self.assertEqual(
+            list(
+                Section.objects.filter(course_id=1)
+                .order_by("position")
+                .values_list("title", "position")
+            ),
+            [("Введение", POSITION_STEP), ("Типы данных", 2 * POSITION_STEP)],
+        )
+        self.assertFalse(Material.objects.exclude(position=POSITION_STEP).exists())
+
+    def test_loaddata_sets_owner(self):
+        """Разделы и материалы из фикстуры получают владельца курса."""
+        call_command(
+            "loaddata", str(settings.BASE_DIR / "initial_data.json"), verbosity=0
+        )
+        self.assertFalse(Section.objects.exclude(owner=self.teacher).exists())
+        self.assertFalse(Material.objects.exclude(owner=self.teacher).exists())
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(reverse("content:materials-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 4)
+
+    def test_loaddata_recounts_counters(self):
+        """Счетчики курсов и разделов из фикстуры пересчитываются."""
+        call_command(
+            "loaddata", str(settings.BASE_DIR / "initial_data.json"), verbosity=0
+        )
+        self.assertEqual(
+            list(
+                Course.objects.order_by("id").values_list(
+                    "sections_count", "materials_count", "tests_count"
+                )
+            ),
+            [(2, 2, 2), (2, 2, 1)],
+        )
+        section = Section.objects.get(pk=1)
+        self.assertEqual((section.materials_count, section.tests_count), (1, 1))
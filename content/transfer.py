@@ -0,0 +1,200 @@
+import json
+from collections import namedtuple
+
+from authentication.models import User
+from testing.models import Answer, Question, Test
+
+from .cache import invalidate_course_tree
+from .counters import recount
+from .models import Course, Material, Section
+from .search import course_entry, material_entry, save_entries
+from .suggest import invalidate_suggestions
+
+# Формат обмена — NDJSON: одна запись на строку с полем type и исходным id.
+# Записи идут блоками по несколько курсов: курсы блока, затем их разделы,
+# материалы, тесты, вопросы и ответы. Дочерние записи ссылаются на id
+# родителя из того же блока, поэтому при импорте соответствие старых и новых
+# id хранится только для текущего блока.
+#
+# Схема: (type, модель, поле родителя, тип родителя, переносимые поля)
+SCHEMA = [
+    ("course", Course, None, None, ["title", "description"]),
+    ("section", Section, "course", "course", ["title", "position"]),
+    ("material", Material, "section", "section", ["title", "content", "position"]),
+    ("test", Test, "material", "material", ["title", "questions_per_attempt"]),
+    ("question", Question, "test", "test", ["text"]),
+    ("answer", Answer, "question", "question", ["text", "is_correct"]),
+]
+# Фильтр записей каждого типа по курсам блока
+COURSE_LOOKUPS = {
+    "course": "id",
+    "section": "course_id",
+    "material": "section__course_id",
+    "test": "material__section__course_id",
+    "question": "test__material__section__course_id",
+    "answer": "question__test__material__section__course_id",
+}
+
+# Созданный объект: новый id, владелец курса и id курса
+Ref = namedtuple("Ref", "id owner_id course_id")
+
+
+class TransferError(Exception):
+    """Ошибка в данных импортируемого файла."""
+
+
+def export_courses(stream, course_ids=None, block_size=100, chunk_size=2000):
+    """
+    Потоково записывает курсы со всем содержимым в stream в формате NDJSON.
+
+    Курсы выгружаются блоками по block_size, записи читаются итераторами
+    по chunk_size строк, поэтому память не зависит от объема данных.
+    Владелец курса выгружается email-ом. Возвращает количество записей.
+    """
+    courses = Course.objects.order_by("id")
+    if course_ids is not None:
+        courses = courses.filter(id__in=course_ids)
+    written = 0
+    last_id = 0
+    while True:
+        block = list(
+            courses.filter(id__gt=last_id).values_list("id", flat=True)[:block_size]
+        )
+        if not block:
+            return written
+        last_id = block[-1]
+        for kind, model, parent_field, _, fields in SCHEMA:
+            columns = ["id", *fields]
+            if parent_field:
+                columns.append(f"{parent_field}_id")
+            if kind == "course":
+                columns.append("owner__email")
+            rows = (
+                model.objects.filter(**{f"{COURSE_LOOKUPS[kind]}__in": block})
+                .order_by("id")
+                .values(*columns)
+                .iterator(chunk_size=chunk_size)
+            )
+            for row in rows:
+                record = {"type": kind, "id": row.pop("id")}
+                if parent_field:
+                    record[parent_field] = row.pop(f"{parent_field}_id")
+                if kind == "course":
+                    record["owner"] = row.pop("owner__email")
+                record.update(row)
+                stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+                written += 1
+
+
+class CourseImporter:
+    """
+    Импорт курсов из NDJSON, созданного export_courses.
+
+    Записи накапливаются порциями по chunk_size и сохраняются bulk_create,
+    первичные ключи заменяются новыми. Владелец, счетчики и поисковый
+    индекс заполняются по мере импорта, а не сигналами моделей.
+    Если owner не указан, владелец курса ищется по email из файла.
+    """
+
+    def __init__(self, owner=None, chunk_size=1000):
+        self.owner_id = owner.pk if owner else None
+        self.chunk_size = chunk_size
+        self.schema = {kind: spec for kind, *spec in SCHEMA}
+        self.users = {}
+        self.ids = {}
+        self.buffer = []
+        self.kind = None
+        self.course_ids = set()
+        self.created = 0
+
+    def run(self, lines):
+        """Импортирует записи из итерируемого набора строк и возвращает их количество."""
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                kind = record["type"]
+            except (ValueError, KeyError, TypeError):
+                raise TransferError(f"Строка {number}: ожидается JSON-объект с полем type.")
+            if kind not in self.schema:
+                raise TransferError(f"Строка {number}: неизвестный тип записи {kind!r}.")
+            if kind != self.kind:
+                self.flush()
+                if kind == "course":
+                    self.finish_block()
+                self.kind = kind
+            self.buffer.append((number, record))
+            if len(self.buffer) >= self.chunk_size:
+                self.flush()
+        self.flush()
+        self.finish_block()
+        invalidate_suggestions()
+        return self.created
+
+    def flush(self):
+        """Сохраняет накопленную порцию записей одного типа."""
+        if not self.buffer:
+            return
+        model, parent_field, parent_kind, fields = self.schema[self.kind]
+        objs = []
+        course_ids = []
+        for number, record in self.buffer:
+            try:
+                values = {field: record[field] for field in fields}
+                parent = None
+                if parent_field:
+                    parent = self.ids[parent_kind][record[parent_field]]
+                    values[f"{parent_field}_id"] = parent.id
+            except KeyError as error:
+                raise TransferError(
+                    f"Строка {number}: нет поля или родительской записи {error}."
+                )
+            if self.kind == "course":
+                values["owner_id"] = self.owner_id or self.user_id(number, record)
+            elif self.kind in ("section", "material"):
+                # Владелец курса копируется в разделы и материалы
+                values["owner_id"] = parent.owner_id
+            objs.append(model(**values))
+            course_ids.append(parent.course_id if parent else None)
+        model.objects.bulk_create(objs)
+
+        if self.kind == "course":
+            course_ids = [course.pk for course in objs]
+            self.course_ids.update(course_ids)
+            save_entries([course_entry(course) for course in objs])
+        elif self.kind == "material":
+            save_entries(
+                [
+                    material_entry(material, course_id)
+                    for material, course_id in zip(objs, course_ids)
+                ]
+            )
+        if self.kind != "answer":
+            ids = self.ids.setdefault(self.kind, {})
+            for (_, record), obj, course_id in zip(self.buffer, objs, course_ids):
+                ids[record["id"]] = Ref(obj.pk, getattr(obj, "owner_id", None), course_id)
+        self.created += len(objs)
+        self.buffer = []
+
+    def user_id(self, number, record):
+        email = record.get("owner")
+        if email not in self.users:
+            self.users[email] = (
+                User.objects.filter(email=email)
+                .values_list("id", flat=True)
+                .first()
+            )
+        if self.users[email] is None:
+            raise TransferError(
+                f"Строка {number}: пользователь {email!r} не найден, укажите владельца."
+            )
+        return self.users[email]
+
+    def finish_block(self):
+        """Пересчитывает счетчики курсов блока и сбрасывает соответствие id."""
+        if self.course_ids:
+            recount(self.course_ids)
+            invalidate_course_tree(*self.course_ids)
+        self.course_ids = set()
+        self.ids = {}
@@ -2,7 +2,9 @@ from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
 from content.apps import ContentConfig
-from content.views import CourseViewSet, MaterialViewSet, SectionViewSet
+from content.views import (CourseCloneJobViewSet, CourseViewSet,
+                           MaterialViewSet, SearchView, SectionViewSet,
+                           SuggestView)
 
 app_name = ContentConfig.name
 
@@ -17,7 +19,12 @@ router.register(
 router.register(
     "materials", MaterialViewSet, basename="materials"
 )  # Эндпоинты для работы с материалами
+router.register(
+    "clone-jobs", CourseCloneJobViewSet, basename="clone-jobs"
+)  # Статус фоновых заданий копирования курсов
 
 urlpatterns = [
+    path("search/", SearchView.as_view(), name="search"),  # Полнотекстовый поиск
+    path("suggest/", SuggestView.as_view(), name="suggest"),  # Подсказки заголовков
     path("", include(router.urls)),
 ]
@@ -1,14 +1,32 @@
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
-from rest_framework import viewsets
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import generics, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from authentication.permissions import IsAdmin, IsOwner, IsTeacherOrAdmin as IsTeacher
 
-from .models import Course, Material, Section
-from .serializers import (CourseSerializer, MaterialSerializer,
-                          SectionSerializer)
+from .bulk import (create_materials, create_sections, update_materials,
+                   update_sections)
+from .cache import get_course_trees, section_course_id
+from .clone import clone_course
+from .mixins import BulkWriteMixin, PositionMixin, SummaryListMixin
+from .progress import get_course_progress
+from .models import Course, CourseCloneJob, Material, SearchEntry, Section
+from .search import attach_snippets, search_entries
+from .suggest import SUGGEST_LIMIT, suggest
+from .serializers import (CourseCloneJobSerializer, CourseCloneSerializer,
+                          CourseSerializer, CourseSummarySerializer,
+                          MaterialBulkItemSerializer, MaterialSerializer,
+                          SearchResultSerializer, SectionBulkItemSerializer,
+                          SectionSerializer, SectionSummarySerializer)
 
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(SummaryListMixin, viewsets.ModelViewSet):
     """
     ViewSet для работы с курсами.
 
@@ -18,18 +36,23 @@ class CourseViewSet(viewsets.ModelViewSet):
     - create: Создать курс (только для администраторов и преподавателей)
     - update/partial_update: Обновить курс (только для администраторов или владельцев-преподавателей)
     - destroy: Удалить курс (только для администраторов или владельцев-преподавателей)
+    - progress: Получить прогресс текущего пользователя по разделам курса
+    - clone: Скопировать курс со всем содержимым (администраторы и владельцы-преподаватели)
 
     Преподаватели видят только свои курсы. Администраторы видят все курсы.
+    Список по умолчанию возвращает краткую сводку, полное дерево — с ?expand=true.
+    Полные деревья курсов отдаются из кеша (см. content.cache).
     """
 
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    summary_serializer_class = CourseSummarySerializer
 
     def get_permissions(self):
         if self.action in ['update', 'partial_update', 'destroy']:
             # Разрешаем: Админ ИЛИ (Преподаватель И владелец)
             self.permission_classes = [IsAdmin | (IsTeacher & IsOwner)]
-        elif self.action == 'create':
+        elif self.action in ['create', 'clone']:
             # Разрешаем: Админ ИЛИ Преподаватель
             self.permission_classes = [IsAdmin | IsTeacher]
         else:
@@ -48,11 +71,109 @@ class CourseViewSet(viewsets.ModelViewSet):
         if isinstance(user, AnonymousUser):
             return Course.objects.none()
         if user.role == 'teacher':
-            return Course.objects.filter(owner=user)
-        return super().get_queryset()
+            queryset = Course.objects.filter(owner=user)
+        else:
+            queryset = super().get_queryset()
+        if self.is_summary():
+            # Для каталога достаточно счетчиков курса, дочерние таблицы не читаются
+            return queryset.only(*CourseSummarySerializer.Meta.fields)
+        if self.action == "clone":
+            return queryset.only("id", "materials_count")
+        if self.action in ["list", "retrieve", "progress"]:
+            # Деревья берутся из кеша, из БД нужны только id видимых курсов
+            return queryset.only("id")
+        if self.action != "destroy":
+            # Всё дерево курс → разделы → материалы загружается тремя запросами
+            # независимо от количества курсов
+            queryset = queryset.prefetch_related("sections__materials")
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if self.is_summary():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        courses = page if page is not None else queryset
+        data = get_course_trees([course.id for course in courses])
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        course = self.get_object()
+        return Response(get_course_trees([course.id])[0])
+
+    @swagger_auto_schema(
+        responses={200: "Изучено/всего материалов и пройдено/всего тестов по разделам"},
+        operation_summary="Прогресс по курсу",
+    )
+    @action(detail=True)
+    def progress(self, request, pk=None):
+        """Возвращает прогресс текущего пользователя по материалам и тестам курса."""
+        course = self.get_object()
+        return Response(get_course_progress(request.user.id, course.id))
+
+    @swagger_auto_schema(
+        request_body=CourseCloneSerializer,
+        responses={
+            201: CourseSummarySerializer,
+            202: CourseCloneJobSerializer,
+        },
+        operation_summary="Копирование курса",
+    )
+    @action(detail=True, methods=["post"])
+    def clone(self, request, pk=None):
+        """
+        Копирует курс со всем содержимым во владение текущего пользователя.
+
+        Курсы, содержащие не больше COURSE_CLONE_SYNC_LIMIT материалов, копируются
+        сразу (201 и краткая сводка копии). Большие курсы и запросы
+        с background=true ставятся в очередь заданий (202 и задание,
+        статус которого доступен в /content/clone-jobs/<id>/).
+        """
+        course = self.get_object()
+        serializer = CourseCloneSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        title = serializer.validated_data.get("title", "")
+        if (
+            serializer.validated_data["background"]
+            or course.materials_count > settings.COURSE_CLONE_SYNC_LIMIT
+        ):
+            job = CourseCloneJob.objects.create(
+                source=course, owner=request.user, title=title
+            )
+            return Response(
+                CourseCloneJobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+            )
+        copy = clone_course(course.pk, request.user.id, title)
+        # Счетчики копии пересчитаны в БД, объект в памяти их не содержит
+        copy.refresh_from_db()
+        return Response(
+            CourseSummarySerializer(copy).data, status=status.HTTP_201_CREATED
+        )
 
 
-class SectionViewSet(viewsets.ModelViewSet):
+class CourseCloneJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet для просмотра заданий копирования курсов.
+    Пользователь видит только свои задания, администратор — все.
+    """
+
+    serializer_class = CourseCloneJobSerializer
+    permission_classes = [IsTeacher]
+
+    def get_queryset(self):
+        user = self.request.user
+        if isinstance(user, AnonymousUser):
+            return CourseCloneJob.objects.none()
+        if user.role == "admin":
+            return CourseCloneJob.objects.all()
+        return CourseCloneJob.objects.filter(owner=user)
+
+
+class SectionViewSet(
+    PositionMixin, BulkWriteMixin, SummaryListMixin, viewsets.ModelViewSet
+):
     """
     ViewSet для работы с разделами курсов.
 
@@ -62,11 +183,18 @@ class SectionViewSet(viewsets.ModelViewSet):
     - create: Создать раздел (только для администраторов или владельцев-преподавателей)
     - update/partial_update: Обновить раздел (только для администраторов или владельцев-преподавателей)
     - destroy: Удалить раздел (только для администраторов или владельцев-преподавателей)
+    - bulk: Пакетно создать (POST) или изменить (PATCH) разделы своих курсов
+    - move/reorder: Изменить порядок разделов в курсе
 
     Преподаватели видят только разделы своих курсов. Администраторы видят все разделы.
+    Список по умолчанию возвращает краткую сводку, материалы — с ?expand=true.
     """
 
     serializer_class = SectionSerializer
+    summary_serializer_class = SectionSummarySerializer
+    bulk_item_serializer_class = SectionBulkItemSerializer
+    position_parent_field = "course"
+    position_parent_model = Course
 
     def get_queryset(self):
         """Фильтрует разделы в зависимости от роли пользователя."""
@@ -74,8 +202,14 @@ class SectionViewSet(viewsets.ModelViewSet):
         if isinstance(user, AnonymousUser) or not hasattr(user, "role"):
             return Material.objects.none()
         if user.role == "teacher":
-            return Section.objects.filter(course__owner=user)
-        return Section.objects.all()
+            queryset = Section.objects.filter(owner=user)
+        else:
+            queryset = Section.objects.all()
+        if self.is_summary():
+            return queryset.only(*SectionSummarySerializer.Meta.fields)
+        if self.action not in ["destroy", "move"]:
+            queryset = queryset.prefetch_related("materials")
+        return queryset
 
     def get_permissions(self):
         if self.action in ["create", "update", "partial_update", "destroy"]:
@@ -83,8 +217,17 @@ class SectionViewSet(viewsets.ModelViewSet):
 
         return super().get_permissions()
 
+    def perform_bulk_create(self, items):
+        return create_sections(self.request.user, items)
+
+    def perform_bulk_update(self, items):
+        return update_sections(self.request.user, items)
+
+    def get_position_course_id(self, obj):
+        return obj.course_id
 
-class MaterialViewSet(viewsets.ModelViewSet):
+
+class MaterialViewSet(PositionMixin, BulkWriteMixin, viewsets.ModelViewSet):
     """
     ViewSet для работы с учебными материалами.
 
@@ -94,11 +237,16 @@ class MaterialViewSet(viewsets.ModelViewSet):
     - create: Создать материал (только для администраторов или владельцев-преподавателей)
     - update/partial_update: Обновить материал (только для администраторов или владельцев-преподавателей)
     - destroy: Удалить материал (только для администраторов или владельцев-преподавателей)
+    - bulk: Пакетно создать (POST) или изменить (PATCH) материалы своих курсов
+    - move/reorder: Изменить порядок материалов в разделе
 
     Преподаватели видят только материалы своих курсов. Администраторы видят все материалы.
     """
 
     serializer_class = MaterialSerializer
+    bulk_item_serializer_class = MaterialBulkItemSerializer
+    position_parent_field = "section"
+    position_parent_model = Section
 
     def get_queryset(self):
         """Фильтрует материалы в зависимости от роли пользователя."""
@@ -106,7 +254,7 @@ class MaterialViewSet(viewsets.ModelViewSet):
         if isinstance(user, AnonymousUser) or not hasattr(user, "role"):
             return Material.objects.none()
         if user.role == "teacher":
-            return Material.objects.filter(section__course__owner=user)
+            return Material.objects.filter(owner=user)
 
         return Material.objects.all()
 
@@ -115,3 +263,88 @@ class MaterialViewSet(viewsets.ModelViewSet):
             self.permission_classes = [IsAdmin | (IsTeacher & IsOwner)]
 
         return super().get_permissions()
+
+    def perform_bulk_create(self, items):
+        return create_materials(self.request.user, items)
+
+    def perform_bulk_update(self, items):
+        return update_materials(self.request.user, items)
+
+    def get_position_course_id(self, obj):
+        return section_course_id(obj.section_id)
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Постраничная выдача результатов поиска.
+    Результаты упорядочены по релевантности, поэтому используются номера страниц.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 50
+
+
+class SearchView(generics.ListAPIView):
+    """
+    Полнотекстовый поиск по курсам и учебным материалам: GET ?q=<запрос>.
+
+    Ищет по названию и описанию курсов, названию и содержанию материалов
+    через поисковый индекс (см. content.search), результаты упорядочены
+    по релевантности. Преподаватели находят только объекты своих курсов.
+    Каждый результат содержит фрагмент текста с подсветкой совпадений.
+    """
+
+    serializer_class = SearchResultSerializer
+    pagination_class = SearchPagination
+    permission_classes = [IsAuthenticated]
+
+    def get_search_text(self):
+        text = self.request.query_params.get("q", "").strip()
+        if not text:
+            raise ValidationError({"q": "Укажите поисковый запрос."})
+        return text
+
+    def get_queryset(self):
+        """Отбирает записи индекса с учетом роли пользователя."""
+        if getattr(self, "swagger_fake_view", False):
+            return SearchEntry.objects.none()
+        user = self.request.user
+        queryset = SearchEntry.objects.all()
+        if user.role == "teacher":
+            queryset = queryset.filter(owner=user)
+        return search_entries(queryset, self.get_search_text())
+
+    @swagger_auto_schema(operation_summary="Полнотекстовый поиск")
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        entries = attach_snippets(page, self.get_search_text())
+        serializer = self.get_serializer(entries, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class SuggestView(APIView):
+    """
+    Подсказки заголовков курсов и материалов при вводе: GET ?q=<начало>&limit=<n>.
+
+    Возвращает не более SUGGEST_LIMIT совпадений: сначала заголовки,
+    начинающиеся с запроса, затем более короткие. Запросы от трех символов
+    ищут подстроку, более короткие — начало заголовка.
+    Преподаватели получают подсказки только по своим курсам.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        responses={200: "Список подсказок: kind, object_id, course_id, title"},
+        operation_summary="Подсказки заголовков",
+    )
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", SUGGEST_LIMIT))
+        except ValueError:
+            raise ValidationError({"limit": "Ожидается целое число."})
+        owner_id = request.user.id if request.user.role == "teacher" else None
+        return Response(
+            {"results": suggest(request.query_params.get("q", ""), owner_id, limit)}
+        )
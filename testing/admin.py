@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import Answer, Question, Test, TestAttempt
+from .models import (Answer, AttemptResponse, Question, QuestionAnalysis, Test,
+                     TestAttempt, TestItemAnalysis, TestStatistics,
+                     UserTestSummary)
 
 
 class AnswerInline(admin.TabularInline):
@@ -8,6 +10,13 @@ class AnswerInline(admin.TabularInline):
     extra = 2
 
 
+class AttemptResponseInline(admin.TabularInline):
+    model = AttemptResponse
+    extra = 0
+    readonly_fields = ("question", "answer")
+    can_delete = False
+
+
 class QuestionInline(admin.StackedInline):
     model = Question
     extra = 1
@@ -15,7 +24,7 @@ class QuestionInline(admin.StackedInline):
 
 @admin.register(Test)
 class TestAdmin(admin.ModelAdmin):
-    list_display = ("title", "material")
+    list_display = ("title", "material", "questions_per_attempt")
     inlines = [QuestionInline]
 
 
@@ -34,3 +43,59 @@ class AnswerAdmin(admin.ModelAdmin):
 class TestAttemptAdmin(admin.ModelAdmin):
     list_display = ("user", "test", "score", "passed", "submitted_at")
     readonly_fields = ("user", "test", "score", "passed", "submitted_at")
+    inlines = [AttemptResponseInline]
+
+
+@admin.register(TestStatistics)
+class TestStatisticsAdmin(admin.ModelAdmin):
+    list_display = ("test", "attempts_count", "passed_count", "updated_at")
+    readonly_fields = (
+        "test",
+        "attempts_count",
+        "passed_count",
+        "score_sum",
+        "histogram",
+        "updated_at",
+    )
+
+
+@admin.register(UserTestSummary)
+class UserTestSummaryAdmin(admin.ModelAdmin):
+    list_display = ("user", "test", "best_score", "attempts_count", "first_passed_at")
+    readonly_fields = (
+        "user",
+        "test",
+        "best_score",
+        "last_score",
+        "attempts_count",
+        "first_passed_at",
+        "last_submitted_at",
+    )
+
+
+@admin.register(TestItemAnalysis)
+class TestItemAnalysisAdmin(admin.ModelAdmin):
+    list_display = ("test", "attempts_count", "updated_at")
+    readonly_fields = (
+        "test",
+        "last_attempt_id",
+        "attempts_count",
+        "key_signature",
+        "updated_at",
+    )
+
+
+@admin.register(QuestionAnalysis)
+class QuestionAnalysisAdmin(admin.ModelAdmin):
+    list_display = ("question", "test", "responses_count", "p_value", "discrimination")
+    list_filter = ("test",)
+    readonly_fields = (
+        "question",
+        "test",
+        "responses_count",
+        "correct_count",
+        "score_sum",
+        "score_square_sum",
+        "correct_score_sum",
+        "answer_counts",
+    )
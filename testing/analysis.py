@@ -0,0 +1,217 @@
+import hashlib
+from collections import Counter, defaultdict
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+from .models import (AttemptResponse, Question, QuestionAnalysis, TestAttempt,
+                     TestItemAnalysis)
+from .regrade import attempt_chunks, load_correct_pairs, response_correctness
+
+# Анализ вопросов хранит по каждому вопросу аддитивные суммы (число ответов,
+# верных ответов, суммы результатов попыток и их квадратов). Новые попытки
+# читаются порциями, суммы по вопросам считаются векторно через np.bincount
+# и добавляются к сохраненным, поэтому обновление обрабатывает только
+# попытки, появившиеся с прошлого раза.
+#
+# Попытки параллельных транзакций (отправка тестов и flush_test_attempts)
+# могут сохраниться с меньшим id уже после того, как попытка с большим id
+# была учтена. Поэтому каждое обновление перепроверяет окно
+# TEST_ITEM_ANALYSIS_RESCAN_WINDOW id ниже последней учтенной попытки
+# и добавляет попытки, которых нет среди учтенных в этом окне.
+SUM_FIELDS = [
+    "responses_count",
+    "correct_count",
+    "score_sum",
+    "score_square_sum",
+    "correct_score_sum",
+]
+
+
+def key_signature(correct_ids, correct_questions):
+    """Отпечаток ключа ответов: меняется при изменении верных ответов."""
+    digest = hashlib.sha256(correct_ids.tobytes())
+    digest.update(correct_questions.tobytes())
+    return digest.hexdigest()
+
+
+def accumulate(question_ids, rows, responses, correct_ids, correct_questions):
+    """
+    Считает суммы SUM_FIELDS по вопросам question_ids (отсортированный
+    массив) для порции попыток и количество выборов по парам (вопрос, ответ).
+    Ответы на вопросы, которых уже нет в тесте, не учитываются.
+    """
+    size = len(question_ids)
+    sums = np.zeros((len(SUM_FIELDS), size), dtype=np.int64)
+    if not len(responses) or not size:
+        return sums, Counter()
+    position = np.minimum(np.searchsorted(question_ids, responses[:, 1]), size - 1)
+    known = question_ids[position] == responses[:, 1]
+    responses, question_index = responses[known], position[known]
+    scores = rows[np.searchsorted(rows[:, 0], responses[:, 0]), 2]
+    is_correct = response_correctness(
+        responses, correct_ids, correct_questions
+    ).astype(np.int64)
+    weights = (None, is_correct, scores, scores * scores, scores * is_correct)
+    for row, weight in enumerate(weights):
+        sums[row] = np.bincount(question_index, weights=weight, minlength=size)
+    pairs, counts = np.unique(
+        responses[responses[:, 2] >= 0, 1:], axis=0, return_counts=True
+    )
+    return sums, Counter(dict(zip(map(tuple, pairs.tolist()), counts.tolist())))
+
+
+def late_attempts(test_id, after_id, before_id, counted_ids):
+    """
+    Возвращает попытки теста с id в (after_id, before_id], не входящие
+    в counted_ids, в формате attempt_chunks или None, если таких нет.
+    """
+    ids = [
+        pk
+        for pk in TestAttempt.objects.filter(
+            test_id=test_id, id__gt=after_id, id__lte=before_id
+        ).values_list("id", flat=True)
+        if pk not in counted_ids
+    ]
+    if not ids:
+        return None
+    rows = np.array(
+        TestAttempt.objects.filter(id__in=ids)
+        .order_by("id")
+        .values_list("id", "user_id", "score", "passed"),
+        dtype=np.int64,
+    ).reshape(-1, 4)
+    responses = np.array(
+        AttemptResponse.objects.filter(attempt_id__in=ids).values_list(
+            "attempt_id", "question_id", Coalesce(F("answer_id"), Value(-1))
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    return rows, responses
+
+
+def refresh_item_analysis(test_id, chunk_size=5000, full=False):
+    """
+    Обновляет анализ вопросов теста попытками, появившимися с прошлого
+    обновления. При full или изменении верных ответов анализ пересчитывается
+    по всем попыткам. Возвращает состояние анализа TestItemAnalysis.
+    """
+    correct_ids, correct_questions = load_correct_pairs(test_id)
+    signature = key_signature(correct_ids, correct_questions)
+    question_ids = np.array(
+        Question.objects.filter(test_id=test_id)
+        .order_by("id")
+        .values_list("id", flat=True),
+        dtype=np.int64,
+    )
+    with transaction.atomic():
+        TestItemAnalysis.objects.get_or_create(test_id=test_id)
+        state = TestItemAnalysis.objects.select_for_update().get(test_id=test_id)
+        window = settings.TEST_ITEM_ANALYSIS_RESCAN_WINDOW
+        if full or state.key_signature != signature:
+            state.last_attempt_id = 0
+            state.attempts_count = 0
+            counted_ids = set()
+            existing = {}
+        else:
+            counted_ids = set(state.recent_attempt_ids)
+            existing = {
+                analysis.question_id: analysis
+                for analysis in QuestionAnalysis.objects.filter(test_id=test_id)
+            }
+
+        chunks = attempt_chunks(test_id, chunk_size, state.last_attempt_id)
+        late = late_attempts(
+            test_id,
+            max(state.last_attempt_id - window, 0),
+            state.last_attempt_id,
+            counted_ids,
+        )
+        if late is not None:
+            chunks = chain([late], chunks)
+
+        sums = np.zeros((len(SUM_FIELDS), len(question_ids)), dtype=np.int64)
+        answer_counts = Counter()
+        for rows, responses in chunks:
+            chunk_sums, chunk_counts = accumulate(
+                question_ids, rows, responses, correct_ids, correct_questions
+            )
+            sums += chunk_sums
+            answer_counts.update(chunk_counts)
+            state.last_attempt_id = max(state.last_attempt_id, int(rows[-1, 0]))
+            state.attempts_count += len(rows)
+            counted_ids.update(rows[:, 0].tolist())
+        state.recent_attempt_ids = sorted(
+            pk for pk in counted_ids if pk > state.last_attempt_id - window
+        )
+
+        analyses = []
+        for index, question_id in enumerate(question_ids.tolist()):
+            analysis = existing.get(question_id) or QuestionAnalysis(
+                question_id=question_id, test_id=test_id
+            )
+            for row, field in enumerate(SUM_FIELDS):
+                value = getattr(analysis, field) + int(sums[row, index])
+                setattr(analysis, field, value)
+            analyses.append(analysis)
+        by_question = {analysis.question_id: analysis for analysis in analyses}
+        for (question_id, answer_id), count in answer_counts.items():
+            analysis = by_question.get(question_id)
+            if analysis is not None:
+                key = str(answer_id)
+                counts = analysis.answer_counts
+                counts[key] = counts.get(key, 0) + count
+
+        QuestionAnalysis.objects.filter(test_id=test_id).delete()
+        QuestionAnalysis.objects.bulk_create(analyses, batch_size=1000)
+        state.key_signature = signature
+        state.save()
+    return state
+
+
+def item_analysis_report(state, answer_key):
+    """
+    Собирает отчет анализа вопросов теста. Тексты вопросов и ответов
+    и верные ответы берутся из кешированного ключа ответов answer_key.
+    """
+    answers = defaultdict(list)
+    for answer_id, (question_id, text) in sorted(answer_key["answers"].items()):
+        answers[question_id].append((answer_id, text))
+    questions = []
+    analyses = QuestionAnalysis.objects.filter(test_id=state.test_id).order_by(
+        "question_id"
+    )
+    for analysis in analyses:
+        question_id = analysis.question_id
+        if question_id not in answer_key["questions"]:
+            continue
+        correct = answer_key["correct"][question_id]
+        questions.append(
+            {
+                "question": question_id,
+                "text": answer_key["questions"][question_id],
+                "responses_count": analysis.responses_count,
+                "p_value": analysis.p_value,
+                "discrimination": analysis.discrimination,
+                "answers": [
+                    {
+                        "answer": answer_id,
+                        "text": text,
+                        "is_correct": answer_id in correct,
+                        "selected_count": analysis.answer_counts.get(str(answer_id), 0),
+                        "selection_rate": analysis.selection_rate(answer_id),
+                    }
+                    for answer_id, text in answers[question_id]
+                ],
+            }
+        )
+    return {
+        "test": state.test_id,
+        "attempts_count": state.attempts_count,
+        "updated_at": state.updated_at,
+        "questions": questions,
+    }
@@ -0,0 +1,210 @@
+import csv
+import json
+
+from django.db import transaction
+
+from .cache import invalidate_test
+from .models import Answer, Question
+
+# Банк вопросов загружается потоково: строки файла читаются по одной,
+# проверяются и накапливаются порциями по chunk_size, каждая порция
+# сохраняется двумя bulk_create (вопросы и их ответы). В памяти держится
+# только текущая порция и ограниченный список ошибок.
+#
+# Форматы:
+# - csv: колонки text, answer_1, answer_2, ... и correct — номера верных
+#   ответов через "|" (например, "1" или "1|3");
+# - json: NDJSON, по объекту на строку:
+#   {"text": "...", "answers": [{"text": "...", "is_correct": true}, ...]}
+IMPORT_FORMATS = {"csv": "csv", "json": "json", "ndjson": "json", "jsonl": "json"}
+ANSWER_COLUMN_PREFIX = "answer_"
+ANSWER_TEXT_MAX_LENGTH = Answer._meta.get_field("text").max_length
+
+
+class QuestionImportError(Exception):
+    """Ошибка формата файла банка вопросов, при которой загрузка невозможна."""
+
+
+def detect_format(name, fmt=None):
+    """Определяет формат по явному значению или расширению имени файла."""
+    fmt = fmt or name.rsplit(".", 1)[-1].lower()
+    if fmt not in IMPORT_FORMATS:
+        raise QuestionImportError(
+            "Неизвестный формат файла, ожидается csv или json (NDJSON)."
+        )
+    return IMPORT_FORMATS[fmt]
+
+
+def read_rows(stream, fmt):
+    """Возвращает итератор (номер строки, данные вопроса, ошибки) для формата."""
+    return read_csv_rows(stream) if fmt == "csv" else read_json_rows(stream)
+
+
+def read_csv_rows(stream):
+    """Читает вопросы из CSV, приводя строки к виду NDJSON-записи."""
+    reader = csv.DictReader(stream)
+    columns = reader.fieldnames or []
+    if "text" not in columns or "correct" not in columns:
+        raise QuestionImportError(
+            "В CSV нужны колонки text, correct и answer_1, answer_2, ..."
+        )
+    answer_columns = sorted(
+        (int(column.removeprefix(ANSWER_COLUMN_PREFIX)), column)
+        for column in columns
+        if column.startswith(ANSWER_COLUMN_PREFIX)
+        and column.removeprefix(ANSWER_COLUMN_PREFIX).isdigit()
+    )
+    for row in reader:
+        answers = {
+            number: (row.get(column) or "").strip()
+            for number, column in answer_columns
+        }
+        try:
+            correct = {int(number) for number in (row["correct"] or "").split("|")}
+        except ValueError:
+            yield reader.line_num, None, {
+                "correct": ["Ожидаются номера ответов через |."]
+            }
+            continue
+        if any(not answers.get(number) for number in correct):
+            yield reader.line_num, None, {
+                "correct": ["Номер верного ответа указывает на пустой ответ."]
+            }
+            continue
+        data = {
+            "text": row["text"],
+            "answers": [
+                {"text": text, "is_correct": number in correct}
+                for number, text in answers.items()
+                if text
+            ],
+        }
+        yield reader.line_num, data, None
+
+
+def read_json_rows(stream):
+    """Читает вопросы из NDJSON, пропуская пустые строки."""
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield number, None, {"non_field_errors": ["Строка не является JSON."]}
+            continue
+        yield number, data, None
+
+
+def validate_question(data):
+    """Проверяет данные вопроса и возвращает словарь ошибок по полям."""
+    if not isinstance(data, dict):
+        return {"non_field_errors": ["Ожидается объект с полями text и answers."]}
+    errors = {}
+    text = data.get("text")
+    if not isinstance(text, str) or not text.strip():
+        errors["text"] = ["Текст вопроса обязателен."]
+    answers = data.get("answers")
+    if not isinstance(answers, list) or len(answers) < 2:
+        errors["answers"] = ["Нужно не меньше двух вариантов ответа."]
+        return errors
+    for answer in answers:
+        if (
+            not isinstance(answer, dict)
+            or not isinstance(answer.get("text"), str)
+            or not answer["text"].strip()
+        ):
+            errors["answers"] = ["У каждого ответа должен быть текст."]
+            return errors
+        if len(answer["text"]) > ANSWER_TEXT_MAX_LENGTH:
+            errors["answers"] = [
+                f"Текст ответа длиннее {ANSWER_TEXT_MAX_LENGTH} символов."
+            ]
+            return errors
+        if not isinstance(answer.get("is_correct", False), bool):
+            errors["answers"] = ["Поле is_correct должно быть true или false."]
+            return errors
+    if not any(answer.get("is_correct") for answer in answers):
+        errors["answers"] = ["Нужен хотя бы один верный ответ."]
+    return errors
+
+
+class QuestionImporter:
+    """
+    Потоковая загрузка вопросов с ответами в тест.
+
+    Строки с ошибками пропускаются и попадают в отчет (не более max_errors
+    с подробностями, остальные только подсчитываются). В режиме dry_run
+    файл только проверяется. Каждая порция сохраняется в своей транзакции:
+    при прерывании загрузки уже сохраненные порции остаются в базе.
+    """
+
+    def __init__(self, test_id, chunk_size=1000, dry_run=False, max_errors=100):
+        self.test_id = test_id
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.buffer = []
+        self.rows = 0
+        self.created = 0
+        self.errors = []
+        self.errors_count = 0
+
+    def run(self, rows):
+        """Загружает вопросы из итератора read_rows и возвращает отчет."""
+        try:
+            for number, data, errors in rows:
+                self.rows += 1
+                errors = errors or validate_question(data)
+                if errors:
+                    self.add_error(number, errors)
+                    continue
+                self.buffer.append(data)
+                if len(self.buffer) >= self.chunk_size:
+                    self.flush()
+            self.flush()
+        except (UnicodeDecodeError, csv.Error) as error:
+            raise QuestionImportError(f"Не удалось прочитать файл: {error}")
+        finally:
+            if self.created and not self.dry_run:
+                invalidate_test(self.test_id)
+        return self.report()
+
+    def add_error(self, number, errors):
+        self.errors_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": number, "errors": errors})
+
+    def flush(self):
+        """Сохраняет накопленную порцию вопросов и их ответов."""
+        if not self.buffer:
+            return
+        if not self.dry_run:
+            questions = [
+                Question(test_id=self.test_id, text=data["text"].strip())
+                for data in self.buffer
+            ]
+            with transaction.atomic():
+                Question.objects.bulk_create(questions)
+                Answer.objects.bulk_create(
+                    [
+                        Answer(
+                            question_id=question.pk,
+                            text=answer["text"].strip(),
+                            is_correct=answer.get("is_correct", False),
+                        )
+                        for question, data in zip(questions, self.buffer)
+                        for answer in data["answers"]
+                    ]
+                )
+        self.created += len(self.buffer)
+        self.buffer = []
+
+    def report(self):
+        """Отчет о загрузке: количество строк, вопросов и ошибки по строкам."""
+        return {
+            "dry_run": self.dry_run,
+            "rows": self.rows,
+            "created": self.created,
+            "errors_count": self.errors_count,
+            "errors": self.errors,
+        }
@@ -0,0 +1,176 @@
+"""
+Локальный буфер попыток прохождения тестов (режим write-behind).
+
+Попытки дописываются в файл в формате NDJSON (одна JSON-запись на строку) с
+эксклюзивной блокировкой и fsync, после чего запрос сразу возвращает ответ.
+Команда flush_test_attempts забирает накопленный файл и сохраняет попытки
+в TestAttempt пакетами через bulk_create.
+
+Каждая запись получает уникальный record_id, который сохраняется в попытке:
+повторное сохранение того же файла (например, после сбоя между фиксацией
+транзакции и удалением файла) пропускает уже сохраненные записи. Записи,
+которые нельзя сохранить (тест или пользователь удалены), переносятся
+в файл отклоненных записей.
+
+Чтобы история попыток не читала весь буфер, записи каждого пользователя
+дополнительно хранятся в кеше до тех пор, пока сборщик их не обработает.
+"""
+
+import fcntl
+import json
+import os
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+
+FLUSHING_SUFFIX = ".flushing"
+REJECTED_SUFFIX = ".rejected"
+PENDING_LOCK_SUFFIX = ".pending.lock"
+
+
+def buffer_path():
+    """Путь к активному файлу буфера."""
+    return Path(settings.TEST_ATTEMPTS_BUFFER_PATH)
+
+
+def flushing_path():
+    """Путь к файлу, который в данный момент сохраняется в БД."""
+    path = buffer_path()
+    return path.with_name(path.name + FLUSHING_SUFFIX)
+
+
+def rejected_path():
+    """Путь к файлу записей, которые не удалось сохранить в БД."""
+    path = buffer_path()
+    return path.with_name(path.name + REJECTED_SUFFIX)
+
+
+def pending_key(user_id):
+    """Ключ кеша с необработанными записями пользователя."""
+    return f"testing:pending_attempts:{user_id}"
+
+
+def encode_record(record):
+    """Преобразует запись попытки в строку NDJSON."""
+    data = dict(record, submitted_at=record["submitted_at"].isoformat())
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+def decode_record(line):
+    """Восстанавливает запись попытки из строки NDJSON."""
+    record = json.loads(line)
+    record["submitted_at"] = parse_datetime(record["submitted_at"])
+    return record
+
+
+def _open_locked(path):
+    """
+    Открывает файл буфера на дозапись под эксклюзивной блокировкой.
+
+    Если файл был переименован сборщиком, пока мы ждали блокировку,
+    открывает заново уже новый файл, чтобы запись не потерялась.
+    """
+    while True:
+        file = open(path, "a", encoding="utf-8")
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            if os.fstat(file.fileno()).st_ino == os.stat(path).st_ino:
+                return file
+        except FileNotFoundError:
+            pass
+        file.close()
+
+
+def append_records(records):
+    """Надежно дописывает записи попыток в буфер."""
+    path = buffer_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    records = [dict(record, record_id=str(uuid.uuid4())) for record in records]
+    data = "".join(encode_record(record) for record in records)
+    with _open_locked(path) as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    _update_pending(records, [])
+
+
+def _update_pending(added, processed):
+    """
+    Добавляет записи в кеш необработанных записей пользователей
+    и удаляет из него обработанные сборщиком.
+    """
+    user_ids = {record["user_id"] for record in [*added, *processed]}
+    if not user_ids:
+        return
+    processed_ids = {record["record_id"] for record in processed}
+    path = buffer_path()
+    with open(path.with_name(path.name + PENDING_LOCK_SUFFIX), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        entries = cache.get_many([pending_key(user_id) for user_id in user_ids])
+        for record in added:
+            entries.setdefault(pending_key(record["user_id"]), []).append(record)
+        for user_id in user_ids:
+            key = pending_key(user_id)
+            records = [
+                record
+                for record in entries.get(key, [])
+                if record["record_id"] not in processed_ids
+            ]
+            if records:
+                cache.set(key, records, settings.TEST_ATTEMPTS_PENDING_TIMEOUT)
+            else:
+                cache.delete(key)
+
+
+def forget_pending(records):
+    """Убирает обработанные сборщиком записи из кеша необработанных записей."""
+    _update_pending([], records)
+
+
+def reject_records(records):
+    """Дописывает записи, которые нельзя сохранить, в файл отклоненных записей."""
+    path = rejected_path()
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("".join(encode_record(record) for record in records))
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def read_records(path):
+    """Построчно читает записи из файла буфера."""
+    try:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield decode_record(line)
+    except FileNotFoundError:
+        return
+
+
+def pending_records(user_id):
+    """
+    Возвращает попытки пользователя из буфера, еще не сохраненные в БД.
+    Файлы буфера не читаются: записи берутся из кеша пользователя.
+    """
+    return cache.get(pending_key(user_id), [])
+
+
+def rotate():
+    """
+    Переименовывает активный буфер в файл для сохранения.
+
+    Если предыдущее сохранение не завершилось, новый файл не забирается,
+    а возвращается оставшийся файл. Возвращает путь или None, если сохранять нечего.
+    """
+    target = flushing_path()
+    if target.exists():
+        return target
+    path = buffer_path()
+    if not path.exists():
+        return None
+    with _open_locked(path):
+        os.replace(path, target)
+    return target
@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, prefetch_related_objects
+
+from .models import Test
+from .sampling import invalidate_question_ids
+from .serializers import TestSerializer, TestSummarySerializer
+from .services import invalidate_answer_key
+
+TEST_PAYLOAD_KEY = "testing:test_payload:{}"
+
+
+def test_payload_key(test_id):
+    """Ключ кеша сериализованного теста с вопросами и ответами."""
+    return TEST_PAYLOAD_KEY.format(test_id)
+
+
+def get_test_payloads(test_ids):
+    """
+    Возвращает сериализованные тесты в порядке test_ids.
+
+    Готовые данные берутся из кеша одним обращением, недостающие тесты
+    загружаются тремя запросами (тесты, вопросы, ответы) и сохраняются в кеш.
+    Тесты с выборкой вопросов (questions_per_attempt) отдаются краткой
+    сводкой без вопросов: их банк может быть очень большим, а вопросы
+    попытки выдаются только через start/.
+    """
+    keys = {test_id: test_payload_key(test_id) for test_id in test_ids}
+    cached = cache.get_many(keys.values())
+    payloads = {
+        test_id: cached[key] for test_id, key in keys.items() if key in cached
+    }
+    missing = [test_id for test_id in test_ids if test_id not in payloads]
+    if missing:
+        tests = Test.objects.filter(id__in=missing).annotate(
+            questions_count=Count("questions")
+        )
+        sampled = [test for test in tests if test.questions_per_attempt]
+        full = [test for test in tests if not test.questions_per_attempt]
+        prefetch_related_objects(full, "questions__answers")
+        fresh = {test.id: dict(TestSerializer(test).data) for test in full}
+        fresh.update(
+            (test.id, dict(TestSummarySerializer(test).data)) for test in sampled
+        )
+        cache.set_many(
+            {keys[test_id]: payload for test_id, payload in fresh.items()},
+            settings.TEST_PAYLOAD_CACHE_TIMEOUT,
+        )
+        payloads.update(fresh)
+    return [payloads[test_id] for test_id in test_ids if test_id in payloads]
+
+
+def invalidate_test_payload(*test_ids):
+    """Удаляет из кеша сериализованные тесты."""
+    cache.delete_many([test_payload_key(test_id) for test_id in test_ids if test_id])
+
+
+def invalidate_test(test_id):
+    """Сбрасывает кешированные ключ ответов, сериализованный тест и id вопросов."""
+    invalidate_answer_key(test_id)
+    invalidate_test_payload(test_id)
+    invalidate_question_ids(test_id)
+
+
+def invalidate_test_on_commit(test_id):
+    """
+    Сбрасывает кеши теста после фиксации текущей транзакции.
+
+    Сброс до фиксации оставляет окно, в котором отправка попытки строит ключ
+    ответов из еще не измененных данных и кеширует его на
+    ANSWER_KEY_CACHE_TIMEOUT. Вне транзакции сброс выполняется сразу.
+    """
+    transaction.on_commit(lambda: invalidate_test(test_id))
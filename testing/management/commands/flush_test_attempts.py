@@ -0,0 +1,74 @@
+import time
+from itertools import islice
+
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from testing import buffer
+from testing.services import persist_attempts, split_buffered_records
+
+
+class Command(BaseCommand):
+    """Команда для сохранения буферизованных попыток прохождения тестов"""
+
+    help = "Сохраняет попытки из буфера write-behind в TestAttempt пакетами"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Количество попыток в одном bulk_create",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Интервал в секундах для работы в режиме воркера (0 — один проход)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            saved = self.flush(options["batch_size"])
+            if saved:
+                self.stdout.write(self.style.SUCCESS(f"Сохранено попыток: {saved}"))
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
+
+    def flush(self, batch_size):
+        """
+        Забирает файл буфера и сохраняет его одной транзакцией.
+
+        Сохранение идемпотентно: если файл не был удален после фиксации
+        транзакции, при следующем запуске уже сохраненные записи пропускаются.
+        Записи, которые нельзя сохранить, переносятся в файл отклоненных записей.
+        Обработанные записи убираются из кеша истории пользователей.
+        """
+        path = buffer.rotate()
+        if path is None:
+            return 0
+        saved = 0
+        rejected = []
+        processed = []
+        records = buffer.read_records(path)
+        with transaction.atomic():
+            while batch := list(islice(records, batch_size)):
+                processed.extend(
+                    {"user_id": record["user_id"], "record_id": record["record_id"]}
+                    for record in batch
+                    if "record_id" in record
+                )
+                batch, batch_rejected = split_buffered_records(batch)
+                if batch:
+                    persist_attempts(batch)
+                saved += len(batch)
+                rejected.extend(batch_rejected)
+        if rejected:
+            buffer.reject_records(rejected)
+            self.stderr.write(
+                f"Отклонено попыток: {len(rejected)} (см. {buffer.rejected_path()})"
+            )
+        path.unlink()
+        buffer.forget_pending(processed)
+        return saved
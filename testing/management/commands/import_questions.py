@@ -0,0 +1,75 @@
+import sys
+
+from django.core.management import BaseCommand, CommandError
+
+from testing.bank import (QuestionImporter, QuestionImportError,
+                          detect_format, read_rows)
+from testing.models import Test
+
+
+class Command(BaseCommand):
+    """Команда для потоковой загрузки банка вопросов в тест"""
+
+    help = (
+        "Загружает вопросы с ответами из CSV (text, answer_1, answer_2, ..., "
+        "correct) или NDJSON в тест. Строки с ошибками пропускаются и "
+        "выводятся в отчете; --dry-run только проверяет файл."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("test_id", type=int, help="ID теста")
+        parser.add_argument("path", help="Файл с вопросами; '-' — стандартный ввод")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "json"],
+            help="Формат файла; по умолчанию — по расширению",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Количество вопросов, сохраняемых одним bulk_create",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только проверить файл, ничего не сохраняя",
+        )
+        parser.add_argument(
+            "--max-errors",
+            type=int,
+            default=100,
+            help="Сколько ошибок выводить подробно",
+        )
+
+    def handle(self, *args, **options):
+        if not Test.objects.filter(pk=options["test_id"]).exists():
+            raise CommandError(f"Тест {options['test_id']} не найден")
+        importer = QuestionImporter(
+            options["test_id"],
+            chunk_size=options["chunk_size"],
+            dry_run=options["dry_run"],
+            max_errors=options["max_errors"],
+        )
+        try:
+            fmt = detect_format(options["path"], options["format"])
+            if options["path"] == "-":
+                report = importer.run(read_rows(sys.stdin, fmt))
+            else:
+                with open(options["path"], encoding="utf-8-sig", newline="") as stream:
+                    report = importer.run(read_rows(stream, fmt))
+        except QuestionImportError as error:
+            raise CommandError(str(error))
+
+        for error in report["errors"]:
+            self.stderr.write(f"Строка {error['row']}: {error['errors']}")
+        if report["errors_count"] > len(report["errors"]):
+            hidden = report["errors_count"] - len(report["errors"])
+            self.stderr.write(f"... и еще ошибок: {hidden}")
+        action = "Проверено" if report["dry_run"] else "Загружено"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{action} вопросов: {report['created']}, "
+                f"строк с ошибками: {report['errors_count']}"
+            )
+        )
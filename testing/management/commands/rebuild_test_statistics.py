@@ -0,0 +1,33 @@
+from django.core.management import BaseCommand
+
+from testing.statistics import rebuild_test_statistics, rebuild_user_summaries
+
+
+class Command(BaseCommand):
+    """Команда для пересчета статистики тестов и сводок пользователей"""
+
+    help = (
+        "Пересчитывает агрегированную статистику тестов и сводки попыток "
+        "пользователей по всем попыткам"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--test",
+            type=int,
+            action="append",
+            dest="test_ids",
+            help="ID теста для пересчета (можно указать несколько раз)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Размер порции при потоковом чтении попыток",
+        )
+
+    def handle(self, *args, **options):
+        saved = rebuild_test_statistics(options["test_ids"], options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Статистика пересчитана для тестов: {saved}"))
+        saved = rebuild_user_summaries(options["test_ids"], options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано сводок пользователей: {saved}"))
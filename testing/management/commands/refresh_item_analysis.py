@@ -0,0 +1,64 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from testing.analysis import refresh_item_analysis
+from testing.models import Test, TestAttempt
+
+
+class Command(BaseCommand):
+    """Команда для обновления анализа вопросов тестов"""
+
+    help = (
+        "Учитывает в анализе вопросов (трудность, дискриминативность, выбор "
+        "вариантов) попытки, сохраненные после прошлого обновления"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--test",
+            type=int,
+            action="append",
+            dest="test_ids",
+            help="ID теста (можно указать несколько раз); "
+            "по умолчанию — все тесты с попытками",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Пересчитать анализ по всем попыткам",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Количество попыток, обрабатываемых за одну порцию",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Интервал в секундах для работы в режиме воркера (0 — один проход)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            tests = Test.objects.order_by("id")
+            if options["test_ids"]:
+                tests = tests.filter(id__in=options["test_ids"])
+            else:
+                tests = tests.filter(
+                    Exists(TestAttempt.objects.filter(test=OuterRef("pk")))
+                )
+            for test_id in tests.values_list("id", flat=True):
+                state = refresh_item_analysis(
+                    test_id, options["chunk_size"], options["full"]
+                )
+                self.stdout.write(
+                    f"Тест {test_id}: учтено попыток {state.attempts_count}"
+                )
+            if not options["interval"]:
+                break
+            options["full"] = False
+            time.sleep(options["interval"])
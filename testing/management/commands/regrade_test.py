@@ -0,0 +1,47 @@
+from django.core.management import BaseCommand, CommandError
+
+from testing.models import Test
+from testing.regrade import regrade_test
+
+
+class Command(BaseCommand):
+    """Команда для перепроверки попыток теста по исправленному ключу ответов"""
+
+    help = (
+        "Пересчитывает результаты всех сохраненных попыток теста по текущим "
+        "верным ответам и сообщает, сколько попыток сменили итог "
+        "(пройден/не пройден). Статистика теста и сводки пользователей "
+        "пересчитываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("test_id", type=int, help="ID теста")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Количество попыток, обрабатываемых за одну порцию",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать изменения, ничего не сохраняя",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = regrade_test(
+                options["test_id"], options["chunk_size"], options["dry_run"]
+            )
+        except Test.DoesNotExist:
+            raise CommandError(f"Тест {options['test_id']} не найден")
+        prefix = "Проверка без сохранения. " if options["dry_run"] else ""
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}Попыток: {report['attempts']}, "
+                f"пропущено без сохраненных ответов: {report['skipped']}, "
+                f"изменено: {report['changed']}, "
+                f"стали пройденными: {report['failed_to_passed']}, "
+                f"перестали быть пройденными: {report['passed_to_failed']}"
+            )
+        )
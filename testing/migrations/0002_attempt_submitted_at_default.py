@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testing", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="testattempt",
+            name="submitted_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now,
+                editable=False,
+                help_text="Время завершения теста",
+                verbose_name="Дата и время прохождения",
+            ),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testing", "0002_attempt_submitted_at_default"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AttemptResponse",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "answer",
+                    models.ForeignKey(
+                        help_text="Вариант ответа, выбранный пользователем",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="responses",
+                        to="testing.answer",
+                        verbose_name="Выбранный ответ",
+                    ),
+                ),
+                (
+                    "attempt",
+                    models.ForeignKey(
+                        help_text="Попытка, в рамках которой дан ответ",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="responses",
+                        to="testing.testattempt",
+                        verbose_name="Попытка",
+                    ),
+                ),
+                (
+                    "question",
+                    models.ForeignKey(
+                        help_text="Вопрос, на который ответил пользователь",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="responses",
+                        to="testing.question",
+                        verbose_name="Вопрос",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ответ в попытке",
+                "verbose_name_plural": "Ответы в попытках",
+                "indexes": [
+                    models.Index(
+                        fields=["question", "answer"], name="testing_response_q_a_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:45
+
+import django.db.models.deletion
+import testing.models
+from django.db import migrations, models
+
+
+def backfill_statistics(apps, schema_editor):
+    """Заполняет статистику тестов по уже сохраненным попыткам."""
+    TestAttempt = apps.get_model("testing", "TestAttempt")
+    TestStatistics = apps.get_model("testing", "TestStatistics")
+    statistics = {}
+    rows = (
+        TestAttempt.objects.order_by()
+        .values_list("test_id", "score", "passed")
+        .iterator(chunk_size=2000)
+    )
+    for test_id, score, passed in rows:
+        stats = statistics.get(test_id)
+        if stats is None:
+            stats = statistics[test_id] = TestStatistics(
+                test_id=test_id, histogram=testing.models.empty_histogram()
+            )
+        stats.attempts_count += 1
+        stats.passed_count += int(passed)
+        stats.score_sum += score
+        stats.histogram[min(score // 10, testing.models.HISTOGRAM_BUCKETS - 1)] += 1
+    TestStatistics.objects.bulk_create(statistics.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testing", "0003_attemptresponse"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TestStatistics",
+            fields=[
+                (
+                    "test",
+                    models.OneToOneField(
+                        help_text="Тест, по которому собрана статистика",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="statistics",
+                        serialize=False,
+                        to="testing.test",
+                        verbose_name="Тест",
+                    ),
+                ),
+                (
+                    "attempts_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество попыток"
+                    ),
+                ),
+                (
+                    "passed_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество успешных попыток"
+                    ),
+                ),
+                (
+                    "score_sum",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Сумма результатов"
+                    ),
+                ),
+                (
+                    "histogram",
+                    models.JSONField(
+                        default=testing.models.empty_histogram,
+                        help_text="Количество попыток по корзинам 0-9, 10-19, ..., 90-100 процентов",
+                        verbose_name="Гистограмма результатов",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Обновлено"),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика теста",
+                "verbose_name_plural": "Статистика тестов",
+            },
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testing", "0004_teststatistics"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="testattempt",
+            name="test",
+            field=models.ForeignKey(
+                db_index=False,
+                help_text="Тест, который проходил пользователь",
+                on_delete=django.db.models.deletion.CASCADE,
+                to="testing.test",
+                verbose_name="Тест",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="testattempt",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                help_text="Пользователь, проходивший тест",
+                on_delete=django.db.models.deletion.CASCADE,
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Пользователь",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testattempt",
+            index=models.Index(
+                fields=["user", "test", "-submitted_at"],
+                name="testing_attempt_user_test_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testattempt",
+            index=models.Index(
+                fields=["test", "-submitted_at"], name="testing_attempt_test_date_idx"
+            ),
+        ),
+    ]
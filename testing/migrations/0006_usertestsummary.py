@@ -0,0 +1,104 @@
+# Generated by Django 5.2.4 on 2026-10-17 23:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    """Заполняет сводки пользователей по уже сохраненным попыткам."""
+    TestAttempt = apps.get_model("testing", "TestAttempt")
+    UserTestSummary = apps.get_model("testing", "UserTestSummary")
+    summaries = {}
+    rows = (
+        TestAttempt.objects.order_by("submitted_at")
+        .values_list("user_id", "test_id", "score", "passed", "submitted_at")
+        .iterator(chunk_size=2000)
+    )
+    for user_id, test_id, score, passed, submitted_at in rows:
+        summary = summaries.get((user_id, test_id))
+        if summary is None:
+            summary = summaries[(user_id, test_id)] = UserTestSummary(
+                user_id=user_id, test_id=test_id, best_score=score, attempts_count=0
+            )
+        summary.best_score = max(summary.best_score, score)
+        summary.last_score = score
+        summary.last_submitted_at = submitted_at
+        summary.attempts_count += 1
+        if passed and summary.first_passed_at is None:
+            summary.first_passed_at = submitted_at
+    UserTestSummary.objects.bulk_create(summaries.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testing", "0005_testattempt_composite_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserTestSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("best_score", models.IntegerField(verbose_name="Лучший результат")),
+                ("last_score", models.IntegerField(verbose_name="Последний результат")),
+                (
+                    "attempts_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество попыток"
+                    ),
+                ),
+                (
+                    "first_passed_at",
+                    models.DateTimeField(
+                        blank=True,
+                        null=True,
+                        verbose_name="Дата первого успешного прохождения",
+                    ),
+                ),
+                (
+                    "last_submitted_at",
+                    models.DateTimeField(verbose_name="Дата последней попытки"),
+                ),
+                (
+                    "test",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="summaries",
+                        to="testing.test",
+                        verbose_name="Тест",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="test_summaries",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Сводка попыток пользователя",
+                "verbose_name_plural": "Сводки попыток пользователей",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "test"), name="testing_summary_user_test_uniq"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
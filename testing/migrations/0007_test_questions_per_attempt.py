@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testing", "0006_usertestsummary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="test",
+            name="questions_per_attempt",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Сколько случайных вопросов банка выдавать в одной попытке; пусто — все вопросы",
+                null=True,
+                verbose_name="Вопросов в попытке",
+            ),
+        ),
+    ]
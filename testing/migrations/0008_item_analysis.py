@@ -0,0 +1,125 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testing", "0007_test_questions_per_attempt"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TestItemAnalysis",
+            fields=[
+                (
+                    "test",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="item_analysis",
+                        serialize=False,
+                        to="testing.test",
+                        verbose_name="Тест",
+                    ),
+                ),
+                (
+                    "last_attempt_id",
+                    models.BigIntegerField(
+                        default=0, verbose_name="Последняя учтенная попытка"
+                    ),
+                ),
+                (
+                    "attempts_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество учтенных попыток"
+                    ),
+                ),
+                (
+                    "key_signature",
+                    models.CharField(
+                        blank=True,
+                        max_length=64,
+                        verbose_name="Отпечаток ключа ответов",
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Обновлено"),
+                ),
+            ],
+            options={
+                "verbose_name": "Анализ вопросов теста",
+                "verbose_name_plural": "Анализ вопросов тестов",
+            },
+        ),
+        migrations.CreateModel(
+            name="QuestionAnalysis",
+            fields=[
+                (
+                    "question",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="analysis",
+                        serialize=False,
+                        to="testing.question",
+                        verbose_name="Вопрос",
+                    ),
+                ),
+                (
+                    "responses_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество ответов"
+                    ),
+                ),
+                (
+                    "correct_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество верных ответов"
+                    ),
+                ),
+                (
+                    "score_sum",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Сумма результатов ответивших"
+                    ),
+                ),
+                (
+                    "score_square_sum",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Сумма квадратов результатов ответивших"
+                    ),
+                ),
+                (
+                    "correct_score_sum",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Сумма результатов ответивших верно"
+                    ),
+                ),
+                (
+                    "answer_counts",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Сколько раз выбран каждый вариант: {id ответа: количество}",
+                        verbose_name="Выборы вариантов ответа",
+                    ),
+                ),
+                (
+                    "test",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="question_analyses",
+                        to="testing.test",
+                        verbose_name="Тест",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Анализ вопроса",
+                "verbose_name_plural": "Анализ вопросов",
+            },
+        ),
+    ]
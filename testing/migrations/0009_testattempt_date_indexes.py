@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testing", "0008_item_analysis"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="testattempt",
+            index=models.Index(
+                fields=["user", "-submitted_at"], name="testing_attempt_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="testattempt",
+            index=models.Index(
+                fields=["-submitted_at"], name="testing_attempt_date_idx"
+            ),
+        ),
+    ]
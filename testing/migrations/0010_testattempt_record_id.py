@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testing", "0009_testattempt_date_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testattempt",
+            name="record_id",
+            field=models.UUIDField(
+                blank=True,
+                editable=False,
+                help_text="Идентификатор записи буфера write-behind, из которой сохранена попытка",
+                null=True,
+                unique=True,
+                verbose_name="ID записи буфера",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("testing", "0010_testattempt_record_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="testitemanalysis",
+            name="recent_attempt_ids",
+            field=models.JSONField(
+                default=list,
+                help_text="id учтенных попыток в окне TEST_ITEM_ANALYSIS_RESCAN_WINDOW ниже последней учтенной",
+                verbose_name="Недавно учтенные попытки",
+            ),
+        ),
+    ]
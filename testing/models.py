@@ -1,7 +1,8 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
-from content.models import Material
+from content.models import Material, change_counters
 
 User = settings.AUTH_USER_MODEL
 
@@ -24,6 +25,13 @@ class Test(models.Model):
         verbose_name="Название теста",
         help_text="Введите название теста (максимум 255 символов)",
     )
+    questions_per_attempt = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Вопросов в попытке",
+        help_text="Сколько случайных вопросов банка выдавать в одной попытке; "
+        "пусто — все вопросы",
+    )
 
     def __str__(self):
         return f"Тест: {self.title}"
@@ -32,6 +40,34 @@ class Test(models.Model):
         verbose_name = "Тест"
         verbose_name_plural = "Тесты"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_material_id = instance.__dict__.get("material_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Сохраняет тест и обновляет счетчики тестов раздела и курса."""
+        adding = self._state.adding
+        loaded_material_id = getattr(self, "_loaded_material_id", self.material_id)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                change_counters(material_section_id(self.material_id), tests=1)
+            elif loaded_material_id != self.material_id:
+                change_counters(material_section_id(loaded_material_id), tests=-1)
+                change_counters(material_section_id(self.material_id), tests=1)
+        self._loaded_material_id = self.material_id
+
+
+def material_section_id(material_id):
+    """Возвращает id раздела материала."""
+    return (
+        Material.objects.filter(pk=material_id)
+        .values_list("section_id", flat=True)
+        .first()
+    )
+
 
 class Question(models.Model):
     """
@@ -96,15 +132,18 @@ class TestAttempt(models.Model):
     Хранит результаты прохождения теста конкретным пользователем.
     """
 
+    # Отдельные индексы по user и test не нужны: их покрывают составные индексы
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name="Пользователь",
         help_text="Пользователь, проходивший тест",
     )
     test = models.ForeignKey(
         Test,
         on_delete=models.CASCADE,
+        db_index=False,
         verbose_name="Тест",
         help_text="Тест, который проходил пользователь",
     )
@@ -115,12 +154,320 @@ class TestAttempt(models.Model):
         verbose_name="Пройден", help_text="Успешно ли пройден тест"
     )
     submitted_at = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         verbose_name="Дата и время прохождения",
         help_text="Время завершения теста",
     )
+    record_id = models.UUIDField(
+        null=True,
+        blank=True,
+        unique=True,
+        editable=False,
+        verbose_name="ID записи буфера",
+        help_text="Идентификатор записи буфера write-behind, из которой сохранена попытка",
+    )
 
     class Meta:
         verbose_name = "Попытка прохождения теста"
         verbose_name_plural = "Попытки прохождения тестов"
         ordering = ["-submitted_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "test", "-submitted_at"],
+                name="testing_attempt_user_test_idx",
+            ),
+            models.Index(
+                fields=["user", "-submitted_at"], name="testing_attempt_user_date_idx"
+            ),
+            models.Index(
+                fields=["test", "-submitted_at"], name="testing_attempt_test_date_idx"
+            ),
+            models.Index(fields=["-submitted_at"], name="testing_attempt_date_idx"),
+        ]
+
+
+class AttemptResponse(models.Model):
+    """
+    Модель ответа пользователя на отдельный вопрос в рамках попытки.
+    Хранит, какой вариант ответа был выбран на какой вопрос, для последующей
+    аналитики и перепроверки попыток.
+    """
+
+    attempt = models.ForeignKey(
+        TestAttempt,
+        on_delete=models.CASCADE,
+        related_name="responses",
+        verbose_name="Попытка",
+        help_text="Попытка, в рамках которой дан ответ",
+    )
+    question = models.ForeignKey(
+        Question,
+        on_delete=models.CASCADE,
+        related_name="responses",
+        verbose_name="Вопрос",
+        help_text="Вопрос, на который ответил пользователь",
+    )
+    answer = models.ForeignKey(
+        Answer,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="responses",
+        verbose_name="Выбранный ответ",
+        help_text="Вариант ответа, выбранный пользователем",
+    )
+
+    class Meta:
+        verbose_name = "Ответ в попытке"
+        verbose_name_plural = "Ответы в попытках"
+        indexes = [
+            models.Index(
+                fields=["question", "answer"], name="testing_response_q_a_idx"
+            ),
+        ]
+
+
+HISTOGRAM_BUCKETS = 10
+
+
+def empty_histogram():
+    """Пустая гистограмма результатов: 10 корзин по 10 процентных пунктов."""
+    return [0] * HISTOGRAM_BUCKETS
+
+
+class TestStatistics(models.Model):
+    """
+    Модель агрегированной статистики по тесту.
+    Обновляется инкрементально при сохранении каждой новой попытки,
+    поэтому чтение статистики не требует агрегации по TestAttempt.
+    """
+
+    test = models.OneToOneField(
+        Test,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="statistics",
+        verbose_name="Тест",
+        help_text="Тест, по которому собрана статистика",
+    )
+    attempts_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество попыток"
+    )
+    passed_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество успешных попыток"
+    )
+    score_sum = models.PositiveBigIntegerField(
+        default=0, verbose_name="Сумма результатов"
+    )
+    histogram = models.JSONField(
+        default=empty_histogram,
+        verbose_name="Гистограмма результатов",
+        help_text="Количество попыток по корзинам 0-9, 10-19, ..., 90-100 процентов",
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    class Meta:
+        verbose_name = "Статистика теста"
+        verbose_name_plural = "Статистика тестов"
+
+    def __str__(self):
+        return f"Статистика: {self.test_id}"
+
+    @property
+    def pass_rate(self):
+        """Доля успешных попыток в процентах."""
+        if not self.attempts_count:
+            return 0
+        return round(self.passed_count * 100 / self.attempts_count, 2)
+
+    @property
+    def average_score(self):
+        """Средний результат попыток в процентах."""
+        if not self.attempts_count:
+            return 0
+        return round(self.score_sum / self.attempts_count, 2)
+
+    def add(self, score, passed):
+        """Учитывает в статистике одну попытку."""
+        self.attempts_count += 1
+        self.passed_count += int(passed)
+        self.score_sum += score
+        self.histogram[min(score // 10, HISTOGRAM_BUCKETS - 1)] += 1
+
+
+class UserTestSummary(models.Model):
+    """
+    Модель сводки попыток пользователя по тесту.
+    Одна строка на пару (пользователь, тест) с лучшим и последним результатом,
+    количеством попыток и временем первого успешного прохождения.
+    Обновляется одним upsert при сохранении попыток.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        db_index=False,
+        related_name="test_summaries",
+        verbose_name="Пользователь",
+    )
+    test = models.ForeignKey(
+        Test,
+        on_delete=models.CASCADE,
+        related_name="summaries",
+        verbose_name="Тест",
+    )
+    best_score = models.IntegerField(verbose_name="Лучший результат")
+    last_score = models.IntegerField(verbose_name="Последний результат")
+    attempts_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество попыток"
+    )
+    first_passed_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Дата первого успешного прохождения"
+    )
+    last_submitted_at = models.DateTimeField(verbose_name="Дата последней попытки")
+
+    class Meta:
+        verbose_name = "Сводка попыток пользователя"
+        verbose_name_plural = "Сводки попыток пользователей"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "test"], name="testing_summary_user_test_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} — {self.test_id}: {self.best_score}"
+
+    @property
+    def passed(self):
+        """Пройден ли тест хотя бы один раз."""
+        return self.first_passed_at is not None
+
+    def add(self, score, passed, submitted_at):
+        """Учитывает в сводке попытку; попытки передаются по возрастанию даты."""
+        if self.best_score is None or score > self.best_score:
+            self.best_score = score
+        self.last_score = score
+        self.last_submitted_at = submitted_at
+        self.attempts_count += 1
+        if passed and self.first_passed_at is None:
+            self.first_passed_at = submitted_at
+
+
+class TestItemAnalysis(models.Model):
+    """
+    Модель состояния анализа вопросов теста.
+    Хранит id последней учтенной попытки, чтобы анализ обновлялся
+    инкрементально, id попыток, учтенных в окне перепроверки ниже нее,
+    и отпечаток ключа ответов: при его изменении анализ пересчитывается с нуля.
+    """
+
+    test = models.OneToOneField(
+        Test,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="item_analysis",
+        verbose_name="Тест",
+    )
+    last_attempt_id = models.BigIntegerField(
+        default=0, verbose_name="Последняя учтенная попытка"
+    )
+    attempts_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество учтенных попыток"
+    )
+    recent_attempt_ids = models.JSONField(
+        default=list,
+        verbose_name="Недавно учтенные попытки",
+        help_text="id учтенных попыток в окне TEST_ITEM_ANALYSIS_RESCAN_WINDOW "
+        "ниже последней учтенной",
+    )
+    key_signature = models.CharField(
+        max_length=64, blank=True, verbose_name="Отпечаток ключа ответов"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+
+    class Meta:
+        verbose_name = "Анализ вопросов теста"
+        verbose_name_plural = "Анализ вопросов тестов"
+
+    def __str__(self):
+        return f"Анализ вопросов: {self.test_id}"
+
+
+class QuestionAnalysis(models.Model):
+    """
+    Модель статистики вопроса по ответам всех попыток теста.
+    Хранит аддитивные суммы, из которых вычисляются трудность (p-value),
+    точечно-бисериальная корреляция с результатом попытки и доли выбора
+    вариантов ответа; новые попытки просто добавляются к суммам.
+    """
+
+    question = models.OneToOneField(
+        Question,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="analysis",
+        verbose_name="Вопрос",
+    )
+    test = models.ForeignKey(
+        Test,
+        on_delete=models.CASCADE,
+        related_name="question_analyses",
+        verbose_name="Тест",
+    )
+    responses_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество ответов"
+    )
+    correct_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество верных ответов"
+    )
+    score_sum = models.PositiveBigIntegerField(
+        default=0, verbose_name="Сумма результатов ответивших"
+    )
+    score_square_sum = models.PositiveBigIntegerField(
+        default=0, verbose_name="Сумма квадратов результатов ответивших"
+    )
+    correct_score_sum = models.PositiveBigIntegerField(
+        default=0, verbose_name="Сумма результатов ответивших верно"
+    )
+    answer_counts = models.JSONField(
+        default=dict,
+        verbose_name="Выборы вариантов ответа",
+        help_text="Сколько раз выбран каждый вариант: {id ответа: количество}",
+    )
+
+    class Meta:
+        verbose_name = "Анализ вопроса"
+        verbose_name_plural = "Анализ вопросов"
+
+    def __str__(self):
+        return f"Анализ вопроса: {self.question_id}"
+
+    @property
+    def p_value(self):
+        """Трудность вопроса — доля верных ответов среди ответивших."""
+        if not self.responses_count:
+            return None
+        return round(self.correct_count / self.responses_count, 4)
+
+    @property
+    def discrimination(self):
+        """
+        Точечно-бисериальная корреляция верности ответа с результатом попытки.
+        None, если все ответы одинаково верны или результаты не различаются.
+        """
+        n, correct = self.responses_count, self.correct_count
+        numerator = n * self.correct_score_sum - correct * self.score_sum
+        denominator = (n * correct - correct * correct) * (
+            n * self.score_square_sum - self.score_sum * self.score_sum
+        )
+        if denominator <= 0:
+            return None
+        return round(numerator / denominator**0.5, 4)
+
+    def selection_rate(self, answer_id):
+        """Доля ответивших, выбравших вариант answer_id."""
+        if not self.responses_count:
+            return None
+        count = self.answer_counts.get(str(answer_id), 0)
+        return round(count / self.responses_count, 4)
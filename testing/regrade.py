@@ -0,0 +1,176 @@
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+
+from content.progress import invalidate_course_progress
+
+from .models import (Answer, AttemptResponse, Question, Test, TestAttempt,
+                     TestItemAnalysis)
+from .statistics import rebuild_test_statistics, rebuild_user_summaries
+
+# Перепроверка читает попытки теста порциями по chunk_size, загружает их
+# ответы в массивы NumPy и считает количество верных ответов на попытку
+# векторно: без цикла Python по отдельным ответам. Ключ ответов берется
+# напрямую из БД (не из кеша), чтобы учесть только что исправленные флаги.
+
+
+def load_correct_pairs(test_id):
+    """
+    Возвращает отсортированные массивы id верных ответов теста и id их
+    вопросов для поиска через np.searchsorted.
+    """
+    pairs = np.array(
+        Answer.objects.filter(question__test_id=test_id, is_correct=True)
+        .order_by("id")
+        .values_list("id", "question_id"),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def attempt_chunks(test_id, chunk_size, after_id=0):
+    """
+    Итерирует попытки теста с id больше after_id порциями по chunk_size.
+
+    Для каждой порции возвращает массив строк (id, user_id, score, passed)
+    по возрастанию id и массив ответов (attempt_id, question_id, answer_id),
+    где удаленный ответ обозначен -1.
+    """
+    attempts = TestAttempt.objects.filter(test_id=test_id).order_by("id")
+    while True:
+        rows = np.array(
+            attempts.filter(id__gt=after_id).values_list(
+                "id", "user_id", "score", "passed"
+            )[:chunk_size],
+            dtype=np.int64,
+        ).reshape(-1, 4)
+        if not len(rows):
+            return
+        first_id, after_id = int(rows[0, 0]), int(rows[-1, 0])
+        responses = np.array(
+            AttemptResponse.objects.filter(
+                attempt__test_id=test_id,
+                attempt_id__gte=first_id,
+                attempt_id__lte=after_id,
+            ).values_list(
+                "attempt_id", "question_id", Coalesce(F("answer_id"), Value(-1))
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 3)
+        yield rows, responses
+
+
+def response_correctness(responses, correct_ids, correct_questions):
+    """
+    Возвращает булев массив: верен ли каждый ответ из responses.
+
+    Ответ верен, если он помечен верным и относится к тому же вопросу,
+    на который отвечал пользователь.
+    """
+    if not len(responses) or not len(correct_ids):
+        return np.zeros(len(responses), dtype=bool)
+    answers = responses[:, 2]
+    position = np.searchsorted(correct_ids, answers)
+    position = np.minimum(position, len(correct_ids) - 1)
+    return (correct_ids[position] == answers) & (
+        correct_questions[position] == responses[:, 1]
+    )
+
+
+def count_correct(attempt_ids, responses, correct_ids, correct_questions):
+    """Считает верные ответы для каждой попытки отсортированного attempt_ids."""
+    is_correct = response_correctness(responses, correct_ids, correct_questions)
+    attempt_index = np.searchsorted(attempt_ids, responses[:, 0])
+    return np.bincount(
+        attempt_index, weights=is_correct, minlength=len(attempt_ids)
+    ).astype(np.int64)
+
+
+def compute_scores(correct, total):
+    """Переводит количество верных ответов в проценты так же, как grade_answers."""
+    if not total:
+        return np.zeros(len(correct), dtype=np.int64)
+    return np.rint(correct / total * 100).astype(np.int64)
+
+
+def regrade_test(test_id, chunk_size=5000, dry_run=False):
+    """
+    Пересчитывает score и passed всех сохраненных попыток теста по текущему
+    ключу ответов.
+
+    Знаменатель — текущее количество вопросов теста, для тестов с выборкой
+    вопросов — размер выборки. Измененные попытки записываются bulk_update,
+    после чего статистика теста и сводки пользователей пересчитываются,
+    а анализ вопросов помечается для полного пересчета.
+    Попытки из буфера write-behind не учитываются: перед перепроверкой
+    их нужно сохранить командой flush_test_attempts. Попытки без сохраненных
+    ответов (сохраненные до появления AttemptResponse) перепроверить нельзя:
+    они пропускаются и не меняются.
+
+    Возвращает отчет: attempts, skipped, changed, passed_to_failed,
+    failed_to_passed.
+    """
+    test = Test.objects.values(
+        "questions_per_attempt", "material__section__course_id"
+    ).get(pk=test_id)
+    total = Question.objects.filter(test_id=test_id).count()
+    if test["questions_per_attempt"]:
+        total = min(total, test["questions_per_attempt"])
+    correct_ids, correct_questions = load_correct_pairs(test_id)
+    threshold = settings.TEST_PASS_THRESHOLD
+
+    report = {
+        "attempts": 0,
+        "skipped": 0,
+        "changed": 0,
+        "passed_to_failed": 0,
+        "failed_to_passed": 0,
+    }
+    flipped_users = set()
+    with transaction.atomic():
+        for rows, responses in attempt_chunks(test_id, chunk_size):
+            attempt_ids = rows[:, 0]
+            scores = compute_scores(
+                count_correct(attempt_ids, responses, correct_ids, correct_questions),
+                total,
+            )
+            passed = scores >= threshold
+            old_passed = rows[:, 3].astype(bool)
+            # Без сохраненных ответов результат попытки не восстановить
+            has_responses = np.isin(attempt_ids, responses[:, 0])
+            changed = ((scores != rows[:, 2]) | (passed != old_passed)) & has_responses
+            flipped = (passed != old_passed) & has_responses
+            passed_to_failed = old_passed & ~passed & has_responses
+            failed_to_passed = ~old_passed & passed & has_responses
+
+            report["attempts"] += int(has_responses.sum())
+            report["skipped"] += int((~has_responses).sum())
+            report["changed"] += int(changed.sum())
+            report["passed_to_failed"] += int(passed_to_failed.sum())
+            report["failed_to_passed"] += int(failed_to_passed.sum())
+            flipped_users.update(rows[flipped, 1].tolist())
+
+            if not dry_run and changed.any():
+                TestAttempt.objects.bulk_update(
+                    [
+                        TestAttempt(pk=pk, score=score, passed=is_passed)
+                        for pk, score, is_passed in zip(
+                            attempt_ids[changed].tolist(),
+                            scores[changed].tolist(),
+                            passed[changed].tolist(),
+                        )
+                    ],
+                    ["score", "passed"],
+                    batch_size=1000,
+                )
+        if not dry_run and report["changed"]:
+            rebuild_test_statistics([test_id])
+            rebuild_user_summaries([test_id])
+            # Результаты попыток изменились: анализ вопросов пересчитается с нуля
+            TestItemAnalysis.objects.filter(test_id=test_id).update(key_signature="")
+    if not dry_run and flipped_users:
+        course_id = test["material__section__course_id"]
+        invalidate_course_progress({(user_id, course_id) for user_id in flipped_users})
+    return report
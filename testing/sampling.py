@@ -0,0 +1,117 @@
+import random
+from array import array
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+
+from .models import Question
+from .serializers import QuestionSerializer
+from .services import GradingError
+
+# Попытка теста с банком вопросов получает случайную выборку. Список id
+# вопросов теста хранится в кеше компактным массивом, выборка делается
+# в памяти, а сами вопросы загружаются одним in_bulk — без ORDER BY random()
+# по всему банку. Выданные id возвращаются клиенту в подписанном токене,
+# поэтому для проверки попытки на сервере ничего не хранится.
+QUESTION_IDS_KEY = "testing:question_ids:{}"
+ATTEMPT_TOKEN_SALT = "testing.attempt"
+
+
+def question_ids_key(test_id):
+    """Ключ кеша массива id вопросов теста."""
+    return QUESTION_IDS_KEY.format(test_id)
+
+
+def get_question_ids(test_id):
+    """Возвращает массив id вопросов теста по возрастанию, используя кеш."""
+    key = question_ids_key(test_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = array(
+            "q",
+            Question.objects.filter(test_id=test_id)
+            .order_by("id")
+            .values_list("id", flat=True),
+        )
+        cache.set(key, ids, settings.TEST_PAYLOAD_CACHE_TIMEOUT)
+    return ids
+
+
+def invalidate_question_ids(*test_ids):
+    """Удаляет из кеша массивы id вопросов указанных тестов."""
+    cache.delete_many([question_ids_key(test_id) for test_id in test_ids if test_id])
+
+
+def sample_question_ids(test):
+    """
+    Выбирает вопросы для попытки: test.questions_per_attempt случайных
+    вопросов в случайном порядке или все вопросы по порядку, если размер
+    выборки не задан или не меньше банка.
+    """
+    ids = get_question_ids(test.id)
+    size = test.questions_per_attempt
+    if size is None or size >= len(ids):
+        return list(ids)
+    return random.sample(ids, size)
+
+
+def serve_questions(test):
+    """
+    Возвращает сериализованные вопросы попытки с вариантами ответов
+    и их id. Вопросы загружаются двумя запросами (вопросы и ответы).
+    """
+    ids = sample_question_ids(test)
+    questions = Question.objects.prefetch_related("answers").in_bulk(ids)
+    served = [questions[pk] for pk in ids if pk in questions]
+    return QuestionSerializer(served, many=True).data, [q.pk for q in served]
+
+
+def make_attempt_token(user_id, test_id, question_ids):
+    """Подписывает список выданных в попытке вопросов."""
+    return signing.dumps(
+        {"u": user_id, "t": test_id, "q": question_ids},
+        salt=ATTEMPT_TOKEN_SALT,
+        compress=True,
+    )
+
+
+def read_attempt_token(token, user_id, test_id):
+    """
+    Проверяет токен попытки и возвращает id выданных вопросов.
+    Бросает GradingError, если токен подделан, просрочен или выдан для
+    другого пользователя или теста.
+    """
+    try:
+        data = signing.loads(
+            token,
+            salt=ATTEMPT_TOKEN_SALT,
+            max_age=settings.TEST_ATTEMPT_TOKEN_MAX_AGE,
+        )
+    except signing.BadSignature:
+        raise GradingError("Недействительный или просроченный токен попытки.")
+    if data.get("u") != user_id or data.get("t") != test_id:
+        raise GradingError("Токен выдан для другой попытки.")
+    return data["q"]
+
+
+def served_answer_key(answer_key, token, user_id, test_id):
+    """
+    Ограничивает ключ ответов вопросами, выданными в попытке.
+
+    Без токена проверка идет по всем вопросам теста; для теста с выборкой
+    вопросов, меньшей банка, токен обязателен. Вопросы, удаленные после
+    выдачи, в результат не входят.
+    """
+    if not token:
+        sample_size = answer_key.get("sample_size")
+        if sample_size and sample_size < answer_key["total"]:
+            raise GradingError("Для теста с выборкой вопросов нужен токен попытки.")
+        return answer_key
+    questions = answer_key["questions"]
+    served = {
+        question_id: questions[question_id]
+        for question_id in read_attempt_token(token, user_id, test_id)
+        if question_id in questions
+    }
+    return {**answer_key, "questions": served, "total": len(served)}
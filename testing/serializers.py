@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import Answer, Question, Test
+from .models import Answer, Question, Test, TestAttempt, TestStatistics
 
 
 class AnswerSerializer(serializers.ModelSerializer):
@@ -37,7 +37,38 @@ class TestSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Test
-        fields = ["id", "title", "material", "questions"]
+        fields = ["id", "title", "material", "questions_per_attempt", "questions"]
+
+
+class TestSummarySerializer(serializers.ModelSerializer):
+    """
+    Краткий сериализатор теста для списков.
+    Возвращает количество вопросов вместо самих вопросов.
+    """
+
+    questions_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Test
+        fields = [
+            "id",
+            "title",
+            "material",
+            "questions_per_attempt",
+            "questions_count",
+        ]
+
+
+class AttemptStartSerializer(serializers.Serializer):
+    """
+    Сериализатор начала попытки: выданные вопросы теста и подписанный
+    токен с их id, который передается при отправке ответов.
+    """
+
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    questions = QuestionSerializer(many=True)
+    token = serializers.CharField()
 
 
 class UserAnswerSerializer(serializers.Serializer):
@@ -63,3 +94,117 @@ class SubmitTestSerializer(serializers.Serializer):
     answers = UserAnswerSerializer(
         many=True, help_text="Список ответов пользователя на вопросы теста"
     )
+    token = serializers.CharField(
+        required=False,
+        help_text="Токен попытки из tests/{id}/start/; обязателен для тестов "
+        "с выборкой вопросов",
+    )
+
+
+class BatchSubmissionItemSerializer(SubmitTestSerializer):
+    """
+    Сериализатор одной отправки в пакетной загрузке результатов.
+    Дополняет SubmitTestSerializer идентификатором теста.
+    """
+
+    test_id = serializers.IntegerField(help_text="ID теста, который проходил пользователь")
+
+
+class BatchSubmitSerializer(serializers.Serializer):
+    """
+    Сериализатор пакетной отправки результатов тестов.
+    Каждый элемент проверяется отдельно BatchSubmissionItemSerializer,
+    чтобы ошибки одного элемента не отклоняли весь пакет.
+    """
+
+    submissions = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=1000,
+        help_text="Список отправок в формате {test_id, answers, token}",
+    )
+
+
+class QuestionImportSerializer(serializers.Serializer):
+    """
+    Сериализатор загрузки банка вопросов из файла CSV или NDJSON.
+    """
+
+    file = serializers.FileField(help_text="Файл CSV или NDJSON с вопросами")
+    format = serializers.ChoiceField(
+        choices=["csv", "json"],
+        required=False,
+        help_text="Формат файла; по умолчанию — по расширению",
+    )
+    dry_run = serializers.BooleanField(
+        default=False, help_text="Только проверить файл, ничего не сохраняя"
+    )
+
+
+class TestStatisticsSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор агрегированной статистики теста.
+    Доля успешных попыток и средний результат вычисляются из счетчиков.
+    """
+
+    pass_rate = serializers.FloatField(read_only=True)
+    average_score = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = TestStatistics
+        fields = [
+            "test",
+            "attempts_count",
+            "passed_count",
+            "pass_rate",
+            "average_score",
+            "histogram",
+            "updated_at",
+        ]
+
+
+class AnswerAnalysisSerializer(serializers.Serializer):
+    """
+    Сериализатор статистики выбора варианта ответа.
+    """
+
+    answer = serializers.IntegerField()
+    text = serializers.CharField()
+    is_correct = serializers.BooleanField()
+    selected_count = serializers.IntegerField()
+    selection_rate = serializers.FloatField(allow_null=True)
+
+
+class QuestionAnalysisSerializer(serializers.Serializer):
+    """
+    Сериализатор анализа вопроса: трудность (доля верных ответов),
+    дискриминативность (точечно-бисериальная корреляция) и выбор вариантов.
+    """
+
+    question = serializers.IntegerField()
+    text = serializers.CharField()
+    responses_count = serializers.IntegerField()
+    p_value = serializers.FloatField(allow_null=True)
+    discrimination = serializers.FloatField(allow_null=True)
+    answers = AnswerAnalysisSerializer(many=True)
+
+
+class ItemAnalysisSerializer(serializers.Serializer):
+    """
+    Сериализатор анализа вопросов теста.
+    """
+
+    test = serializers.IntegerField()
+    attempts_count = serializers.IntegerField()
+    updated_at = serializers.DateTimeField()
+    questions = QuestionAnalysisSerializer(many=True)
+
+
+class TestAttemptSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор попытки прохождения теста для истории попыток.
+    """
+
+    class Meta:
+        model = TestAttempt
+        fields = ["id", "user", "test", "score", "passed", "submitted_at"]
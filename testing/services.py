@@ -0,0 +1,283 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from content.progress import invalidate_course_progress
+
+from . import buffer
+from .models import Answer, AttemptResponse, Question, Test, TestAttempt
+from .statistics import update_test_statistics, upsert_user_summaries
+
+ANSWER_KEY_KEY = "testing:answer_key:{}"
+
+
+class GradingError(Exception):
+    """Ошибка проверки ответов пользователя (невалидные вопросы и т.п.)."""
+
+
+def answer_key_cache_key(test_id):
+    """Ключ кеша ключа ответов теста."""
+    return ANSWER_KEY_KEY.format(test_id)
+
+
+def build_answer_keys(test_ids):
+    """
+    Строит ключи ответов для указанных тестов фиксированным числом запросов.
+
+    Ключ ответов — компактный словарь:
+    - questions: {question_id: текст вопроса}
+    - answers: {answer_id: (question_id, текст ответа)}
+    - correct: {question_id: [id правильных ответов]}
+    - total: количество вопросов в тесте
+    - course_id: курс, к которому относится тест
+    - sample_size: сколько вопросов выдается в попытке (None — все)
+    Несуществующие тесты в результат не попадают.
+    """
+    keys = {
+        test_id: {
+            "questions": {},
+            "answers": {},
+            "correct": {},
+            "total": 0,
+            "course_id": course_id,
+            "sample_size": sample_size,
+        }
+        for test_id, course_id, sample_size in Test.objects.filter(
+            id__in=test_ids
+        ).values_list("id", "material__section__course_id", "questions_per_attempt")
+    }
+    questions = Question.objects.filter(test_id__in=keys).values_list(
+        "id", "test_id", "text"
+    )
+    for question_id, test_id, text in questions:
+        keys[test_id]["questions"][question_id] = text
+        keys[test_id]["correct"][question_id] = []
+        keys[test_id]["total"] += 1
+    answers = Answer.objects.filter(question__test_id__in=keys).values_list(
+        "id", "question_id", "question__test_id", "text", "is_correct"
+    )
+    for answer_id, question_id, test_id, text, is_correct in answers:
+        keys[test_id]["answers"][answer_id] = (question_id, text)
+        if is_correct:
+            keys[test_id]["correct"][question_id].append(answer_id)
+    return keys
+
+
+def get_answer_keys(test_ids):
+    """Возвращает ключи ответов тестов, используя кеш; {test_id: key}."""
+    cache_keys = {test_id: answer_key_cache_key(test_id) for test_id in test_ids}
+    cached = cache.get_many(cache_keys.values())
+    keys = {
+        test_id: cached[cache_key]
+        for test_id, cache_key in cache_keys.items()
+        if cache_key in cached
+    }
+    missing = [test_id for test_id in cache_keys if test_id not in keys]
+    if missing:
+        fresh = build_answer_keys(missing)
+        cache.set_many(
+            {cache_keys[test_id]: key for test_id, key in fresh.items()},
+            settings.ANSWER_KEY_CACHE_TIMEOUT,
+        )
+        keys.update(fresh)
+    return keys
+
+
+def get_answer_key(test_id):
+    """Возвращает ключ ответов одного теста или None, если теста нет."""
+    return get_answer_keys([test_id]).get(test_id)
+
+
+def invalidate_answer_key(*test_ids):
+    """Удаляет из кеша ключи ответов указанных тестов."""
+    cache.delete_many(
+        [answer_key_cache_key(test_id) for test_id in test_ids if test_id]
+    )
+
+
+def grade_answers(answer_key, user_answers):
+    """
+    Проверяет ответы пользователя по ключу ответов без обращения к БД.
+
+    user_answers — словарь {question_id: selected_answer_id}.
+    Возвращает словарь со score (процент), passed и подробным разбором details.
+    Бросает GradingError, если среди ответов есть вопросы не из этого теста.
+    """
+    questions = answer_key["questions"]
+    if any(question_id not in questions for question_id in user_answers):
+        raise GradingError("Невалидные вопросы в ответах.")
+
+    correct = 0
+    details = []
+    for question_id, answer_id in user_answers.items():
+        answer = answer_key["answers"].get(answer_id)
+        if answer is None or answer[0] != question_id:
+            continue
+        is_correct = answer_id in answer_key["correct"][question_id]
+        if is_correct:
+            correct += 1
+        details.append(
+            {
+                "question_id": question_id,
+                "question_text": questions[question_id],
+                "selected_answer_id": answer_id,
+                "selected_answer_text": answer[1],
+                "is_correct": is_correct,
+            }
+        )
+
+    total = answer_key["total"]
+    score = round((correct / total) * 100) if total else 0
+    return {
+        "score": score,
+        "passed": score >= settings.TEST_PASS_THRESHOLD,
+        "details": details,
+    }
+
+
+def make_attempt_record(user_id, test_id, result):
+    """
+    Формирует запись о попытке по результату проверки grade_answers.
+
+    responses — список пар [question_id, answer_id] из разбора попытки.
+    """
+    return {
+        "user_id": user_id,
+        "test_id": test_id,
+        "score": result["score"],
+        "passed": result["passed"],
+        "submitted_at": timezone.now(),
+        "responses": [
+            [detail["question_id"], detail["selected_answer_id"]]
+            for detail in result["details"]
+        ],
+    }
+
+
+def persist_attempts(records, batch_size=None):
+    """
+    Сохраняет записи о попытках и ответы на вопросы.
+
+    Выполняет один bulk_create для TestAttempt и один для AttemptResponse
+    независимо от количества попыток и ответов в них и в той же транзакции
+    обновляет агрегированную статистику тестов и сводки пользователей.
+    """
+    attempts = [
+        TestAttempt(
+            user_id=record["user_id"],
+            test_id=record["test_id"],
+            score=record["score"],
+            passed=record["passed"],
+            submitted_at=record["submitted_at"],
+            record_id=record.get("record_id"),
+        )
+        for record in records
+    ]
+    with transaction.atomic():
+        TestAttempt.objects.bulk_create(attempts, batch_size=batch_size)
+        AttemptResponse.objects.bulk_create(
+            [
+                AttemptResponse(
+                    attempt_id=attempt.pk, question_id=question_id, answer_id=answer_id
+                )
+                for attempt, record in zip(attempts, records)
+                for question_id, answer_id in record.get("responses", [])
+            ],
+            batch_size=batch_size,
+        )
+        update_test_statistics(records)
+        upsert_user_summaries(records)
+        transaction.on_commit(lambda: invalidate_progress(records))
+    return attempts
+
+
+def split_buffered_records(records):
+    """
+    Готовит записи из буфера write-behind к сохранению.
+
+    Возвращает пару (новые записи, отклоненные записи). Записи, уже
+    сохраненные ранее (по record_id), пропускаются. Записи удаленного теста
+    или пользователя отклоняются, ответы на удаленные вопросы отбрасываются,
+    удаленный вариант ответа сохраняется как пустой (как при SET_NULL).
+    """
+    record_ids = [record["record_id"] for record in records if record.get("record_id")]
+    saved = {
+        str(record_id)
+        for record_id in TestAttempt.objects.filter(
+            record_id__in=record_ids
+        ).values_list("record_id", flat=True)
+    }
+    test_ids = set(
+        Test.objects.filter(
+            pk__in={record["test_id"] for record in records}
+        ).values_list("pk", flat=True)
+    )
+    user_ids = set(
+        get_user_model()
+        .objects.filter(pk__in={record["user_id"] for record in records})
+        .values_list("pk", flat=True)
+    )
+    responses = [
+        response for record in records for response in record.get("responses", [])
+    ]
+    question_ids = set(
+        Question.objects.filter(
+            pk__in={question_id for question_id, _ in responses}
+        ).values_list("pk", flat=True)
+    )
+    answer_ids = set(
+        Answer.objects.filter(
+            pk__in={answer_id for _, answer_id in responses if answer_id}
+        ).values_list("pk", flat=True)
+    )
+
+    new, rejected = [], []
+    for record in records:
+        if record.get("record_id") in saved:
+            continue
+        if record["test_id"] not in test_ids or record["user_id"] not in user_ids:
+            rejected.append(record)
+            continue
+        new.append(
+            dict(
+                record,
+                responses=[
+                    [question_id, answer_id if answer_id in answer_ids else None]
+                    for question_id, answer_id in record.get("responses", [])
+                    if question_id in question_ids
+                ],
+            )
+        )
+    return new, rejected
+
+
+def invalidate_progress(records):
+    """
+    Сбрасывает кеш прогресса по курсам, тесты которых проходили пользователи.
+
+    Курс теста берется из кешированного ключа ответов, поэтому на горячем
+    пути дополнительных запросов к БД нет.
+    """
+    answer_keys = get_answer_keys({record["test_id"] for record in records})
+    invalidate_course_progress(
+        {
+            (record["user_id"], answer_keys[record["test_id"]]["course_id"])
+            for record in records
+            if record["test_id"] in answer_keys
+        }
+    )
+
+
+def record_attempts(records):
+    """
+    Фиксирует попытки прохождения тестов.
+
+    В режиме TEST_ATTEMPTS_WRITE_BEHIND попытки дописываются в локальный буфер
+    и сохраняются в БД позже командой flush_test_attempts, иначе — сразу.
+    """
+    if settings.TEST_ATTEMPTS_WRITE_BEHIND:
+        buffer.append_records(records)
+    else:
+        persist_attempts(records)
@@ -0,0 +1,73 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from content.cache import invalidate_course_tree_on_commit, material_course_id
+from content.models import Material, Section, change_counters
+from content.signals import deleting
+
+from .cache import invalidate_test_on_commit
+from .models import Answer, Question, Test, material_section_id
+
+
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+def invalidate_test_course(sender, instance, signal, **kwargs):
+    """Сбрасывает кеш дерева курса, к материалу которого привязан тест, и кеши теста."""
+    material = signal is post_delete and deleting(Material, instance.material_id)
+    if not (material and deleting(Section, material.section_id)):
+        invalidate_course_tree_on_commit(material_course_id(instance.material_id))
+    invalidate_test_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=Test)
+def decrement_test_counters(sender, instance, **kwargs):
+    """
+    Уменьшает счетчики тестов раздела и курса при удалении теста,
+    если раздел не удаляется вместе с ним.
+    """
+    material = deleting(Material, instance.material_id)
+    if material is None:
+        change_counters(material_section_id(instance.material_id), tests=-1)
+    elif not deleting(Section, material.section_id):
+        change_counters(material.section_id, tests=-1)
+
+
+def question_test_id(question_id):
+    """Возвращает id теста, к которому сейчас относится вопрос в БД."""
+    return (
+        Question.objects.filter(pk=question_id)
+        .values_list("test_id", flat=True)
+        .first()
+    )
+
+
+@receiver(pre_save, sender=Question)
+def invalidate_question_previous_test(sender, instance, **kwargs):
+    """При переносе вопроса в другой тест сбрасывает кеши прежнего теста."""
+    if instance.pk:
+        invalidate_test_on_commit(question_test_id(instance.pk))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question(sender, instance, **kwargs):
+    """Сбрасывает кеши теста при изменении или удалении вопроса."""
+    invalidate_test_on_commit(instance.test_id)
+
+
+@receiver(pre_save, sender=Answer)
+def invalidate_answer_previous_test(sender, instance, **kwargs):
+    """При переносе ответа к другому вопросу сбрасывает кеши прежнего теста."""
+    if instance.pk:
+        invalidate_test_on_commit(
+            Answer.objects.filter(pk=instance.pk)
+            .values_list("question__test_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def invalidate_answer(sender, instance, **kwargs):
+    """Сбрасывает кеши теста при изменении или удалении ответа."""
+    invalidate_test_on_commit(question_test_id(instance.question_id))
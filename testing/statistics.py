@@ -0,0 +1,190 @@
+from collections import defaultdict
+
+from django.db import connections, router, transaction
+
+from .models import TestAttempt, TestStatistics, UserTestSummary
+
+STATISTICS_FIELDS = ["attempts_count", "passed_count", "score_sum", "histogram"]
+
+
+def update_test_statistics(records):
+    """
+    Инкрементально учитывает новые попытки в статистике тестов.
+
+    Строки статистики затронутых тестов блокируются (select_for_update) в
+    порядке test_id, поэтому параллельные сохранения не теряют обновлений.
+    """
+    by_test = defaultdict(list)
+    for record in records:
+        by_test[record["test_id"]].append(record)
+    if not by_test:
+        return
+    with transaction.atomic(savepoint=False):
+        statistics = _lock_statistics(by_test)
+        missing = by_test.keys() - {item.test_id for item in statistics}
+        if missing:
+            TestStatistics.objects.bulk_create(
+                [TestStatistics(test_id=test_id) for test_id in missing],
+                ignore_conflicts=True,
+            )
+            statistics = _lock_statistics(by_test)
+        for item in statistics:
+            for record in by_test[item.test_id]:
+                item.add(record["score"], record["passed"])
+        TestStatistics.objects.bulk_update(statistics, STATISTICS_FIELDS)
+
+
+def _lock_statistics(test_ids):
+    """Блокирует и возвращает строки статистики тестов в порядке test_id."""
+    return list(
+        TestStatistics.objects.select_for_update()
+        .filter(test_id__in=test_ids)
+        .order_by("test_id")
+    )
+
+
+def rebuild_test_statistics(test_ids=None, chunk_size=2000):
+    """
+    Пересчитывает статистику тестов с нуля по всем попыткам.
+
+    Попытки читаются потоково в порядке test_id, поэтому в памяти хранится
+    статистика не более чем chunk_size тестов одновременно.
+    Возвращает количество тестов, для которых сохранена статистика.
+    """
+    attempts = TestAttempt.objects.order_by("test_id")
+    existing = TestStatistics.objects.all()
+    if test_ids is not None:
+        attempts = attempts.filter(test_id__in=test_ids)
+        existing = existing.filter(test_id__in=test_ids)
+
+    saved = 0
+    batch = []
+    current = None
+    with transaction.atomic():
+        existing.delete()
+        rows = attempts.values_list("test_id", "score", "passed").iterator(
+            chunk_size=chunk_size
+        )
+        for test_id, score, passed in rows:
+            if current is None or current.test_id != test_id:
+                if len(batch) >= chunk_size:
+                    TestStatistics.objects.bulk_create(batch)
+                    saved += len(batch)
+                    batch = []
+                current = TestStatistics(test_id=test_id)
+                batch.append(current)
+            current.add(score, passed)
+        TestStatistics.objects.bulk_create(batch)
+        saved += len(batch)
+    return saved
+
+
+def summarize_records(records):
+    """
+    Сворачивает записи о попытках в сводки по парам (пользователь, тест).
+
+    Возвращает несохраненные экземпляры UserTestSummary.
+    """
+    summaries = {}
+    for record in sorted(records, key=lambda record: record["submitted_at"]):
+        key = (record["user_id"], record["test_id"])
+        if key not in summaries:
+            summaries[key] = UserTestSummary(
+                user_id=record["user_id"], test_id=record["test_id"]
+            )
+        summaries[key].add(record["score"], record["passed"], record["submitted_at"])
+    return list(summaries.values())
+
+
+def upsert_user_summaries(records):
+    """
+    Учитывает новые попытки в сводках пользователей одним INSERT ... ON CONFLICT.
+
+    Лучший результат и дата первого прохождения объединяются с уже
+    сохраненными значениями на стороне БД, поэтому параллельные отправки
+    одного пользователя не перезаписывают друг друга.
+    """
+    summaries = summarize_records(records)
+    if not summaries:
+        return
+    connection = connections[router.db_for_write(UserTestSummary)]
+    if connection.vendor == "postgresql":
+        greatest, least = "GREATEST", "LEAST"
+    else:
+        greatest, least = "MAX", "MIN"
+    ops = connection.ops
+    table = ops.quote_name(UserTestSummary._meta.db_table)
+    placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(summaries))
+    params = []
+    for summary in summaries:
+        params.extend(
+            [
+                summary.user_id,
+                summary.test_id,
+                summary.best_score,
+                summary.last_score,
+                summary.attempts_count,
+                ops.adapt_datetimefield_value(summary.first_passed_at),
+                ops.adapt_datetimefield_value(summary.last_submitted_at),
+            ]
+        )
+    sql = f"""
+        INSERT INTO {table} (
+            user_id, test_id, best_score, last_score, attempts_count,
+            first_passed_at, last_submitted_at
+        )
+        VALUES {placeholders}
+        ON CONFLICT (user_id, test_id) DO UPDATE SET
+            best_score = {greatest}({table}.best_score, EXCLUDED.best_score),
+            last_score = CASE
+                WHEN EXCLUDED.last_submitted_at >= {table}.last_submitted_at
+                THEN EXCLUDED.last_score ELSE {table}.last_score
+            END,
+            attempts_count = {table}.attempts_count + EXCLUDED.attempts_count,
+            first_passed_at = COALESCE(
+                {least}({table}.first_passed_at, EXCLUDED.first_passed_at),
+                {table}.first_passed_at,
+                EXCLUDED.first_passed_at
+            ),
+            last_submitted_at = {greatest}(
+                {table}.last_submitted_at, EXCLUDED.last_submitted_at
+            )
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def rebuild_user_summaries(test_ids=None, chunk_size=2000):
+    """
+    Пересчитывает сводки пользователей с нуля по всем попыткам.
+
+    Попытки читаются потоково в порядке (пользователь, тест, дата) по
+    составному индексу; возвращает количество сохраненных сводок.
+    """
+    attempts = TestAttempt.objects.order_by("user_id", "test_id", "submitted_at")
+    existing = UserTestSummary.objects.all()
+    if test_ids is not None:
+        attempts = attempts.filter(test_id__in=test_ids)
+        existing = existing.filter(test_id__in=test_ids)
+
+    saved = 0
+    batch = []
+    current = None
+    with transaction.atomic():
+        existing.delete()
+        rows = attempts.values_list(
+            "user_id", "test_id", "score", "passed", "submitted_at"
+        ).iterator(chunk_size=chunk_size)
+        for user_id, test_id, score, passed, submitted_at in rows:
+            key = (user_id, test_id)
+            if current is None or (current.user_id, current.test_id) != key:
+                if len(batch) >= chunk_size:
+                    UserTestSummary.objects.bulk_create(batch)
+                    saved += len(batch)
+                    batch = []
+                current = UserTestSummary(user_id=user_id, test_id=test_id)
+                batch.append(current)
+            current.add(score, passed, submitted_at)
+        UserTestSummary.objects.bulk_create(batch)
+        saved += len(batch)
+    return saved
@@ -1,13 +1,32 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from authentication.models import User
+from content.cache import course_tree_key, get_course_trees
 from content.models import Course, Material, Section
 from testing.models import Answer as AnswerModel
+from testing.models import AttemptResponse as AttemptResponseModel
 from testing.models import Question as QuestionModel
 from testing.models import Test as TestModel
 from testing.models import TestAttempt as TestAttemptModel
+from testing.models import TestStatistics as TestStatisticsModel
+from testing.models import UserTestSummary as UserTestSummaryModel
+
+from .buffer import pending_records, read_records, rejected_path, rotate
+from .regrade import regrade_test
+from .services import answer_key_cache_key
 
 
 class TestingViewsTestCase(APITestCase):
@@ -17,6 +36,7 @@ class TestingViewsTestCase(APITestCase):
     """
 
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(
             email="student@example.com", password="testpass", role="student"
         )
@@ -47,12 +67,37 @@ class TestingViewsTestCase(APITestCase):
         url = reverse("testing:test-list")  # URL от ViewSet
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data[0]["title"], self.test.title)
+        self.assertEqual(response.data["results"][0]["title"], self.test.title)
         self.assertEqual(str(self.test), "Тест: Sample Test")
         self.assertEqual(str(self.question), "What is 2+2?")
         self.assertEqual(str(self.correct_answer), "4 (верный)")
         self.assertEqual(str(self.wrong_answer), "3 (неверный)")
 
+    def test_get_tests_summary(self):
+        """
+        Тест краткого списка тестов.
+        Проверяет, что список содержит количество вопросов, а не сами вопросы.
+        """
+        response = self.client.get(reverse("testing:test-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["questions_count"], 1)
+        self.assertNotIn("questions", response.data["results"][0])
+
+        response = self.client.get(reverse("testing:test-list") + "?expand=true")
+        self.assertEqual(len(response.data["results"][0]["questions"]), 1)
+
+    def test_test_change_invalidates_course_tree(self):
+        """
+        Тест инвалидации кеша дерева курса.
+        Изменение теста сбрасывает кеш курса, к материалу которого он привязан.
+        """
+        course_id = self.test.material.section.course_id
+        get_course_trees([course_id])
+        self.assertIsNotNone(cache.get(course_tree_key(course_id)))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test.save()
+        self.assertIsNone(cache.get(course_tree_key(course_id)))
+
     def test_submit_test_with_correct_answer(self):
         """
         Тест отправки теста с правильным ответом.
@@ -77,6 +122,10 @@ class TestingViewsTestCase(APITestCase):
         attempt = TestAttemptModel.objects.get(user=self.user, test=self.test)
         self.assertEqual(attempt.score, 100)
         self.assertTrue(attempt.passed)
+        self.assertEqual(
+            list(attempt.responses.values_list("question_id", "answer_id")),
+            [(self.question.id, self.correct_answer.id)],
+        )
         self.assertEqual(len(response.data["details"]), 1)
         self.assertTrue(response.data["details"][0]["is_correct"])
 
@@ -125,3 +174,1000 @@ class TestingViewsTestCase(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn("detail", response.data)
+
+
+class AnswerKeyCacheTestCase(APITestCase):
+    """
+    Тесты кеша ключей ответов, используемого при проверке теста.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        self.client.force_authenticate(user=self.user)
+
+        course = Course.objects.create(title="Course", owner=self.user)
+        section = Section.objects.create(title="Section", course=course)
+        material = Material.objects.create(
+            title="Material", content="Content", section=section
+        )
+        self.test = TestModel.objects.create(title="Sample Test", material=material)
+        self.question = QuestionModel.objects.create(
+            test=self.test, text="What is 2+2?"
+        )
+        self.correct_answer = AnswerModel.objects.create(
+            question=self.question, text="4", is_correct=True
+        )
+        self.wrong_answer = AnswerModel.objects.create(
+            question=self.question, text="3", is_correct=False
+        )
+        self.url = reverse("testing:submit-test", args=[self.test.id])
+
+    def _submit(self, answer):
+        """Отправляет ответ на единственный вопрос теста."""
+        data = {
+            "answers": [
+                {"question_id": self.question.id, "selected_answer_id": answer.id}
+            ]
+        }
+        return self.client.post(self.url, data, format="json")
+
+    def test_hot_submission_only_inserts_attempt(self):
+        """
+        При прогретом кеше проверка не читает ключ ответов из БД: выполняются
+        вставки попытки и ответов, обновление статистики и upsert сводки
+        пользователя (с точками сохранения).
+        """
+        self._submit(self.correct_answer)
+        with self.assertNumQueries(7):
+            response = self._submit(self.correct_answer)
+        self.assertEqual(response.data["score"], 100)
+
+    def test_answer_change_invalidates_key(self):
+        """Изменение правильного ответа сразу влияет на проверку."""
+        self.assertEqual(self._submit(self.wrong_answer).data["score"], 0)
+        self.wrong_answer.is_correct = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.wrong_answer.save()
+        self.assertEqual(self._submit(self.wrong_answer).data["score"], 100)
+
+    def test_new_question_invalidates_key(self):
+        """Добавление вопроса меняет общее количество вопросов в ключе."""
+        self.assertEqual(self._submit(self.correct_answer).data["score"], 100)
+        with self.captureOnCommitCallbacks(execute=True):
+            QuestionModel.objects.create(test=self.test, text="What is 3+3?")
+        self.assertEqual(self._submit(self.correct_answer).data["score"], 50)
+
+    def test_key_is_invalidated_after_commit(self):
+        """
+        Ключ ответов сбрасывается после фиксации транзакции: ключ, закешированный
+        параллельной отправкой до фиксации, не переживает изменение.
+        """
+        self._submit(self.correct_answer)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.wrong_answer.is_correct = True
+            self.wrong_answer.save()
+            self.assertIsNotNone(cache.get(answer_key_cache_key(self.test.id)))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(answer_key_cache_key(self.test.id)))
+
+    def test_submit_missing_test(self):
+        """Отправка ответов на несуществующий тест возвращает 404."""
+        url = reverse("testing:submit-test", args=[9999])
+        response = self.client.post(url, {"answers": []}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestPayloadCacheTestCase(APITestCase):
+    """
+    Тесты загрузки и кеширования тестов с вопросами и ответами.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        self.client.force_authenticate(user=self.user)
+        course = Course.objects.create(title="Course", owner=self.user)
+        section = Section.objects.create(title="Section", course=course)
+        self.tests = []
+        for number in range(3):
+            material = Material.objects.create(
+                title=f"Material {number}", content="Content", section=section
+            )
+            test = TestModel.objects.create(title=f"Test {number}", material=material)
+            for index in range(3):
+                question = QuestionModel.objects.create(test=test, text=f"Q{index}")
+                AnswerModel.objects.create(question=question, text="A", is_correct=True)
+                AnswerModel.objects.create(question=question, text="B")
+            self.tests.append(test)
+        self.list_url = reverse("testing:test-list")
+        self.detail_url = reverse("testing:test-detail", args=[self.tests[0].id])
+
+    def test_expanded_list_uses_constant_queries(self):
+        """Список с вопросами загружается постоянным числом запросов: id, тесты, вопросы, ответы."""
+        with self.assertNumQueries(4):
+            response = self.client.get(self.list_url, {"expand": "true"})
+        self.assertEqual(len(response.data["results"]), 3)
+        self.assertEqual(len(response.data["results"][0]["questions"][0]["answers"]), 2)
+
+    def test_retrieve_is_cached_and_invalidated(self):
+        """Повторное чтение теста берется из кеша, правка ответа сбрасывает кеш."""
+        self.client.get(self.detail_url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url)
+        self.assertEqual(len(response.data["questions"]), 3)
+        answer = AnswerModel.objects.filter(question__test=self.tests[0]).first()
+        answer.text = "Changed"
+        with self.captureOnCommitCallbacks(execute=True):
+            answer.save()
+        response = self.client.get(self.detail_url)
+        texts = [a["text"] for q in response.data["questions"] for a in q["answers"]]
+        self.assertIn("Changed", texts)
+
+
+class QuestionSamplingTestCase(APITestCase):
+    """
+    Тесты выдачи случайной выборки вопросов из банка и проверки попытки
+    по выданным вопросам.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        self.client.force_authenticate(user=self.user)
+        course = Course.objects.create(title="Course", owner=self.user)
+        section = Section.objects.create(title="Section", course=course)
+        material = Material.objects.create(
+            title="Material", content="Content", section=section
+        )
+        self.test = TestModel.objects.create(
+            title="Bank", material=material, questions_per_attempt=3
+        )
+        self.correct = {}
+        for index in range(10):
+            question = QuestionModel.objects.create(test=self.test, text=f"Q{index}")
+            self.correct[question.id] = AnswerModel.objects.create(
+                question=question, text="A", is_correct=True
+            ).id
+            AnswerModel.objects.create(question=question, text="B")
+        self.start_url = reverse("testing:test-start", args=[self.test.id])
+        self.submit_url = reverse("testing:submit-test", args=[self.test.id])
+
+    def _answers(self, question_ids):
+        return [
+            {"question_id": pk, "selected_answer_id": self.correct[pk]}
+            for pk in question_ids
+        ]
+
+    def test_start_serves_sample_with_bounded_queries(self):
+        """Выборка берется из кешированного массива id: тест, вопросы и ответы."""
+        self.client.get(self.start_url)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.start_url)
+        questions = response.data["questions"]
+        self.assertEqual(len(questions), 3)
+        self.assertEqual(len({q["id"] for q in questions}), 3)
+        self.assertTrue(set(q["id"] for q in questions) <= set(self.correct))
+        self.assertEqual(len(questions[0]["answers"]), 2)
+
+    def test_submit_grades_served_questions(self):
+        """Попытка оценивается по выданным вопросам, а не по всему банку."""
+        response = self.client.get(self.start_url)
+        served = [q["id"] for q in response.data["questions"]]
+        data = {"answers": self._answers(served[:2]), "token": response.data["token"]}
+        response = self.client.post(self.submit_url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["score"], 67)
+
+    def test_question_outside_sample_is_rejected(self):
+        """Ответ на вопрос, не выданный в попытке, отклоняется."""
+        response = self.client.get(self.start_url)
+        served = {q["id"] for q in response.data["questions"]}
+        other = next(pk for pk in self.correct if pk not in served)
+        data = {"answers": self._answers([other]), "token": response.data["token"]}
+        response = self.client.post(self.submit_url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_token_is_required_and_verified(self):
+        """Без токена, с подделанным или чужим токеном попытка не принимается."""
+        token = self.client.get(self.start_url).data["token"]
+        answers = self._answers(list(self.correct)[:3])
+        for data in (
+            {"answers": answers},
+            {"answers": answers, "token": token[:-1] + "x"},
+        ):
+            response = self.client.post(self.submit_url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        other = User.objects.create_user(
+            email="other@example.com", password="testpass", role="student"
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.post(
+            self.submit_url, {"answers": [], "token": token}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sampled_test_is_served_without_bank(self):
+        """Детальный и развернутый списки не отдают банк теста с выборкой."""
+        response = self.client.get(reverse("testing:test-detail", args=[self.test.id]))
+        self.assertNotIn("questions", response.data)
+        self.assertEqual(response.data["questions_count"], 10)
+        response = self.client.get(reverse("testing:test-list"), {"expand": "true"})
+        self.assertNotIn("questions", response.data["results"][0])
+
+        self.test.questions_per_attempt = None
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test.save()
+        response = self.client.get(reverse("testing:test-detail", args=[self.test.id]))
+        self.assertEqual(len(response.data["questions"]), 10)
+
+    def test_new_question_refreshes_bank(self):
+        """Добавленный вопрос сразу попадает в банк для выборки."""
+        self.test.questions_per_attempt = None
+        self.test.save()
+        self.assertEqual(len(self.client.get(self.start_url).data["questions"]), 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            QuestionModel.objects.create(test=self.test, text="New")
+        self.assertEqual(len(self.client.get(self.start_url).data["questions"]), 11)
+
+
+class QuestionImportTestCase(APITestCase):
+    """
+    Тесты потоковой загрузки банка вопросов командой import_questions
+    и через API.
+    """
+
+    CSV = (
+        "text,answer_1,answer_2,answer_3,correct\n"
+        "2+2?,4,5,,1\n"
+        "Пустой вопрос,,,,1\n"
+        "Столицы?,Москва,Лондон,Минск,1|3\n"
+        "Без верного,a,b,,x\n"
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.client.force_authenticate(user=self.teacher)
+        course = Course.objects.create(title="Course", owner=self.teacher)
+        section = Section.objects.create(title="Section", course=course)
+        material = Material.objects.create(
+            title="Material", content="Content", section=section
+        )
+        self.test = TestModel.objects.create(title="Bank", material=material)
+        self.url = reverse("testing:test-import-questions", args=[self.test.id])
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name, content):
+        path = Path(self.tmp.name) / name
+        path.write_text(content, encoding="utf-8")
+        return str(path)
+
+    def test_command_imports_csv_and_reports_rows(self):
+        """Корректные строки загружаются, ошибочные выводятся с номерами строк."""
+        out, err = StringIO(), StringIO()
+        call_command(
+            "import_questions",
+            self.test.id,
+            self._write("bank.csv", self.CSV),
+            chunk_size=1,
+            stdout=out,
+            stderr=err,
+        )
+        self.assertIn("Загружено вопросов: 2", out.getvalue())
+        self.assertIn("Строка 3", err.getvalue())
+        self.assertIn("Строка 5", err.getvalue())
+        question = QuestionModel.objects.get(test=self.test, text="Столицы?")
+        self.assertEqual(
+            sorted(question.answers.filter(is_correct=True).values_list("text", flat=True)),
+            ["Минск", "Москва"],
+        )
+        self.assertEqual(AnswerModel.objects.filter(question__test=self.test).count(), 5)
+
+    def test_dry_run_saves_nothing(self):
+        """Проверочный прогон только валидирует файл."""
+        lines = [
+            json.dumps(
+                {"text": "Q", "answers": [{"text": "A", "is_correct": True}, {"text": "B"}]}
+            ),
+            json.dumps({"text": "Q", "answers": [{"text": "A"}]}),
+            "{broken",
+        ]
+        out = StringIO()
+        call_command(
+            "import_questions",
+            self.test.id,
+            self._write("bank.ndjson", "\n".join(lines)),
+            dry_run=True,
+            stdout=out,
+            stderr=StringIO(),
+        )
+        self.assertIn("Проверено вопросов: 1, строк с ошибками: 2", out.getvalue())
+        self.assertFalse(QuestionModel.objects.exists())
+
+    def test_upload_imports_and_invalidates_test_cache(self):
+        """Загрузка через API возвращает отчет и сбрасывает кеш теста."""
+        detail_url = reverse("testing:test-detail", args=[self.test.id])
+        self.assertEqual(self.client.get(detail_url).data["questions"], [])
+        upload = SimpleUploadedFile("bank.csv", self.CSV.encode("utf-8"))
+        response = self.client.post(self.url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual([e["row"] for e in response.data["errors"]], [3, 5])
+        self.assertEqual(len(self.client.get(detail_url).data["questions"]), 2)
+
+    def test_upload_rejects_bad_format_and_foreign_users(self):
+        """Неизвестный формат — 400, студент и чужой преподаватель — 403."""
+        upload = SimpleUploadedFile("bank.txt", b"text")
+        response = self.client.post(self.url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for email, role in (("s@example.com", "student"), ("t@example.com", "teacher")):
+            user = User.objects.create_user(email=email, password="testpass", role=role)
+            self.client.force_authenticate(user=user)
+            upload = SimpleUploadedFile("bank.csv", self.CSV.encode("utf-8"))
+            response = self.client.post(self.url, {"file": upload}, format="multipart")
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class WriteBehindTestCase(APITestCase):
+    """
+    Тесты режима write-behind для попыток прохождения тестов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            TEST_ATTEMPTS_WRITE_BEHIND=True,
+            TEST_ATTEMPTS_BUFFER_PATH=str(Path(directory.name) / "attempts.ndjson"),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        self.client.force_authenticate(user=self.user)
+        course = Course.objects.create(title="Course", owner=self.user)
+        section = Section.objects.create(title="Section", course=course)
+        material = Material.objects.create(
+            title="Material", content="Content", section=section
+        )
+        self.test = TestModel.objects.create(title="Sample Test", material=material)
+        self.question = QuestionModel.objects.create(
+            test=self.test, text="What is 2+2?"
+        )
+        self.correct_answer = AnswerModel.objects.create(
+            question=self.question, text="4", is_correct=True
+        )
+
+    def _submit(self):
+        url = reverse("testing:submit-test", args=[self.test.id])
+        data = {
+            "answers": [
+                {
+                    "question_id": self.question.id,
+                    "selected_answer_id": self.correct_answer.id,
+                }
+            ]
+        }
+        return self.client.post(url, data, format="json")
+
+    def test_submission_is_buffered_and_flushed(self):
+        """Попытка попадает в буфер и сохраняется командой flush_test_attempts."""
+        response = self._submit()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(TestAttemptModel.objects.exists())
+
+        pending = pending_records(self.user.id)
+        self.assertEqual(len(pending), 1)
+        self.assertEqual(pending[0]["score"], 100)
+
+        history = self.client.get(reverse("testing:attempts-list"))
+        self.assertEqual(len(history.data["results"]), 1)
+        self.assertEqual(history.data["results"][0]["test"], self.test.id)
+
+        self._submit()
+        call_command("flush_test_attempts", stdout=StringIO())
+        attempts = TestAttemptModel.objects.filter(user=self.user, test=self.test)
+        self.assertEqual(attempts.count(), 2)
+        self.assertEqual(attempts.last().submitted_at, pending[0]["submitted_at"])
+        self.assertEqual(
+            AttemptResponseModel.objects.filter(attempt__in=attempts).count(), 2
+        )
+        self.assertEqual(pending_records(self.user.id), [])
+
+    def test_flush_is_idempotent(self):
+        """Повторное сохранение того же файла не дублирует попытки."""
+        self._submit()
+        path = rotate()
+        saved = path.read_text(encoding="utf-8")
+        call_command("flush_test_attempts", stdout=StringIO())
+        # Сбой между фиксацией транзакции и удалением файла
+        path.write_text(saved, encoding="utf-8")
+        call_command("flush_test_attempts", stdout=StringIO())
+        self.assertEqual(TestAttemptModel.objects.count(), 1)
+        self.assertEqual(TestStatisticsModel.objects.get(test=self.test).attempts_count, 1)
+        self.assertFalse(path.exists())
+
+    def test_flush_rejects_records_of_deleted_tests(self):
+        """Попытка удаленного теста переносится в отклоненные, остальные сохраняются."""
+        self._submit()
+        material = Material.objects.create(
+            title="Other", content="Content", section=self.test.material.section
+        )
+        other_test = TestModel.objects.create(title="Deleted", material=material)
+        question = QuestionModel.objects.create(test=other_test, text="?")
+        answer = AnswerModel.objects.create(question=question, text="!", is_correct=True)
+        url = reverse("testing:submit-test", args=[other_test.id])
+        data = {"answers": [{"question_id": question.id, "selected_answer_id": answer.id}]}
+        self.client.post(url, data, format="json")
+        other_test_id = other_test.id
+        other_test.delete()
+
+        call_command("flush_test_attempts", stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(
+            list(TestAttemptModel.objects.values_list("test_id", flat=True)),
+            [self.test.id],
+        )
+        self.assertEqual(pending_records(self.user.id), [])
+        rejected = list(read_records(rejected_path()))
+        self.assertEqual([record["test_id"] for record in rejected], [other_test_id])
+
+    def test_pending_history_does_not_read_buffer(self):
+        """История берет попытки пользователя из кеша, не читая файлы буфера."""
+        self._submit()
+        other = User.objects.create_user(
+            email="other@example.com", password="testpass", role="student"
+        )
+        self.client.force_authenticate(user=other)
+        self._submit()
+        self.client.force_authenticate(user=self.user)
+        path = rotate()
+        path.write_text("не JSON\n", encoding="utf-8")
+
+        history = self.client.get(reverse("testing:attempts-list"))
+        self.assertEqual(len(history.data["results"]), 1)
+        self.assertEqual(history.data["results"][0]["user"], self.user.id)
+
+    def test_pending_attempts_only_in_student_history(self):
+        """Буфер добавляется только к истории студента, не к спискам персонала."""
+        self.user.role = "admin"
+        self.user.save()
+        self._submit()
+        history = self.client.get(reverse("testing:attempts-list"))
+        self.assertEqual(history.data["results"], [])
+
+
+class BatchSubmitTestCase(APITestCase):
+    """
+    Тесты пакетной отправки результатов тестов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        self.client.force_authenticate(user=self.user)
+        course = Course.objects.create(title="Course", owner=self.user)
+        section = Section.objects.create(title="Section", course=course)
+        self.tests = []
+        for i in range(3):
+            material = Material.objects.create(
+                title=f"Material {i}", content="Content", section=section
+            )
+            test = TestModel.objects.create(title=f"Test {i}", material=material)
+            question = QuestionModel.objects.create(test=test, text="What is 2+2?")
+            correct = AnswerModel.objects.create(
+                question=question, text="4", is_correct=True
+            )
+            wrong = AnswerModel.objects.create(
+                question=question, text="3", is_correct=False
+            )
+            self.tests.append((test, question, correct, wrong))
+        self.url = reverse("testing:submit-test-batch")
+
+    def _item(self, index, correct=True):
+        test, question, correct_answer, wrong_answer = self.tests[index]
+        answer = correct_answer if correct else wrong_answer
+        return {
+            "test_id": test.id,
+            "answers": [{"question_id": question.id, "selected_answer_id": answer.id}],
+        }
+
+    def test_batch_grades_all_items_with_bounded_queries(self):
+        """Пакет проверяется фиксированным числом запросов и одной вставкой."""
+        submissions = [self._item(i % 3, correct=i % 2 == 0) for i in range(12)]
+        with self.assertNumQueries(12):
+            response = self.client.post(
+                self.url, {"submissions": submissions}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        scores = [item["score"] for item in response.data["results"]]
+        self.assertEqual(scores, [100, 0] * 6)
+        self.assertEqual(TestAttemptModel.objects.filter(user=self.user).count(), 12)
+
+    def test_batch_reports_errors_per_item(self):
+        """Ошибочные элементы не мешают сохранению корректных."""
+        invalid_question = self._item(1)
+        invalid_question["answers"][0]["question_id"] = 9999
+        submissions = [
+            self._item(0),
+            {"test_id": 9999, "answers": []},
+            invalid_question,
+            {"answers": "broken"},
+        ]
+        response = self.client.post(
+            self.url, {"submissions": submissions}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual(results[0]["score"], 100)
+        for result in results[1:]:
+            self.assertIn("errors", result)
+        self.assertIn("test_id", results[3]["errors"])
+        self.assertEqual(TestAttemptModel.objects.count(), 1)
+
+
+class TestStatisticsTestCase(APITestCase):
+    """
+    Тесты инкрементальной статистики тестов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.other_teacher = User.objects.create_user(
+            email="other_teacher@example.com", password="testpass", role="teacher"
+        )
+        self.student = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        course = Course.objects.create(title="Course", owner=self.teacher)
+        section = Section.objects.create(title="Section", course=course)
+        material = Material.objects.create(
+            title="Material", content="Content", section=section
+        )
+        self.test = TestModel.objects.create(title="Sample Test", material=material)
+        self.questions = []
+        for i in range(4):
+            question = QuestionModel.objects.create(test=self.test, text=f"Q{i}")
+            correct = AnswerModel.objects.create(
+                question=question, text="yes", is_correct=True
+            )
+            self.questions.append((question, correct))
+        self.url = reverse("testing:test-statistics", args=[self.test.id])
+
+    def _submit(self, correct_count):
+        """Отправляет попытку студента с заданным числом правильных ответов."""
+        self.client.force_authenticate(user=self.student)
+        data = {
+            "answers": [
+                {"question_id": question.id, "selected_answer_id": answer.id}
+                for question, answer in self.questions[:correct_count]
+            ]
+        }
+        url = reverse("testing:submit-test", args=[self.test.id])
+        self.client.post(url, data, format="json")
+
+    def test_statistics_are_updated_incrementally(self):
+        """Статистика обновляется с каждой попыткой и читается одним запросом."""
+        for correct_count in (4, 3, 1):
+            self._submit(correct_count)
+        self.client.force_authenticate(user=self.teacher)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["attempts_count"], 3)
+        self.assertEqual(response.data["passed_count"], 2)
+        self.assertEqual(response.data["average_score"], round(200 / 3, 2))
+        histogram = response.data["histogram"]
+        self.assertEqual(histogram[9], 1)
+        self.assertEqual(histogram[7], 1)
+        self.assertEqual(histogram[2], 1)
+
+    def test_rebuild_matches_incremental(self):
+        """Команда пересчета восстанавливает ту же статистику с нуля."""
+        for correct_count in (4, 2, 0):
+            self._submit(correct_count)
+        expected = TestStatisticsModel.objects.get(test=self.test)
+        TestStatisticsModel.objects.all().delete()
+        call_command("rebuild_test_statistics", stdout=StringIO())
+        rebuilt = TestStatisticsModel.objects.get(test=self.test)
+        self.assertEqual(rebuilt.attempts_count, expected.attempts_count)
+        self.assertEqual(rebuilt.passed_count, expected.passed_count)
+        self.assertEqual(rebuilt.score_sum, expected.score_sum)
+        self.assertEqual(rebuilt.histogram, expected.histogram)
+
+    def test_user_summary_is_upserted(self):
+        """Сводка пользователя хранит лучший и последний результат и дату прохождения."""
+        self._submit(1)
+        summary = UserTestSummaryModel.objects.get(user=self.student, test=self.test)
+        self.assertEqual(summary.attempts_count, 1)
+        self.assertIsNone(summary.first_passed_at)
+
+        self._submit(4)
+        self._submit(2)
+        summary.refresh_from_db()
+        self.assertEqual(summary.attempts_count, 3)
+        self.assertEqual(summary.best_score, 100)
+        self.assertEqual(summary.last_score, 50)
+        first_passed = TestAttemptModel.objects.get(score=100).submitted_at
+        self.assertEqual(summary.first_passed_at, first_passed)
+
+        UserTestSummaryModel.objects.all().delete()
+        call_command("rebuild_test_statistics", stdout=StringIO())
+        rebuilt = UserTestSummaryModel.objects.get(user=self.student, test=self.test)
+        self.assertEqual(
+            (rebuilt.best_score, rebuilt.last_score, rebuilt.attempts_count),
+            (100, 50, 3),
+        )
+        self.assertEqual(rebuilt.first_passed_at, first_passed)
+
+    def test_statistics_access(self):
+        """Статистика недоступна студентам и чужим преподавателям."""
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(
+            self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN
+        )
+        self.client.force_authenticate(user=self.other_teacher)
+        self.assertEqual(
+            self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN
+        )
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["attempts_count"], 0)
+
+
+class RegradeTestCase(APITestCase):
+    """
+    Тесты перепроверки сохраненных попыток после исправления ключа ответов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        self.client.force_authenticate(user=self.student)
+        course = Course.objects.create(title="Course", owner=self.student)
+        section = Section.objects.create(title="Section", course=course)
+        material = Material.objects.create(
+            title="Material", content="Content", section=section
+        )
+        self.test = TestModel.objects.create(title="Sample Test", material=material)
+        self.answers = []
+        for index in range(2):
+            question = QuestionModel.objects.create(test=self.test, text=f"Q{index}")
+            self.answers.append(
+                (
+                    AnswerModel.objects.create(
+                        question=question, text="right", is_correct=True
+                    ),
+                    AnswerModel.objects.create(question=question, text="wrong"),
+                )
+            )
+        self.url = reverse("testing:submit-test", args=[self.test.id])
+
+    def _submit(self, *answers):
+        data = {
+            "answers": [
+                {"question_id": answer.question_id, "selected_answer_id": answer.id}
+                for answer in answers
+            ]
+        }
+        return self.client.post(self.url, data, format="json").data["score"]
+
+    def test_regrade_recomputes_scores_and_reports_flips(self):
+        """После исправления ключа результаты совпадают с новой проверкой."""
+        (right_1, wrong_1), (right_2, wrong_2) = self.answers
+        self.assertEqual(self._submit(right_1, wrong_2), 50)
+        self.assertEqual(self._submit(wrong_1, right_2), 50)
+        self.assertEqual(self._submit(right_1, right_2), 100)
+
+        wrong_2.is_correct = True
+        right_2.is_correct = False
+        with self.captureOnCommitCallbacks(execute=True):
+            wrong_2.save()
+            right_2.save()
+
+        out = StringIO()
+        call_command("regrade_test", self.test.id, dry_run=True, stdout=out)
+        self.assertIn("изменено: 3", out.getvalue())
+        self.assertEqual(TestAttemptModel.objects.filter(score=50).count(), 2)
+
+        call_command("regrade_test", self.test.id, chunk_size=2, stdout=out)
+        self.assertIn("стали пройденными: 1, перестали быть пройденными: 1", out.getvalue())
+        scores = list(
+            TestAttemptModel.objects.order_by("id").values_list("score", "passed")
+        )
+        self.assertEqual(scores, [(100, True), (0, False), (50, False)])
+        self.assertEqual(self._submit(right_1, wrong_2), scores[0][0])
+
+        statistics = TestStatisticsModel.objects.get(test=self.test)
+        self.assertEqual((statistics.passed_count, statistics.score_sum), (2, 250))
+        summary = UserTestSummaryModel.objects.get(user=self.student, test=self.test)
+        self.assertEqual(summary.best_score, 100)
+        self.assertEqual(summary.attempts_count, 4)
+
+    def test_attempts_without_responses_are_skipped(self):
+        """Попытки без сохраненных ответов не перепроверяются."""
+        legacy = TestAttemptModel.objects.create(
+            user=self.student, test=self.test, score=100, passed=True
+        )
+        right_1, wrong_1 = self.answers[0]
+        self._submit(wrong_1)
+
+        report = regrade_test(self.test.id, dry_run=True)
+        self.assertEqual(
+            report,
+            {
+                "attempts": 1,
+                "skipped": 1,
+                "changed": 0,
+                "passed_to_failed": 0,
+                "failed_to_passed": 0,
+            },
+        )
+        right_1.is_correct, wrong_1.is_correct = False, True
+        right_1.save()
+        wrong_1.save()
+        self.assertEqual(regrade_test(self.test.id)["changed"], 1)
+        legacy.refresh_from_db()
+        self.assertEqual((legacy.score, legacy.passed), (100, True))
+
+
+class ItemAnalysisTestCase(APITestCase):
+    """
+    Тесты анализа вопросов: трудность, дискриминативность и выбор вариантов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.student = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        course = Course.objects.create(title="Course", owner=self.teacher)
+        section = Section.objects.create(title="Section", course=course)
+        material = Material.objects.create(
+            title="Material", content="Content", section=section
+        )
+        self.test = TestModel.objects.create(title="Sample Test", material=material)
+        self.q1 = QuestionModel.objects.create(test=self.test, text="Q1")
+        self.a, self.b, self.c = self._answers(self.q1, "ABC")
+        self.q2 = QuestionModel.objects.create(test=self.test, text="Q2")
+        self.d, self.e = self._answers(self.q2, "DE")
+        # Результаты попыток: 100, 50, 50 и 0 процентов
+        for pair in (
+            (self.a, self.d),
+            (self.a, self.e),
+            (self.b, self.d),
+            (self.c, self.e),
+        ):
+            self._submit(*pair)
+        self.url = reverse("testing:test-item-analysis", args=[self.test.id])
+
+    def _answers(self, question, texts):
+        """Создает варианты ответа; верный — первый."""
+        return [
+            AnswerModel.objects.create(
+                question=question, text=text, is_correct=text == texts[0]
+            )
+            for text in texts
+        ]
+
+    def _submit(self, *answers):
+        self.client.force_authenticate(user=self.student)
+        data = {
+            "answers": [
+                {"question_id": answer.question_id, "selected_answer_id": answer.id}
+                for answer in answers
+            ]
+        }
+        self.client.post(
+            reverse("testing:submit-test", args=[self.test.id]), data, format="json"
+        )
+
+    def _analysis(self, refresh=False):
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(self.url, {"refresh": "true"} if refresh else {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {item["question"]: item for item in response.data["questions"]}
+
+    def test_item_statistics(self):
+        """P-value, точечно-бисериальная корреляция и доли выбора вариантов."""
+        q1 = self._analysis()[self.q1.id]
+        self.assertEqual(q1["responses_count"], 4)
+        self.assertEqual(q1["p_value"], 0.5)
+        self.assertAlmostEqual(q1["discrimination"], 0.7071, places=4)
+        rates = {item["text"]: item["selection_rate"] for item in q1["answers"]}
+        self.assertEqual(rates, {"A": 0.5, "B": 0.25, "C": 0.25})
+        self.assertTrue(q1["answers"][0]["is_correct"])
+
+    def test_incremental_refresh_matches_full(self):
+        """Инкрементальное обновление дает те же суммы, что и пересчет с нуля."""
+        self._analysis()
+        self._submit(self.a, self.d)
+        self.assertEqual(self._analysis()[self.q1.id]["responses_count"], 4)
+        incremental = self._analysis(refresh=True)
+        self.assertEqual(incremental[self.q1.id]["responses_count"], 5)
+        call_command("refresh_item_analysis", full=True, stdout=StringIO())
+        self.assertEqual(self._analysis(), incremental)
+
+    def test_late_committed_attempt_is_counted(self):
+        """Попытка, сохраненная с меньшим id после учтенной, тоже учитывается."""
+        material = Material.objects.create(
+            title="Other", content="Content", section=self.test.material.section
+        )
+        other_test = TestModel.objects.create(title="Other", material=material)
+        late = TestAttemptModel.objects.create(
+            user=self.student, test=other_test, score=100, passed=True
+        )
+        self._submit(self.a, self.d)
+        self.assertEqual(self._analysis(refresh=True)[self.q1.id]["responses_count"], 5)
+
+        # Попытка параллельной транзакции с меньшим id становится видна позже
+        TestAttemptModel.objects.filter(pk=late.pk).update(test=self.test)
+        AttemptResponseModel.objects.create(
+            attempt=late, question=self.q1, answer=self.a
+        )
+        self.assertEqual(self._analysis(refresh=True)[self.q1.id]["responses_count"], 6)
+        self.assertEqual(self._analysis(refresh=True)[self.q1.id]["responses_count"], 6)
+
+    def test_answer_key_change_recomputes(self):
+        """После исправления верного ответа анализ пересчитывается по новому ключу."""
+        self._analysis()
+        self.b.is_correct = True
+        self.b.save()
+        self.assertEqual(self._analysis(refresh=True)[self.q1.id]["p_value"], 0.75)
+
+    def test_access(self):
+        """Анализ недоступен студентам и чужим преподавателям."""
+        other = User.objects.create_user(
+            email="other@example.com", password="testpass", role="teacher"
+        )
+        for user in (self.student, other):
+            self.client.force_authenticate(user=user)
+            self.assertEqual(
+                self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN
+            )
+
+
+class TestAttemptHistoryTestCase(APITestCase):
+    """
+    Тесты API истории попыток прохождения тестов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", password="testpass", role="teacher"
+        )
+        self.other_teacher = User.objects.create_user(
+            email="other_teacher@example.com", password="testpass", role="teacher"
+        )
+        self.student = User.objects.create_user(
+            email="student@example.com", password="testpass", role="student"
+        )
+        self.other_student = User.objects.create_user(
+            email="other_student@example.com", password="testpass", role="student"
+        )
+        self.course = Course.objects.create(title="Course", owner=self.teacher)
+        other_course = Course.objects.create(title="Other", owner=self.other_teacher)
+        self.test = self._create_test(self.course)
+        self.other_test = self._create_test(other_course)
+        for user in (self.student, self.other_student):
+            for test in (self.test, self.other_test):
+                for score in (40, 80):
+                    TestAttemptModel.objects.create(
+                        user=user, test=test, score=score, passed=score >= 70
+                    )
+        self.url = reverse("testing:attempts-list")
+
+    def _create_test(self, course):
+        section = Section.objects.create(title="Section", course=course)
+        material = Material.objects.create(
+            title="Material", content="Content", section=section
+        )
+        return TestModel.objects.create(title="Test", material=material)
+
+    def test_student_sees_own_attempts(self):
+        """Студент видит только свои попытки, новые — первыми."""
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(self.url)
+        results = response.data["results"]
+        self.assertEqual(len(results), 4)
+        self.assertEqual({item["user"] for item in results}, {self.student.id})
+        dates = [item["submitted_at"] for item in results]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_teacher_sees_course_attempts(self):
+        """Преподаватель видит попытки только по тестам своих курсов."""
+        self.client.force_authenticate(user=self.teacher)
+        response = self.client.get(self.url)
+        results = response.data["results"]
+        self.assertEqual(len(results), 4)
+        self.assertEqual({item["test"] for item in results}, {self.test.id})
+
+    def test_filters_and_pagination(self):
+        """Фильтры по тесту, курсу и дате и курсорная пагинация."""
+        self.client.force_authenticate(user=self.student)
+        response = self.client.get(self.url, {"test": self.test.id, "page_size": 1})
+        self.assertEqual(len(response.data["results"]), 1)
+        second = self.client.get(response.data["next"])
+        self.assertEqual(len(second.data["results"]), 1)
+        self.assertIsNone(second.data["next"])
+
+        response = self.client.get(self.url, {"course": self.course.id})
+        self.assertEqual(len(response.data["results"]), 2)
+        response = self.client.get(self.url, {"date_to": "2000-01-01"})
+        self.assertEqual(response.data["results"], [])
+        response = self.client.get(self.url, {"date_from": "bad"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_attempt_queries_use_composite_indexes(self):
+        """Выборки попыток идут по индексам без сортировки."""
+        if connection.vendor != "sqlite":
+            self.skipTest("Проверка плана запроса написана для SQLite")
+        querysets = {
+            "testing_attempt_user_date_idx": TestAttemptModel.objects.filter(
+                user=self.student
+            ),
+            "testing_attempt_date_idx": TestAttemptModel.objects.all(),
+            "testing_attempt_user_test_idx": TestAttemptModel.objects.filter(
+                user=self.student, test=self.test
+            ),
+            "testing_attempt_test_date_idx": TestAttemptModel.objects.filter(
+                test=self.test
+            ),
+        }
+        for index_name, queryset in querysets.items():
+            sql, params = queryset.order_by("-submitted_at").query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                plan = " ".join(str(row) for row in cursor.fetchall())
+            self.assertIn(index_name, plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_default_list_plans_avoid_sorting(self):
+        """Списки попыток студента и администратора по умолчанию не сортируются."""
+        if connection.vendor != "sqlite":
+            self.skipTest("Проверка плана запроса написана для SQLite")
+        admin = User.objects.create_user(
+            email="admin@example.com", password="testpass", role="admin"
+        )
+        for user, index_name in (
+            (self.student, "testing_attempt_user_date_idx"),
+            (admin, "testing_attempt_date_idx"),
+        ):
+            self.client.force_authenticate(user=user)
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(self.url)
+            sql = next(
+                query["sql"]
+                for query in context.captured_queries
+                if 'FROM "testing_testattempt"' in query["sql"]
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = " ".join(str(row) for row in cursor.fetchall())
+            self.assertIn(index_name, plan)
+            self.assertNotIn("TEMP B-TREE", plan)
@@ -2,14 +2,23 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .apps import TestingConfig
-from .views import SubmitTestView, TestViewSet
+from .views import (BatchSubmitTestView, SubmitTestView, TestAttemptViewSet,
+                    TestViewSet)
 
 app_name = TestingConfig.name
 
 router = DefaultRouter()
 router.register("tests", TestViewSet)  # Эндпоинты для работы с тестами (чтение)
+router.register(
+    "attempts", TestAttemptViewSet, basename="attempts"
+)  # Эндпоинты для просмотра истории попыток
 
 urlpatterns = [
+    path(
+        "tests/submit/batch/",
+        BatchSubmitTestView.as_view(),
+        name="submit-test-batch",
+    ),  # Эндпоинт для пакетной отправки результатов тестов
     path("", include(router.urls)),
     path(
         "tests/<int:test_id>/submit/", SubmitTestView.as_view(), name="submit-test"
@@ -1,28 +1,319 @@
+import io
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from config import settings
+from authentication.permissions import IsTeacherOrAdmin
+from config.pagination import KeysetPagination
+from content.mixins import SummaryListMixin
 
-from .models import Answer, Test, TestAttempt
-from .serializers import SubmitTestSerializer, TestSerializer
+from . import buffer
+from .analysis import item_analysis_report, refresh_item_analysis
+from .bank import (QuestionImporter, QuestionImportError, detect_format,
+                   read_rows)
+from .cache import get_test_payloads
+from .models import Test, TestAttempt, TestItemAnalysis, TestStatistics
+from .sampling import make_attempt_token, serve_questions, served_answer_key
+from .serializers import (AttemptStartSerializer,
+                          BatchSubmissionItemSerializer,
+                          BatchSubmitSerializer, ItemAnalysisSerializer,
+                          QuestionImportSerializer,
+                          SubmitTestSerializer,
+                          TestAttemptSerializer, TestSerializer,
+                          TestStatisticsSerializer, TestSummarySerializer)
+from .services import (GradingError, get_answer_key, get_answer_keys,
+                       grade_answers, make_attempt_record, record_attempts)
 
 
-class TestViewSet(viewsets.ReadOnlyModelViewSet):
+class TestViewSet(SummaryListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet для работы с тестами (только чтение).
 
     Доступные действия:
     - list: Получить список всех тестов
     - retrieve: Получить детальную информацию о тесте (с вопросами и ответами)
+    - start: Начать попытку — получить вопросы попытки и токен для отправки
+    - statistics: Получить статистику теста (для администраторов и преподавателей-владельцев)
+    - import_questions: Загрузить банк вопросов из CSV/NDJSON (для них же)
+    - item_analysis: Анализ вопросов — трудность, дискриминативность и выбор
+      вариантов ответа (для них же)
 
     Тесты доступны только для чтения всем аутентифицированным пользователям.
+    Список по умолчанию возвращает краткую сводку, вопросы — с ?expand=true.
+    Тесты с вопросами отдаются из кеша (см. testing.cache), недостающие
+    загружаются постоянным числом запросов. Тесты с выборкой вопросов
+    (questions_per_attempt) и в retrieve, и в expand отдаются краткой сводкой,
+    их вопросы выдаются только через start.
     """
 
     queryset = Test.objects.all()
     serializer_class = TestSerializer
+    summary_serializer_class = TestSummarySerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.is_summary():
+            return queryset.annotate(questions_count=Count("questions"))
+        if self.action in ["list", "retrieve"]:
+            # Тесты берутся из кеша, из БД нужны только id
+            return queryset.only("id")
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if self.is_summary():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        tests = page if page is not None else queryset
+        data = get_test_payloads([test.id for test in tests])
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        test = self.get_object()
+        return Response(get_test_payloads([test.id])[0])
+
+    def get_owned_test(self, pk, *related):
+        """Возвращает тест, доступный администратору или преподавателю-владельцу."""
+        test = get_object_or_404(
+            Test.objects.select_related("material", *related), pk=pk
+        )
+        user = self.request.user
+        if user.role == "teacher" and test.material.owner_id != user.id:
+            raise PermissionDenied
+        return test
+
+    @swagger_auto_schema(
+        responses={200: AttemptStartSerializer, 404: "Тест не найден"},
+        operation_summary="Начало попытки прохождения теста",
+    )
+    @action(detail=True)
+    def start(self, request, pk=None):
+        """
+        Возвращает вопросы попытки: случайную выборку из банка, если у теста
+        задано questions_per_attempt, иначе все вопросы. Токен с id выданных
+        вопросов передается в tests/{id}/submit/.
+        """
+        test = self.get_object()
+        questions, question_ids = serve_questions(test)
+        data = {
+            "id": test.id,
+            "title": test.title,
+            "questions": questions,
+            "token": make_attempt_token(request.user.id, test.id, question_ids),
+        }
+        return Response(AttemptStartSerializer(data).data)
+
+    @swagger_auto_schema(
+        responses={200: TestStatisticsSerializer, 404: "Тест не найден"},
+        operation_summary="Статистика теста",
+    )
+    @action(detail=True, permission_classes=[IsTeacherOrAdmin])
+    def statistics(self, request, pk=None):
+        """Возвращает количество попыток, долю успешных, средний балл и гистограмму."""
+        test = self.get_owned_test(pk, "statistics")
+        try:
+            statistics = test.statistics
+        except TestStatistics.DoesNotExist:
+            statistics = TestStatistics(test=test)
+        return Response(TestStatisticsSerializer(statistics).data)
+
+    @swagger_auto_schema(
+        request_body=QuestionImportSerializer,
+        responses={
+            200: "Отчет о загрузке: rows, created, errors_count, errors по строкам",
+            400: "Неверный формат файла",
+            404: "Тест не найден",
+        },
+        operation_summary="Загрузка банка вопросов",
+    )
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="import",
+        permission_classes=[IsTeacherOrAdmin],
+        parser_classes=[MultiPartParser],
+    )
+    def import_questions(self, request, pk=None):
+        """
+        Потоково загружает вопросы с ответами из файла (см. testing.bank).
+        Строки с ошибками пропускаются и возвращаются в отчете,
+        с dry_run файл только проверяется.
+        """
+        test = self.get_owned_test(pk)
+        serializer = QuestionImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.validated_data["file"]
+        importer = QuestionImporter(
+            test.id, dry_run=serializer.validated_data["dry_run"]
+        )
+        try:
+            fmt = detect_format(upload.name, serializer.validated_data.get("format"))
+            stream = io.TextIOWrapper(upload, encoding="utf-8-sig", newline="")
+            report = importer.run(read_rows(stream, fmt))
+        except QuestionImportError as error:
+            return Response({"detail": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
+
+    @swagger_auto_schema(
+        responses={200: ItemAnalysisSerializer, 404: "Тест не найден"},
+        operation_summary="Анализ вопросов теста",
+    )
+    @action(
+        detail=True, url_path="item-analysis", permission_classes=[IsTeacherOrAdmin]
+    )
+    def item_analysis(self, request, pk=None):
+        """
+        Возвращает по каждому вопросу долю верных ответов (p-value),
+        точечно-бисериальную корреляцию с результатом попытки и доли выбора
+        вариантов. Анализ читается из сводной таблицы; с ?refresh=true или
+        при первом обращении он обновляется новыми попытками.
+        """
+        test = self.get_owned_test(pk)
+        state = TestItemAnalysis.objects.filter(test=test).first()
+        refresh = request.query_params.get("refresh", "").lower()
+        if state is None or refresh in ("1", "true", "yes"):
+            state = refresh_item_analysis(test.id)
+        report = item_analysis_report(state, get_answer_key(test.id))
+        return Response(ItemAnalysisSerializer(report).data)
+
+
+class AttemptPagination(KeysetPagination):
+    """Курсорная пагинация истории попыток по индексированной дате прохождения."""
+
+    ordering = "-submitted_at"
+
+
+class TestAttemptViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet для просмотра истории попыток прохождения тестов (только чтение).
+
+    Доступные действия:
+    - list: Получить список попыток с фильтрами test, course, date_from, date_to
+    - retrieve: Получить отдельную попытку
+
+    Студенты видят только свои попытки, преподаватели — попытки по тестам
+    своих курсов, администраторы — все попытки. Выборки обслуживаются
+    индексами (user, submitted_at), (user, test, submitted_at),
+    (test, submitted_at) и (submitted_at).
+    """
+
+    serializer_class = TestAttemptSerializer
+    pagination_class = AttemptPagination
+
+    def get_queryset(self):
+        """Фильтрует попытки по роли пользователя и параметрам запроса."""
+        user = self.request.user
+        if not user.is_authenticated:
+            return TestAttempt.objects.none()
+        if user.role == "admin":
+            queryset = TestAttempt.objects.all()
+        elif user.role == "teacher":
+            queryset = TestAttempt.objects.filter(test__material__owner=user)
+        else:
+            queryset = TestAttempt.objects.filter(user=user)
+        if self.action != "list":
+            return queryset
+
+        filters = self.get_filters()
+        if "test" in filters:
+            queryset = queryset.filter(test_id=filters["test"])
+        if "course" in filters:
+            queryset = queryset.filter(
+                test__material__section__course_id=filters["course"]
+            )
+        if "date_from" in filters:
+            queryset = queryset.filter(submitted_at__gte=filters["date_from"])
+        if "date_to" in filters:
+            queryset = queryset.filter(submitted_at__lte=filters["date_to"])
+        return queryset
+
+    def get_filters(self):
+        """Разбирает параметры фильтрации из строки запроса."""
+        params = self.request.query_params
+        filters = {}
+        for name in ("test", "course"):
+            if params.get(name):
+                try:
+                    filters[name] = int(params[name])
+                except ValueError:
+                    raise ValidationError({name: "Ожидается целое число."})
+        for name, bound in (("date_from", time.min), ("date_to", time.max)):
+            if params.get(name):
+                value = parse_datetime(params[name])
+                if value is None:
+                    day = parse_date(params[name])
+                    if day is None:
+                        raise ValidationError(
+                            {name: "Ожидается дата в формате ISO 8601."}
+                        )
+                    value = datetime.combine(day, bound)
+                if timezone.is_naive(value):
+                    value = timezone.make_aware(value)
+                filters[name] = value
+        return filters
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        first_page = not request.query_params.get(self.paginator.cursor_query_param)
+        own_attempts = request.user.role not in ("admin", "teacher")
+        if settings.TEST_ATTEMPTS_WRITE_BEHIND and first_page and own_attempts:
+            # Попытки из буфера write-behind еще не сохранены в БД,
+            # но студент должен сразу видеть свою последнюю попытку
+            response.data["results"] = self.get_pending() + response.data["results"]
+        return response
+
+    def get_pending(self):
+        """Возвращает еще не сохраненные попытки текущего пользователя."""
+        filters = self.get_filters()
+        records = buffer.pending_records(self.request.user.id)
+        if "course" in filters:
+            course_tests = set(
+                Test.objects.filter(
+                    material__section__course_id=filters["course"]
+                ).values_list("id", flat=True)
+            )
+            records = [record for record in records if record["test_id"] in course_tests]
+        if "test" in filters:
+            records = [record for record in records if record["test_id"] == filters["test"]]
+        if "date_from" in filters:
+            records = [
+                record
+                for record in records
+                if record["submitted_at"] >= filters["date_from"]
+            ]
+        if "date_to" in filters:
+            records = [
+                record
+                for record in records
+                if record["submitted_at"] <= filters["date_to"]
+            ]
+        attempts = [
+            TestAttempt(
+                user_id=record["user_id"],
+                test_id=record["test_id"],
+                score=record["score"],
+                passed=record["passed"],
+                submitted_at=record["submitted_at"],
+            )
+            for record in sorted(
+                records, key=lambda record: record["submitted_at"], reverse=True
+            )
+        ]
+        return TestAttemptSerializer(attempts, many=True).data
 
 
 class SubmitTestView(APIView):
@@ -52,6 +343,7 @@ class SubmitTestView(APIView):
         Параметры:
         - test_id: ID теста, который проходит пользователь
         - answers: список ответов пользователя в формате {question_id, selected_answer_id}
+        - token: токен попытки из tests/{id}/start/ (для тестов с выборкой вопросов)
 
         Возвращает:
         - score: процент правильных ответов
@@ -62,8 +354,10 @@ class SubmitTestView(APIView):
         serializer = SubmitTestSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        # Получаем тест или 404
-        test = get_object_or_404(Test, pk=test_id)
+        # Ключ ответов теста берется из кеша, при отсутствии теста — 404
+        answer_key = get_answer_key(test_id)
+        if answer_key is None:
+            raise Http404
 
         # Формируем словарь: question_id -> selected_answer_id
         user_answers = {
@@ -71,63 +365,101 @@ class SubmitTestView(APIView):
             for answer in serializer.validated_data["answers"]
         }
 
-        question_ids = user_answers.keys()
-        answer_ids = user_answers.values()
+        # Проверка ответов выполняется в памяти по ключу ответов,
+        # ограниченному выданными в попытке вопросами
+        try:
+            answer_key = served_answer_key(
+                answer_key,
+                serializer.validated_data.get("token"),
+                request.user.id,
+                test_id,
+            )
+            result = grade_answers(answer_key, user_answers)
+        except GradingError as error:
+            return Response({"detail": str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Загружаем все вопросы по ID, используем in_bulk для получения словаря {id: Question}
-        questions_dict = test.questions.in_bulk(question_ids)
+        # Сохраняем попытку пользователя (сразу или через буфер write-behind)
+        record_attempts([make_attempt_record(request.user.id, test_id, result)])
 
-        # Проверяем, что ВСЕ question_id действительно существуют
-        if len(questions_dict) < len(user_answers):
-            return Response(
-                {"detail": "Невалидные вопросы в ответах."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        # Возвращаем результат теста и подробный разбор
+        return Response(result, status=status.HTTP_200_OK)
 
-        # Загружаем ответы, выбранные пользователем, с привязкой к этому тесту
-        answers = Answer.objects.filter(
-            id__in=answer_ids,
-            question_id__in=question_ids,
-            question__test=test,
-        ).select_related("question")
 
-        # Подсчет правильных и формирование подробного отчета
-        correct = 0
-        details = []
+class BatchSubmitTestView(APIView):
+    """
+    API для пакетной отправки результатов тестов.
 
-        for answer in answers:
-            is_correct = (
-                answer.is_correct and user_answers.get(answer.question_id) == answer.id
-            )
+    Используется для загрузки результатов, собранных офлайн (например, на
+    планшетах в классе). Все отправки проверяются по ключам ответов,
+    загруженным разом для всех тестов пакета, а попытки сохраняются
+    одним bulk_create. Ошибки возвращаются отдельно для каждого элемента.
+    """
 
-            if is_correct:
-                correct += 1
-
-            # Добавляем информацию в отчет
-            details.append(
-                {
-                    "question_id": answer.question_id,
-                    "question_text": answer.question.text,
-                    "selected_answer_id": answer.id,
-                    "selected_answer_text": answer.text,
-                    "is_correct": is_correct,
-                }
-            )
+    @swagger_auto_schema(
+        request_body=BatchSubmitSerializer,
+        responses={
+            200: "Результаты по каждому элементу пакета (score/passed или errors)",
+            400: "Неверный формат данных",
+        },
+        operation_description="Отправить результаты нескольких прохождений тестов",
+        operation_summary="Пакетная отправка результатов тестов",
+    )
+    def post(self, request):
+        """
+        Обрабатывает пакетную отправку результатов.
+
+        Параметры:
+        - submissions: список отправок в формате {test_id, answers, token}
 
-        # Считаем общее количество вопросов в тесте
-        total = test.questions.count()
+        Возвращает:
+        - results: для каждого элемента (в том же порядке) index и либо
+          score/passed/details, либо errors
+        """
+        serializer = BatchSubmitSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        # Вычисляем процент правильных
-        score = round((correct / total) * 100)
-        passed = score >= settings.TEST_PASS_THRESHOLD
+        results = []
+        submissions = []
+        for index, item in enumerate(serializer.validated_data["submissions"]):
+            item_serializer = BatchSubmissionItemSerializer(data=item)
+            if item_serializer.is_valid():
+                submissions.append((index, item_serializer.validated_data))
+                results.append(None)
+            else:
+                results.append({"index": index, "errors": item_serializer.errors})
 
-        # Сохраняем попытку пользователя
-        TestAttempt.objects.create(
-            user=request.user, test=test, score=score, passed=passed
+        # Ключи ответов всех тестов пакета загружаются одним обращением
+        answer_keys = get_answer_keys(
+            {submission["test_id"] for _, submission in submissions}
         )
 
-        # Возвращаем результат теста и подробный разбор
-        return Response(
-            {"score": score, "passed": passed, "details": details},
-            status=status.HTTP_200_OK,
-        )
+        records = []
+        for index, submission in submissions:
+            answer_key = answer_keys.get(submission["test_id"])
+            if answer_key is None:
+                results[index] = {"index": index, "errors": {"detail": "Тест не найден."}}
+                continue
+            user_answers = {
+                answer["question_id"]: answer["selected_answer_id"]
+                for answer in submission["answers"]
+            }
+            try:
+                answer_key = served_answer_key(
+                    answer_key,
+                    submission.get("token"),
+                    request.user.id,
+                    submission["test_id"],
+                )
+                result = grade_answers(answer_key, user_answers)
+            except GradingError as error:
+                results[index] = {"index": index, "errors": {"detail": str(error)}}
+                continue
+            records.append(
+                make_attempt_record(request.user.id, submission["test_id"], result)
+            )
+            results[index] = {"index": index, "test_id": submission["test_id"], **result}
+
+        if records:
+            record_attempts(records)
+
+        return Response({"results": results}, status=status.HTTP_200_OK)